@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+
+import argparse
+import timeit
+from typing import Callable, Optional
+from collections.abc import Sequence
+
+from eddnindex.config import Config
+from eddnindex.database import DBConnection
+from eddnindex.types import BodyDesignation
+from eddnindex import bodies
+from eddnindex import sqlqueries
+
+
+def loadcorpus(args: argparse.Namespace) -> Sequence[str]:
+    if args.corpus is not None:
+        with open(args.corpus, 'rt', encoding='utf-8') as f:
+            return [line.rstrip('\n') for line in f]
+
+    config = Config()
+    config.load('eddn-index-update.ini', args.config_file)
+    conn = DBConnection()
+    conn.open(config.database)
+
+    try:
+        return [row[1] for row in sqlqueries.get_body_designations(conn, None)]
+    finally:
+        conn.close()
+
+
+def bench(name: str,
+          func: Callable[[str], Optional[BodyDesignation]],
+          corpus: Sequence[str],
+          repeat: int,
+          setup: Callable[[], None] = lambda: None
+          ):
+    def run():
+        setup()
+        for desig in corpus:
+            func(desig)
+
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    print(f'{name:>24}: {best:.3f}s '
+          f'({best * 1000000 / len(corpus):.3f}us/designation)')
+
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description='Compare body designation parsers'
+    )
+
+    argparser.add_argument(
+        '--corpus', dest='corpus',
+        default=None,
+        help='File of designations, one per line, instead of the '
+             'designations in the database'
+    )
+
+    argparser.add_argument(
+        '--repeat', dest='repeat',
+        type=int, default=5,
+        help='Number of timed passes over the corpus'
+    )
+
+    argparser.add_argument(
+        '--config-file', dest='config_file',
+        default=None,
+        help='Configuration file'
+    )
+
+    args = argparser.parse_args()
+    corpus = loadcorpus(args)
+
+    mismatches = [
+        desig for desig in corpus
+        if bodies.split_body_designation_re(desig)
+        != bodies.split_body_designation(desig)
+    ]
+
+    print(f'{len(corpus)} designations, {len(set(corpus))} distinct, '
+          f'{len(mismatches)} mismatches')
+
+    for desig in mismatches[:10]:
+        print(f'  mismatch: {desig!r}')
+
+    bench('regex', bodies.split_body_designation_re, corpus, args.repeat)
+    bench(
+        'tokenizer',
+        bodies.parse_body_designation,
+        corpus,
+        args.repeat
+    )
+    bench(
+        'codec (cold cache)',
+        bodies.split_body_designation,
+        corpus,
+        args.repeat,
+        bodies.split_body_designation.cache_clear
+    )
+    bench(
+        'codec (warm cache)',
+        bodies.split_body_designation,
+        corpus,
+        args.repeat
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+CREATE TABLE `FileCompressedBlocks` (
+	`FileId` INT(11) NOT NULL,
+	`CompressedBitOffset` BIGINT(20) NOT NULL,
+	`Offset` BIGINT(20) NOT NULL,
+	PRIMARY KEY (`FileId`, `CompressedBitOffset`) USING BTREE
+)
+COLLATE='utf8_general_ci'
+ENGINE=Aria
+ROW_FORMAT=FIXED
+;;
@@ -0,0 +1,11 @@
+CREATE TABLE `FileLineBlocks` (
+	`FileId` INT(11) NOT NULL,
+	`LineNo` INT(11) NOT NULL,
+	`LineCount` INT(11) NOT NULL,
+	`Offset` BIGINT(20) NOT NULL,
+	PRIMARY KEY (`FileId`, `LineNo`) USING BTREE
+)
+COLLATE='utf8_general_ci'
+ENGINE=Aria
+ROW_FORMAT=FIXED
+;;
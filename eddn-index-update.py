@@ -98,6 +98,30 @@ def main():
         help='Skip EDDN processing'
     )
 
+    argparser.add_argument(
+        '--bulk-load', dest='bulk_load',
+        action='store_const', const=True, default=False,
+        help='Load EDDN file line links using the database bulk loader'
+    )
+
+    argparser.add_argument(
+        '--spatial-index', dest='spatial_index',
+        action='store_const', const=True, default=False,
+        help='Find candidate systems using an in-memory spatial index'
+    )
+
+    argparser.add_argument(
+        '--resume', dest='resume',
+        action='store_const', const=True, default=False,
+        help='Resume EDSM/EDDB dump processing from the last checkpoint'
+    )
+
+    argparser.add_argument(
+        '--jobs', dest='jobs',
+        type=int, default=1,
+        help='Number of worker processes for EDDN file processing'
+    )
+
     argparser.add_argument(
         '--process-title-progress', dest='process_title_progress',
         action='store_const', const=True, default=False,
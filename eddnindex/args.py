@@ -75,6 +75,30 @@ class ProcessorArgs(Protocol):
         Skip EDDN processing
     """
 
+    bulk_load: bool
+    """
+    --bulk-load
+        Load EDDN file line links using the database bulk loader
+    """
+
+    spatial_index: bool
+    """
+    --spatial-index
+        Find candidate systems using an in-memory spatial index
+    """
+
+    resume: bool
+    """
+    --resume
+        Resume EDSM/EDDB dump processing from the last checkpoint
+    """
+
+    jobs: int
+    """
+    --jobs
+        Number of worker processes for EDDN file processing
+    """
+
     process_title_progress: bool
     """
     --process-title-progress
@@ -1,5 +1,6 @@
+import functools
 from datetime import datetime
-from typing import Any, Optional, Tuple
+from typing import Any, Iterator, Optional, Tuple
 from collections.abc import MutableMapping as Dict, \
                             MutableSequence as List
 
@@ -8,6 +9,8 @@ from .timer import Timer
 from . import constants
 from . import sqlqueries
 from .database import DBConnection
+from .namedsystems import NamedSystems
+from .namedbodies import NamedBodies
 from .systems import findsystemsbyname
 
 
@@ -96,6 +99,7 @@ def make_body_desig_planet(desig: BodyDesignation,
         make_body_desig_moon1(desig, parts)
 
 
+@functools.lru_cache(maxsize=65536)
 def make_body_designation(desig: BodyDesignation) -> str:
     parts = []
 
@@ -150,6 +154,7 @@ def extract_planet(stars: str,
         else:
             bodycategory = 3
     elif stellarcomet is not None:
+        planet = int(stellarcomet)
         bodycategory = 15
     elif nebula is not None:
         bodycategory = 19
@@ -202,6 +207,7 @@ def extract_moon2(ring2: str,
             bodycategory = 11
         else:
             moon2 = ord(moon2str) - 96
+            moon3 = 0
             bodycategory = 12
     elif ring2 is not None:
         moon2 = ord(ring2) - 64
@@ -239,67 +245,295 @@ def extract_moon3(ring3: str,
     return moon3, bodycategory
 
 
-def split_body_designation(desig: str) -> Optional[BodyDesignation]:
+def body_designation_from_groups(desig: str,
+                                 groups: Dict[str, Optional[str]]
+                                 ) -> BodyDesignation:
+    stars = groups.get('stars')
+    star = 0
+    moon2 = 0
+    moon3 = 0
+
+    planet, moon1, bodycategory = extract_planet(
+        stars,
+        groups.get('nebula'),
+        groups.get('belt'),
+        groups.get('cluster'),
+        groups.get('stellarcomet'),
+        groups.get('planet')
+    )
+
+    if bodycategory == 6:
+        moon1, moon2, bodycategory = extract_moon1(
+            groups.get('planetring'),
+            groups.get('planetcomet'),
+            groups.get('moon1')
+        )
+
+    if bodycategory == 9:
+        moon2, moon3, bodycategory = extract_moon2(
+            groups.get('moon1ring'),
+            groups.get('moon1comet'),
+            groups.get('moon2')
+        )
+
+    if bodycategory == 12:
+        moon3, bodycategory = extract_moon3(
+            groups.get('moon2ring'),
+            groups.get('moon2comet'),
+            groups.get('moon3')
+        )
+
+    if stars is not None:
+        for i in range(ord(stars[0]) - 65, ord(stars[-1]) - 64):
+            star |= 1 << i
+
+    return BodyDesignation(
+        bodycategory,
+        star,
+        planet,
+        moon1,
+        moon2,
+        moon3,
+        False,
+        desig
+    )
+
+
+def split_body_designation_re(desig: str) -> Optional[BodyDesignation]:
     match = constants.procgen_body_name_re.match(desig)
 
     if match:
-        stars = match['stars']
-        nebula = match['nebula']
-        belt = match['belt']
-        cluster = match['cluster']
-        stellarcomet = match['stellarcomet']
-        planetstr = match['planet']
-        ring1 = match['planetring']
-        comet1 = match['planetcomet']
-        moon1str = match['moon1']
-        ring2 = match['moon1ring']
-        comet2 = match['moon1comet']
-        moon2str = match['moon2']
-        ring3 = match['moon2ring']
-        comet3 = match['moon2comet']
-        moon3str = match['moon3']
-
-        star = 0
-        planet = 0
-        moon1 = 0
-        moon2 = 0
-        moon3 = 0
+        return body_designation_from_groups(desig, match.groupdict())
+    else:
+        return None
 
-        planet, moon1, bodycategory = extract_planet(
-            stars, nebula, belt, cluster, stellarcomet, planetstr
-        )
 
-        if bodycategory == 6:
-            moon1, moon2, bodycategory = extract_moon1(
-                ring1, comet1, moon1str
-            )
+def is_number_token(token: str) -> bool:
+    # [1-9][0-9]?
+    return (0 < len(token) <= 2
+            and token[0] in '123456789'
+            and token[-1] in '0123456789')
 
-        if bodycategory == 9:
-            moon2, moon3, bodycategory = extract_moon2(
-                ring2, comet2, moon2str
-            )
 
-        if bodycategory == 12:
-            moon3, bodycategory = extract_moon3(
-                ring3, comet3, moon3str
-            )
+def is_upper_token(token: str) -> bool:
+    return len(token) == 1 and 'A' <= token <= 'Z'
 
-        if stars is not None:
-            for i in range(ord(stars[0]) - 65, ord(stars[-1]) - 64):
-                star |= 1 << i
-
-        return BodyDesignation(
-            bodycategory,
-            star,
-            planet,
-            moon1,
-            moon2,
-            moon3,
-            False,
-            desig
-        )
+
+def is_lower_token(token: str) -> bool:
+    return len(token) == 1 and 'a' <= token <= 'z'
+
+
+def stars_token_mask(token: str) -> Optional[int]:
+    # A?B?C?...O?, excluding the empty string
+    prev = '@'
+
+    for c in token:
+        if c <= prev or c > 'O':
+            return None
+
+        prev = c
+
+    if prev == '@':
+        return None
+
+    return (1 << (ord(prev) - 64)) - (1 << (ord(token[0]) - 65))
+
+
+# Categories of a ring, comet, barycentre or single body at each level
+# below the planet
+body_ring_categories = [0, 7, 10, 13]
+body_comet_categories = [0, 16, 17, 18]
+body_barycentre_categories = [0, 8, 11, 0]
+body_single_categories = [0, 9, 12, 14]
+
+
+def parse_planet_tokens(tokens: List[str]
+                        ) -> Optional[Tuple[int, List[int]]]:
+    token = tokens[0]
+    parts = token.split('+') if '+' in token else [token]
+
+    for part in parts:
+        if not is_number_token(part):
+            return None
+
+    values = [int(parts[0]), 0, 0, 0]
+    category = 6
+    closed = len(parts) != 1
+    pos = 1
+
+    if closed:
+        values[1] = int(parts[-1]) - values[0]
+        category = 5
+
+    # As with the regex, levels below a barycentre are checked but ignored
+    for level in (1, 2, 3):
+        rest = len(tokens) - pos
+
+        if rest == 0:
+            return (category, values)
+
+        token = tokens[pos]
+
+        if rest == 2 and tokens[pos + 1] == 'Ring' and is_upper_token(token):
+            if not closed:
+                values[level] = ord(token) - 64
+                category = body_ring_categories[level]
+
+            return (category, values)
+        elif rest == 2 and token == 'Comet' \
+                and is_number_token(tokens[pos + 1]):
+            if not closed:
+                values[level] = int(tokens[pos + 1])
+                category = body_comet_categories[level]
+
+            return (category, values)
+
+        parts = token.split('+') if level < 3 and '+' in token else [token]
+
+        for part in parts:
+            if not is_lower_token(part):
+                return None
+
+        if not closed:
+            values[level] = ord(parts[0]) - 96
+
+            if len(parts) != 1:
+                values[level + 1] = ord(parts[-1]) - 96 - values[level]
+                category = body_barycentre_categories[level]
+                closed = True
+            else:
+                category = body_single_categories[level]
+
+        pos += 1
+
+    return (category, values) if pos == len(tokens) else None
+
+
+def parse_body_tokens(tokens: List[str]
+                      ) -> Optional[Tuple[int, List[int]]]:
+    if len(tokens) == 0:
+        return (2, [0, 0, 0, 0])
+
+    token = tokens[0]
+
+    if len(tokens) == 1 and token == 'Nebula':
+        return (19, [0, 0, 0, 0])
+    elif token == 'Comet':
+        if len(tokens) == 2 and is_number_token(tokens[1]):
+            return (15, [int(tokens[1]), 0, 0, 0])
+    elif len(tokens) >= 2 and tokens[1] == 'Belt':
+        if not is_upper_token(token):
+            return None
+        elif len(tokens) == 2:
+            return (3, [ord(token) - 64, 0, 0, 0])
+        elif (len(tokens) == 4 and tokens[2] == 'Cluster'
+                and is_number_token(tokens[3])):
+            return (4, [ord(token) - 64, int(tokens[3]), 0, 0])
     else:
+        return parse_planet_tokens(tokens)
+
+    return None
+
+
+def parse_body_designation(desig: str) -> Optional[BodyDesignation]:
+    """
+    Hand-written equivalent of split_body_designation_re.  As with the
+    regex, the first token is only taken as the stars if the rest of the
+    designation cannot be parsed without it.
+    """
+
+    tokens = desig.split(' ')
+
+    if tokens[0] != '':
         return None
+    elif len(tokens) == 1:
+        return BodyDesignation(2, 0, 0, 0, 0, 0, False, desig)
+
+    stars = 0
+    token = tokens[1]
+
+    # Only a belt letter can be taken as either the stars or the start of
+    # the body, so the stars are skipped unless followed by Belt
+    if len(tokens) == 2 or tokens[2] != 'Belt' or len(token) != 1:
+        stars = stars_token_mask(token) or 0
+
+    parsed = parse_body_tokens(tokens[2:] if stars != 0 else tokens[1:])
+
+    if parsed is None:
+        return None
+
+    category, (planet, moon1, moon2, moon3) = parsed
+
+    if category == 2 and len(tokens[1]) > 1:
+        category = 1
+
+    return BodyDesignation(
+        category,
+        stars,
+        planet,
+        moon1,
+        moon2,
+        moon3,
+        False,
+        desig
+    )
+
+
+def generate_common_body_designations() -> Iterator[str]:
+    for stars in ['', ' A', ' B', ' C', ' D', ' AB', ' BC']:
+        yield stars
+
+        for belt in 'ABCD':
+            yield f'{stars} {belt} Belt'
+
+            for cluster in range(1, 21):
+                yield f'{stars} {belt} Belt Cluster {cluster}'
+
+        for planet in range(1, 21):
+            yield f'{stars} {planet}'
+
+            for ring in 'AB':
+                yield f'{stars} {planet} {ring} Ring'
+
+            for moon1 in 'abcdefgh':
+                yield f'{stars} {planet} {moon1}'
+
+                for moon2 in 'abcd':
+                    yield f'{stars} {planet} {moon1} {moon2}'
+
+
+common_body_designations: Optional[Dict[str, BodyDesignation]] = None
+
+
+def get_common_body_designations() -> Dict[str, BodyDesignation]:
+    global common_body_designations
+
+    if common_body_designations is None:
+        common_body_designations = {}
+
+        for desig in generate_common_body_designations():
+            bodydesig = parse_body_designation(desig)
+
+            if bodydesig is not None:
+                common_body_designations[desig] = bodydesig
+
+    return common_body_designations
+
+
+@functools.lru_cache(maxsize=65536)
+def split_body_designation(desig: str) -> Optional[BodyDesignation]:
+    """
+    Parses a designation, giving the same result as the regex in
+    split_body_designation_re.  Common designations are looked up in a
+    precomputed table, and others parsed by parse_body_designation.
+    """
+
+    bodydesig = get_common_body_designations().get(desig)
+
+    if bodydesig is not None:
+        return bodydesig
+
+    return parse_body_designation(desig)
 
 
 def get_body_designation(conn: DBConnection,
@@ -458,7 +692,7 @@ def add_named_body(conn: DBConnection,
 def get_error_data(conn: DBConnection,
                    name: str,
                    sysname: str,
-                   namedsystems: Dict[str, List[EDDNSystem]],
+                   namedsystems: NamedSystems,
                    regions: Dict[str, EDDNRegion],
                    dbrows: List[EDDNBody]
                    ) -> Tuple[None, str, List[Any]]:
@@ -608,16 +842,16 @@ def getbody(conn: DBConnection,
             system: EDDNSystem,
             body: Dict[str, Any],
             timestamp: datetime,
-            namedbodies: Dict[int, Dict[str, List[EDDNBody]]],
+            namedbodies: NamedBodies,
             knownbodies: Dict[str, Dict[str, List[KnownBody]]],
             bodydesigs: Dict[str, Tuple[int, BodyDesignation]],
-            namedsystems: Dict[str, List[EDDNSystem]],
+            namedsystems: NamedSystems,
             regions: Dict[str, EDDNRegion]
             ):
-    if system.id in namedbodies and name in namedbodies[system.id]:
-        timer.time('bodyquery', 0)
-        nrows = namedbodies[system.id][name]
+    nrows = namedbodies.get(system.id, name)
 
+    if nrows is not None:
+        timer.time('bodyquery', 0)
         nrows = filter_bodies(name, sysname, bodyid, body, timestamp, nrows)
 
         timer.time('bodylookupname')
@@ -689,27 +923,34 @@ def getbody(conn: DBConnection,
         if len(frows) > 0:
             return get_reject_data(dbrows, 'Body Mismatch')
 
-        if ispgname and desigid is not None:
-            bodydata = add_procgen_body(
-                conn, timer, name, sysname, bodyid,
-                system, body, bodydesig, desigid
-            )
-
-            return (
-                bodydata,
-                None,
-                None
-            )
-
         if ((not ispgname and constants.procgen_sysname_re.match(name))
                 or desigid is None):
             return get_error_data(
                 conn, name, sysname, namedsystems, regions, dbrows
             )
 
-        bodydata = add_named_body(
-            conn, name, sysname, bodyid, system, bodydesig, desigid, body
-        )
+        with conn.creating() as shared:
+            if shared:
+                # Another worker may have added the body since it
+                # was looked up above
+                dbrows = get_bodies_by_name(conn, system.id, name)
+                dbrows = filter_bodies(
+                    name, sysname, bodyid, body, timestamp, dbrows
+                )
+
+                if len(dbrows) == 1:
+                    return (dbrows[0], None, None)
+
+            if ispgname:
+                bodydata = add_procgen_body(
+                    conn, timer, name, sysname, bodyid,
+                    system, body, bodydesig, desigid
+                )
+            else:
+                bodydata = add_named_body(
+                    conn, name, sysname, bodyid, system,
+                    bodydesig, desigid, body
+                )
 
         return (
             bodydata,
@@ -0,0 +1,262 @@
+import os
+import tempfile
+from datetime import datetime
+from typing import IO, Any, Optional, Tuple
+from collections.abc import Sequence, MutableSequence as List, \
+                            MutableMapping as Dict
+
+from .database import DBConnection, SQLQuery
+
+
+def format_value(value: Any) -> str:
+    if value is None:
+        return '\\N'
+    elif isinstance(value, bool):
+        return '1' if value else '0'
+    elif isinstance(value, datetime):
+        return value.isoformat(' ')
+    elif isinstance(value, str):
+        return (value.replace('\\', '\\\\')
+                     .replace('\t', '\\t')
+                     .replace('\n', '\\n'))
+    else:
+        return str(value)
+
+
+class BulkLoader(object):
+    """
+    Stages rows for a table and loads them using the native bulk loader
+    of the database:
+        mysql: LOAD DATA LOCAL INFILE from a tab-separated staging file
+        pgsql: COPY FROM STDIN from a tab-separated staging file
+        others: executemany of all staged rows in a single transaction
+    """
+
+    table: str
+    columns: Sequence[str]
+    bit_columns: Sequence[str]
+    insert_query: SQLQuery
+    staging_dir: str
+    rowcount: int
+
+    def __init__(self,
+                 table: str,
+                 columns: Sequence[str],
+                 insert_query: SQLQuery,
+                 staging_dir: str,
+                 bit_columns: Sequence[str] = ()
+                 ):
+        self.table = table
+        self.columns = columns
+        self.bit_columns = bit_columns
+        self.insert_query = insert_query
+        self.staging_dir = staging_dir
+        self.rowcount = 0
+        self._file: Optional[IO[str]] = None
+        self._filename: Optional[str] = None
+        self._pid = os.getpid()
+        self._rows: List[Sequence] = []
+
+    def add(self, conn: DBConnection, rows: Sequence[Sequence]):
+        if self._pid != os.getpid():
+            # Forked worker - staged rows belong to the parent
+            self._pid = os.getpid()
+            self._file = None
+            self._filename = None
+            self._rows = []
+            self.rowcount = 0
+
+        if conn.dialect in ['mysql', 'pgsql']:
+            if self._file is None:
+                os.makedirs(self.staging_dir, exist_ok=True)
+                fd, self._filename = tempfile.mkstemp(
+                    dir=self.staging_dir,
+                    prefix=f'{self.table}-',
+                    suffix='.tsv'
+                )
+                self._file = open(fd, 'w+', encoding='utf-8', newline='\n')
+
+            self._file.writelines(
+                '\t'.join([format_value(v) for v in row]) + '\n'
+                for row in rows
+            )
+        else:
+            self._rows.extend(rows)
+
+        self.rowcount += len(rows)
+
+    def flush(self, conn: DBConnection):
+        if self.rowcount == 0:
+            return
+
+        cursor = conn.cursor()
+
+        if self._file is not None:
+            self._file.flush()
+
+            if conn.dialect == 'mysql':
+                self._load_data(conn, cursor)
+            else:
+                self._file.seek(0)
+                cursor.copy_expert(
+                    f'COPY {self.table} ({", ".join(self.columns)}) '
+                    'FROM STDIN',
+                    self._file
+                )
+
+            self.close()
+        else:
+            conn.executemany(cursor, self.insert_query, self._rows)
+            self._rows = []
+
+        self.rowcount = 0
+
+    def _load_data(self, conn: DBConnection, cursor: Any):
+        # BIT columns cannot be loaded directly from text
+        columns = [
+            f'@{col}' if col in self.bit_columns else col
+            for col in self.columns
+        ]
+
+        query = (
+            f'LOAD DATA LOCAL INFILE %s INTO TABLE {self.table} '
+            'CHARACTER SET utf8 '
+            "FIELDS TERMINATED BY '\\t' "
+            "LINES TERMINATED BY '\\n' "
+            f'({", ".join(columns)})'
+        )
+
+        if len(self.bit_columns) != 0:
+            query += ' SET ' + ', '.join(
+                f'{col} = CAST(@{col} AS UNSIGNED)'
+                for col in self.bit_columns
+            )
+
+        if conn.paramstyle == 'qmark':
+            query = query.replace('%s', '?')
+
+        cursor.execute(query, (self._filename,))
+
+    def close(self):
+        if self._file is not None and self._pid == os.getpid():
+            self._file.close()
+            os.remove(self._filename)
+
+        self._file = None
+        self._filename = None
+
+
+class BulkUpserter(object):
+    """
+    Buffers rows to be inserted or updated in a table and writes them as
+    multi-row upserts in the native syntax of the database:
+        mysql: INSERT ... ON DUPLICATE KEY UPDATE
+        pgsql, sqlite3: INSERT ... ON CONFLICT DO UPDATE
+        mssql: MERGE
+    Only the last row buffered for each key is written.
+    """
+
+    table: str
+    key_columns: Sequence[str]
+    columns: Sequence[str]
+    batch_rows: int
+    rows: Dict[Tuple, Sequence]
+
+    def __init__(self,
+                 table: str,
+                 key_columns: Sequence[str],
+                 columns: Sequence[str],
+                 batch_rows: int = 1000
+                 ):
+        self.table = table
+        self.key_columns = key_columns
+        self.columns = list(key_columns) + list(columns)
+        self.batch_rows = batch_rows
+        self.rows = {}
+        self._keylen = len(key_columns)
+        self._queries: Dict[Tuple[str, int], SQLQuery] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, row: Sequence):
+        """
+        Buffers a row of the key columns followed by the other columns
+        """
+
+        self.rows[tuple(row[:self._keylen])] = row
+
+    def get_query(self, conn: DBConnection, rowcount: int) -> SQLQuery:
+        query = self._queries.get((conn.dialect, rowcount))
+
+        if query is not None:
+            return query
+
+        columns = ', '.join(self.columns)
+        values = ', '.join(
+            ['(' + ', '.join(['%s'] * len(self.columns)) + ')'] * rowcount
+        )
+        others = self.columns[self._keylen:]
+
+        if conn.dialect == 'mysql':
+            query = SQLQuery(
+                f'INSERT INTO {self.table} ({columns}) VALUES {values} '
+                'ON DUPLICATE KEY UPDATE '
+                + ', '.join(f'{col} = VALUES({col})' for col in others)
+            )
+        elif conn.dialect == 'mssql':
+            query = SQLQuery(
+                f'MERGE INTO {self.table} AS t '
+                f'USING (VALUES {values}) AS s ({columns}) ON '
+                + ' AND '.join(f't.{col} = s.{col}'
+                               for col in self.key_columns)
+                + ' WHEN MATCHED THEN UPDATE SET '
+                + ', '.join(f'{col} = s.{col}' for col in others)
+                + f' WHEN NOT MATCHED THEN INSERT ({columns}) VALUES ('
+                + ', '.join(f's.{col}' for col in self.columns)
+                + ');'
+            )
+        else:
+            query = SQLQuery(
+                f'INSERT INTO {self.table} ({columns}) VALUES {values} '
+                f'ON CONFLICT ({", ".join(self.key_columns)}) DO UPDATE SET '
+                + ', '.join(f'{col} = excluded.{col}' for col in others)
+            )
+
+        self._queries[(conn.dialect, rowcount)] = query
+        return query
+
+    def flush(self, conn: DBConnection):
+        if len(self.rows) == 0:
+            return
+
+        rows = list(self.rows.values())
+        batch_rows = self.batch_rows
+
+        if conn.dialect == 'mssql':
+            # SQL Server allows at most 2100 parameters per statement
+            batch_rows = min(batch_rows, 2000 // len(self.columns))
+
+        i = 0
+
+        while i < len(rows):
+            # Partial batches are split into powers of two, so that only a
+            # few distinct statements are prepared.  Rows cannot be padded
+            # as a key may only be upserted once per statement.
+            count = len(rows) - i
+
+            if count < batch_rows:
+                count = 1 << (count.bit_length() - 1)
+            else:
+                count = batch_rows
+
+            batch = rows[i:i + count]
+            query = self.get_query(conn, count)
+            conn.execute(
+                conn.query_cursor(query),
+                query,
+                tuple(v for row in batch for v in row)
+            )
+            i += count
+
+        self.rows = {}
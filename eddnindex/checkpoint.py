@@ -0,0 +1,109 @@
+import os
+import os.path
+import json
+from typing import Any, Optional, Tuple
+from collections.abc import MutableMapping as Dict
+
+
+class Checkpoint(object):
+    """
+    Position reached in a dump file, saved whenever the id cache used to
+    skip already processed lines is flushed, so that an interrupted pass
+    can be resumed from the last saved line rather than from the start.
+
+    A checkpoint is only used if the dump file has the same path, size
+    and modification time, and the id cache the same generation, as when
+    the checkpoint was saved.  The checkpoint is saved while the id cache
+    is flushed, before its new generation is recorded, so the previously
+    saved position is kept alongside the new one in case the flush is
+    interrupted.
+    """
+
+    filename: str
+
+    def __init__(self, filename: str):
+        self.filename = filename
+
+    @staticmethod
+    def _identity(dumpfile: str) -> Dict[str, Any]:
+        statinfo = os.stat(dumpfile)
+
+        return {
+            'path': os.path.abspath(dumpfile),
+            'size': statinfo.st_size,
+            'mtime_ns': statinfo.st_mtime_ns
+        }
+
+    def load(self,
+             dumpfile: str,
+             generation: str
+             ) -> Optional[Tuple[int, int]]:
+        """
+        Returns the (line number, uncompressed offset) of the next line to
+        be processed, or None if there is no usable checkpoint.
+        """
+
+        if generation == '':
+            return None
+
+        checkpoint = self._read()
+
+        if (checkpoint is None
+                or checkpoint['dump'] != self._identity(dumpfile)):
+            return None
+
+        try:
+            for entry in checkpoint['positions']:
+                if entry['generation'] == generation:
+                    return (int(entry['lineno']), int(entry['offset']))
+        except (ValueError, TypeError, KeyError):
+            pass
+
+        return None
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.filename, 'rt', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+
+            if (not isinstance(checkpoint, dict)
+                    or 'dump' not in checkpoint
+                    or not isinstance(checkpoint.get('positions'), list)):
+                return None
+
+            return checkpoint
+        except (OSError, ValueError):
+            return None
+
+    def save(self,
+             dumpfile: str,
+             generation: str,
+             lineno: int,
+             offset: int
+             ):
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+
+        identity = self._identity(dumpfile)
+        previous = self._read()
+        positions = [{
+            'generation': generation,
+            'lineno': lineno,
+            'offset': offset
+        }]
+
+        if previous is not None and previous['dump'] == identity:
+            positions += previous['positions'][:1]
+
+        checkpoint = {
+            'dump': identity,
+            'positions': positions
+        }
+
+        with open(self.filename + '.tmp', 'wt', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+
+        os.rename(self.filename + '.tmp', self.filename)
+
+    def clear(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
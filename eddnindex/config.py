@@ -12,6 +12,7 @@ class DatabaseConfig(object):
     DatabaseName: str
     Username: str
     Password: str
+    PreparedStatements: bool
 
     def load(self, config: Dict[str, str]):
         self.ConnectionType = config['ConnectionType']
@@ -19,6 +20,10 @@ class DatabaseConfig(object):
         self.DatabaseName = config['DatabaseName']
         self.Username = config['Username']
         self.Password = config['Password']
+        self.PreparedStatements = config.get(
+            'PreparedStatements',
+            'false'
+        ).lower() in ('1', 'yes', 'true', 'on')
 
 
 class Config(object):
@@ -71,6 +76,27 @@ class Config(object):
     # Used by EDDNSysDB.saveedsmbodycache
     edsm_bodies_cache_file: str
 
+    # Used by loading.loadeddbsystems
+    # Used by EDDNSysDB.saveeddbsyscache
+    eddb_systems_cache_file: str
+
+    # Used by processing.main for EDDNSysDB.enablebulkload
+    bulk_load_dir: str
+
+    # Used by processing.main for EDDNSysDB.enablespatialindex
+    systems_spatial_index_file: str
+
+    # Used by processing.main for ResponseCache
+    edsm_api_cache_dir: str
+
+    # Used by processing.main for EDDNSysDB
+    startup_snapshot_file: str
+
+    # Used by processing.edsmsystems.process
+    # Used by processing.edsmbodies.process
+    # Used by processing.eddbsystems.process
+    checkpoint_dir: str
+
     # Used by processing.main for EDDNRejectData
     eddn_reject_dir: str
 
@@ -92,9 +118,36 @@ class Config(object):
     # Used by loading.loadknownbodies
     known_bodies_sheet_uri: str
 
+    # Used by loading.loadknownbodies
+    known_bodies_snapshot_file: str
+
+    # Used by loading.loadknownbodies
+    known_bodies_max_age: float
+
+    # Used by processing.main for EDSMClient
+    edsm_api_base_url: str
+
     # Used by processing.eddnjournalfile.process_event
     allow_3_0_3_bodies: bool
 
+    # Used by processing.main for EDDNSysDB
+    system_cache_size: int
+
+    # Used by processing.main for EDDNSysDB
+    system_cache_ttl: float
+
+    # Used by processing.main for EDDNSysDB
+    system_cache_negative_ttl: float
+
+    # Used by processing.main for EDSMClient
+    edsm_api_concurrency: int
+
+    # Used by processing.main for ResponseCache
+    edsm_api_cache_ttl: float
+
+    # Used by processing.main for ResponseCache
+    edsm_api_cache_size: int
+
     def load(self,
              config_filename: str,
              override_config_filename: Union[str, None] = None
@@ -224,6 +277,62 @@ class Config(object):
             )
         )
 
+        self.eddb_systems_cache_file = cache.get(
+            'EDDBSystems',
+            os.path.join(
+                cache_dir,
+                'eddbsys-index-update-syscache.bin'
+            )
+        )
+
+        self.bulk_load_dir = cache.get(
+            'BulkLoad',
+            os.path.join(
+                cache_dir,
+                'bulkload'
+            )
+        )
+
+        self.systems_spatial_index_file = cache.get(
+            'SystemsSpatialIndex',
+            os.path.join(
+                cache_dir,
+                'systems-spatialindex'
+            )
+        )
+
+        self.known_bodies_snapshot_file = cache.get(
+            'KnownBodies',
+            os.path.join(
+                cache_dir,
+                'knownbodies.tsv'
+            )
+        )
+
+        self.edsm_api_cache_dir = cache.get(
+            'EDSMAPI',
+            os.path.join(
+                cache_dir,
+                'edsmapi'
+            )
+        )
+
+        self.startup_snapshot_file = cache.get(
+            'StartupSnapshot',
+            os.path.join(
+                cache_dir,
+                'startup-snapshot.pickle'
+            )
+        )
+
+        self.checkpoint_dir = cache.get(
+            'Checkpoints',
+            os.path.join(
+                cache_dir,
+                'checkpoints'
+            )
+        )
+
         self.eddn_reject_dir = rejects.get(
             'EDDN',
             os.path.join(
@@ -277,7 +386,47 @@ class Config(object):
             'https://docs.google.com/spreadsheets/d/e/2PACX-1vR9lEav_Bs8rZGRtwcwuOwQ2hIoiNJ_PWYAEgXk7E3Y-UD0r6uER04y4VoQxFAAdjMS4oipPyySoC3t/pub?gid=711269421&single=true&output=tsv'  # noqa: E501
         )
 
+        self.edsm_api_base_url = urls.get(
+            'EDSMAPI',
+            'https://www.edsm.net'
+        )
+
         self.allow_3_0_3_bodies = options.getboolean(
             'Allow-3.0.3-Bodies',
             True
         )
+
+        self.system_cache_size = options.getint(
+            'System-Cache-Size',
+            262144
+        )
+
+        self.system_cache_ttl = options.getfloat(
+            'System-Cache-TTL',
+            0
+        )
+
+        self.system_cache_negative_ttl = options.getfloat(
+            'System-Cache-Negative-TTL',
+            600
+        )
+
+        self.known_bodies_max_age = options.getfloat(
+            'Known-Bodies-Max-Age',
+            86400
+        )
+
+        self.edsm_api_concurrency = options.getint(
+            'EDSM-API-Concurrency',
+            4
+        )
+
+        self.edsm_api_cache_ttl = options.getfloat(
+            'EDSM-API-Cache-TTL',
+            604800
+        )
+
+        self.edsm_api_cache_size = options.getint(
+            'EDSM-API-Cache-Size',
+            1073741824
+        )
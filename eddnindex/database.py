@@ -1,6 +1,9 @@
+import sys
 from .config import DatabaseConfig
+from contextlib import contextmanager
 from typing import Protocol, Union, Any, Optional, Callable
-from collections.abc import Mapping, Iterator, Sequence
+from collections.abc import Mapping, Iterator, Sequence, \
+                            MutableMapping as Dict
 
 
 class DBCursor(Protocol):
@@ -43,7 +46,27 @@ class DBConnection(object):
     dialect: str
     conn: Any
 
-    def open(self, config: DatabaseConfig):
+    # Shared between worker processes by processing.workerpool
+    # Serializes creation of systems, bodies, stations, factions etc.
+    create_lock: Any
+
+    # Use server-side prepared statements for the per-query cursors
+    prepare_statements: bool
+
+    # Resolved SQL and reusable cursor of each SQLQuery executed
+    query_strings: Dict['SQLQuery', str]
+    query_cursors: Dict['SQLQuery', DBCursor]
+
+    statement_count: int
+    round_trip_count: int
+
+    def open(self, config: DatabaseConfig, local_infile: bool = False):
+        self.create_lock = None
+        self.prepare_statements = False
+        self.query_strings = {}
+        self.query_cursors = {}
+        self.statement_count = 0
+        self.round_trip_count = 0
         self.streaming_cursor_args = []
         self.streaming_cursor_kwargs = {}
         self.prepared_cursor_args = []
@@ -56,10 +79,13 @@ class DBConnection(object):
                     user=config.Username,
                     host=config.Hostname,
                     password=config.Password,
-                    database=config.DatabaseName
+                    database=config.DatabaseName,
+                    allow_local_infile=local_infile
             )
             self.conn.set_charset_collation('utf8')
             self.prepared_cursor_kwargs['prepared'] = True
+            # Only mysql.connector has server-side prepared cursors
+            self.prepare_statements = config.PreparedStatements
             self.paramstyle = mysql.connector.paramstyle
             self.dialect = 'mysql'
         elif config.ConnectionType == 'mysqlclient':
@@ -70,7 +96,8 @@ class DBConnection(object):
                     host=config.Hostname,
                     password=config.Password,
                     database=config.DatabaseName,
-                    charset='utf8'
+                    charset='utf8',
+                    local_infile=local_infile
             )
             self.streaming_cursor_args = [MySQLdb.cursors.SSCursor]
             self.prepared_cursor_args = [MySQLdb.cursors.SSCursor]
@@ -83,7 +110,8 @@ class DBConnection(object):
                     user=config.Username,
                     host=config.Hostname,
                     password=config.Password,
-                    database=config.DatabaseName
+                    database=config.DatabaseName,
+                    local_infile=local_infile
             )
             self.streaming_cursor_args = [pymysql.cursors.SSCursor]
             self.prepared_cursor_args = [pymysql.cursors.SSCursor]
@@ -138,17 +166,37 @@ class DBConnection(object):
         else:
             return self.conn.cursor()
 
+    def query_cursor(self, query: 'SQLQuery') -> DBCursor:
+        # The cursor is reused for every execution of the query, so its
+        # results must be consumed before the query is executed again
+        cursor = self.query_cursors.get(query)
+
+        if cursor is None:
+            cursor = self.cursor(prepared=self.prepare_statements)
+            self.query_cursors[query] = cursor
+
+        return cursor
+
+    def get_query_string(self, query: Union[str, 'SQLQuery']) -> str:
+        if isinstance(query, str):
+            return query
+
+        query_string = self.query_strings.get(query)
+
+        if query_string is None:
+            query_string = query.get_query(self)
+            self.query_strings[query] = query_string
+
+        return query_string
+
     def execute(self,
                 cursor: DBCursor,
                 query: Union[str, 'SQLQuery'],
                 params: Sequence = None
                 ) -> DBCursor:
-        if isinstance(query, SQLQuery):
-            query_string = query.get_query(self)
-        else:
-            query_string = query
-
-        cursor.execute(query_string, params)
+        cursor.execute(self.get_query_string(query), params)
+        self.statement_count += 1
+        self.round_trip_count += 1
         return cursor
 
     def executemany(self,
@@ -156,12 +204,9 @@ class DBConnection(object):
                     query: Union[str, 'SQLQuery'],
                     params: Sequence[Sequence]
                     ) -> DBCursor:
-        if isinstance(query, SQLQuery):
-            query_string = query.get_query(self)
-        else:
-            query_string = query
-
-        cursor.executemany(query_string, params)
+        cursor.executemany(self.get_query_string(query), params)
+        self.statement_count += len(params)
+        self.round_trip_count += 1
         return cursor
 
     def execute_identity(self,
@@ -169,19 +214,41 @@ class DBConnection(object):
                          query: Union[str, 'SQLQuery'],
                          params: Sequence
                          ) -> int:
+        cursor.execute(self.get_query_string(query), params)
+        self.statement_count += 1
+        self.round_trip_count += 1
+
         if isinstance(query, SQLQuery):
-            query_string = query.get_query(self)
-            cursor.execute(query_string, params)
             return query.get_last_row_id(self, cursor)
         else:
-            query_string = query
-            cursor.execute(query_string, params)
             return cursor.lastrowid
 
     def commit(self):
         self.conn.commit()
 
+    @contextmanager
+    def creating(self) -> Iterator[bool]:
+        # Yields True if other processes may be creating rows concurrently,
+        # in which case the caller must look the row up again before
+        # inserting it.  The transaction is committed on entry so that the
+        # lookup sees rows committed by other processes, and on exit so
+        # that the new row is visible to them before the lock is released.
+        if self.create_lock is None:
+            yield False
+        else:
+            with self.create_lock:
+                self.commit()
+                yield True
+                self.commit()
+
+    def printstats(self):
+        sys.stderr.write(
+            f'\nSQL statements: {self.statement_count} '
+            f'in {self.round_trip_count} round trips\n'
+        )
+
     def close(self):
+        self.query_cursors = {}
         self.conn.close()
 
 
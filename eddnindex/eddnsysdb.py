@@ -1,11 +1,8 @@
-import os
-import os.path
 import sys
 import json
-from functools import lru_cache
 from datetime import datetime
-from typing import Any, Optional, Tuple, Union
-from collections.abc import MutableSequence as List, \
+from typing import Any, Callable, Optional, Tuple, Union
+from collections.abc import Sequence, MutableSequence as List, \
                             MutableMapping as Dict
 
 import numpy
@@ -13,7 +10,8 @@ import numpy.typing
 import numpy.core.records
 
 from . import loading
-from .types import BodyDesignation, EDDNSystem, EDDNBody, EDDNFaction, \
+from . import snapshot
+from .types import BodyDesignation, EDDNSystem, EDDNFaction, \
                    EDDNFile, EDSMFile, EDDNRegion, EDDNStation, \
                    DTypeEDSMSystem, DTypeEDDBSystem, DTypeEDSMBody, \
                    KnownBody, NPTypeEDSMBody
@@ -22,7 +20,14 @@ from . import constants
 from .util import from_db_string
 from . import sqlqueries
 from .database import DBConnection
-from .systems import getsystem
+from .namedsystems import NamedSystems
+from .namedbodies import NamedBodies
+from .bulkload import BulkLoader, BulkUpserter
+from .idcache import IdCache
+from .systems import getsystem, getsystems, round_starpos, \
+                     pgnames_to_modsysaddrs
+from .systemcache import SystemCache
+from .spatialindex import SpatialIndex
 from .stations import getstation
 from .bodies import getbody
 
@@ -31,18 +36,22 @@ class EDDNSysDB(object):
     conn: DBConnection
     regions: Dict[str, EDDNRegion]
     regionaddrs: Dict[int, EDDNRegion]
-    namedsystems: Dict[str, List[EDDNSystem]]
-    namedbodies: Dict[int, Dict[str, List[EDDNBody]]]
+    namedsystems: NamedSystems
+    namedbodies: NamedBodies
     parentsets: Dict[Tuple[int, str], int]
     bodydesigs: Dict[str, Tuple[int, BodyDesignation]]
     software: Dict[str, int]
     factions: Dict[str, List[EDDNFaction]]
-    edsmsysids: numpy.core.records.recarray
-    edsmbodyids: numpy.core.records.recarray
-    eddbsysids: numpy.core.records.recarray
-    edsmsyscachefile: str
-    edsmbodycachefile: str
+    edsmsyscache: IdCache
+    edsmbodycache: IdCache
+    eddbsyscache: IdCache
+    systemcache: SystemCache
+    spatialindex: Optional[SpatialIndex]
     knownbodies: Dict[str, Dict[str, List[KnownBody]]]
+    bulkloaders: Optional[Dict[str, BulkLoader]]
+    bulkloadrows: int
+    pendingfileinfo: List[Tuple[int, int, int, int, int, int, int]]
+    upserters: Dict[str, BulkUpserter]
 
     def __init__(self,
                  conn: DBConnection,
@@ -51,73 +60,189 @@ class EDDNSysDB(object):
                  loadeddbsys: bool,
                  edsm_systems_cache_file: str,
                  edsm_bodies_cache_file: str,
-                 known_bodies_sheet_uri: str
+                 eddb_systems_cache_file: str,
+                 known_bodies_sheet_uri: str,
+                 known_bodies_snapshot_file: str,
+                 known_bodies_max_age: float,
+                 system_cache_size: int = 262144,
+                 system_cache_ttl: float = 0,
+                 system_cache_negative_ttl: float = 600,
+                 startup_snapshot_file: Optional[str] = None
                  ):
         timer = Timer()
 
         try:
             self.conn = conn
+            self.bulkloaders = None
+            self.bulkloadrows = 0
+            self.pendingfileinfo = []
+            self.spatialindex = None
+            self.upserters = {
+                'Systems_EDSM': BulkUpserter(
+                    'Systems_EDSM',
+                    ['EdsmId'],
+                    ['Id', 'TimestampSeconds', 'HasCoords', 'IsHidden',
+                     'IsDeleted']
+                ),
+                'SystemBodies_EDSM': BulkUpserter(
+                    'SystemBodies_EDSM',
+                    ['EdsmId'],
+                    ['Id', 'TimestampSeconds']
+                ),
+                'Stations_EDSM': BulkUpserter(
+                    'Stations_EDSM',
+                    ['Id'],
+                    ['EdsmStationId', 'Timestamp']
+                ),
+                'Systems_EDDB': BulkUpserter(
+                    'Systems_EDDB',
+                    ['EddbId'],
+                    ['Id', 'TimestampSeconds']
+                )
+            }
+            self.systemcache = SystemCache(
+                system_cache_size,
+                system_cache_ttl,
+                system_cache_negative_ttl
+            )
 
-            self.edsmsysids = numpy.empty(
-                0,
+            self.edsmsyscache = IdCache(
+                edsm_systems_cache_file,
                 DTypeEDSMSystem
-            ).view(numpy.core.records.recarray)
+            )
 
-            self.edsmbodyids = numpy.empty(
-                0,
+            self.edsmbodycache = IdCache(
+                edsm_bodies_cache_file,
                 DTypeEDSMBody
-            ).view(numpy.core.records.recarray)
+            )
 
-            self.eddbsysids = numpy.empty(
-                0,
+            self.eddbsyscache = IdCache(
+                eddb_systems_cache_file,
                 DTypeEDDBSystem
-            ).view(numpy.core.records.recarray)
-
-            self.edsmsyscachefile = edsm_systems_cache_file
-            self.edsmbodycachefile = edsm_bodies_cache_file
+            )
 
-            (self.regions, self.regionaddrs) = loading.loadregions(conn, timer)
-            self.namedsystems = loading.loadnamedsystems(conn, timer)
-            self.namedbodies = loading.loadnamedbodies(conn, timer)
-            self.parentsets = loading.loadparentsets(conn, timer)
-            self.software = loading.loadsoftware(conn, timer)
-            self.bodydesigs = loading.loadbodydesigs(conn, timer)
-            self.factions = loading.loadfactions(conn, timer)
+            tables = snapshot.loadtables(conn, timer, startup_snapshot_file)
+            (self.regions, self.regionaddrs) = tables['regions']
+            self.namedsystems = tables['namedsystems']
+            self.namedbodies = tables['namedbodies']
+            self.parentsets = tables['parentsets']
+            self.software = tables['software']
+            self.bodydesigs = tables['bodydesigs']
+            self.factions = tables['factions']
 
             self.knownbodies = loading.loadknownbodies(
                 conn,
                 timer,
                 self.bodydesigs,
-                known_bodies_sheet_uri
+                known_bodies_sheet_uri,
+                known_bodies_snapshot_file,
+                known_bodies_max_age
             )
 
             if loadedsmsys or loadedsmbodies:
-                self.edsmsysids = loading.loadedsmsystems(
-                    conn,
-                    timer,
-                    self.edsmsyscachefile
-                )
+                loading.loadedsmsystems(conn, timer, self.edsmsyscache)
 
             if loadedsmbodies:
-                self.edsmbodyids = loading.loadedsmbodies(
-                    conn,
-                    timer,
-                    self.edsmbodycachefile
-                )
+                loading.loadedsmbodies(conn, timer, self.edsmbodycache)
 
             if loadeddbsys:
-                self.eddbsysids = loading.loadeddbsystems(
-                    conn,
-                    timer
-                )
+                loading.loadeddbsystems(conn, timer, self.eddbsyscache)
 
         finally:
             timer.printstats()
 
+    @property
+    def edsmsysids(self) -> numpy.core.records.recarray:
+        return self.edsmsyscache.records
+
+    @property
+    def edsmbodyids(self) -> numpy.core.records.recarray:
+        return self.edsmbodycache.records
+
+    @property
+    def eddbsysids(self) -> numpy.core.records.recarray:
+        return self.eddbsyscache.records
+
     def commit(self):
+        if (self.bulkloaders is not None
+                and any(loader.rowcount >= self.bulkloadrows
+                        for loader in self.bulkloaders.values())):
+            self.flushbulkload()
+
+        self.flushupserts()
         self.conn.commit()
 
-    @lru_cache(maxsize=262144)
+    def flushupserts(self):
+        for upserter in self.upserters.values():
+            upserter.flush(self.conn)
+
+    def enablebulkload(self, staging_dir: str, rows: int = 1000000):
+        self.bulkloadrows = rows
+        self.bulkloaders = {
+            'FileLineInfo': BulkLoader(
+                'FileLineInfo',
+                [
+                    'FileId',
+                    'LineNo',
+                    'Timestamp',
+                    'GatewayTimestamp',
+                    'SoftwareId',
+                    'SystemId',
+                    'BodyId',
+                    'LineLength',
+                    'DistFromArrivalLS',
+                    'HasBodyId',
+                    'HasSystemAddress',
+                    'HasMarketId'
+                ],
+                sqlqueries.query_insert_file_line_info,
+                staging_dir,
+                ['HasBodyId', 'HasSystemAddress', 'HasMarketId']
+            ),
+            'FileLineStations': BulkLoader(
+                'FileLineStations',
+                ['FileId', 'LineNo', 'StationId'],
+                sqlqueries.query_insert_file_line_stations,
+                staging_dir
+            ),
+            'FileLineFactions': BulkLoader(
+                'FileLineFactions',
+                ['FileId', 'LineNo', 'FactionId', 'EntryNum'],
+                sqlqueries.query_insert_file_line_factions,
+                staging_dir
+            )
+        }
+
+    def enablespatialindex(self, cache_file: str):
+        timer = Timer()
+
+        try:
+            self.spatialindex = SpatialIndex()
+            self.spatialindex.load(self.conn, timer, cache_file)
+        finally:
+            timer.printstats()
+
+    def flushbulkload(self):
+        if self.bulkloaders is not None:
+            for loader in self.bulkloaders.values():
+                loader.flush(self.conn)
+
+            # Files are only marked as processed once their lines are loaded
+            for params in self.pendingfileinfo:
+                sqlqueries.update_file_info(self.conn, params)
+
+            self.pendingfileinfo = []
+            self.conn.commit()
+
+    def closebulkload(self):
+        if self.bulkloaders is not None:
+            self.flushbulkload()
+
+            for loader in self.bulkloaders.values():
+                loader.close()
+
+            self.bulkloaders = None
+
     def getsystem(self,
                   timer: Timer,
                   sysname: str,
@@ -127,7 +252,16 @@ class EDDNSysDB(object):
                   sysaddr: Optional[int]
                   ) -> Union[Tuple[EDDNSystem, None, None],
                              Tuple[None, str, dict]]:
-        return getsystem(
+        key = (sysname, round_starpos(x, y, z), sysaddr)
+        result = self.systemcache.get(key)
+
+        if result is not None:
+            timer.time('syscachehit')
+            return result
+
+        timer.time('syscachemiss')
+
+        result = getsystem(
             self.conn,
             timer,
             sysname,
@@ -137,9 +271,71 @@ class EDDNSysDB(object):
             sysaddr,
             self.namedsystems,
             self.regions,
-            self.regionaddrs
+            self.regionaddrs,
+            self.spatialindex
         )
 
+        if result[0] is not None and self.spatialindex is not None:
+            self.spatialindex.add(result[0])
+
+        self.systemcache.put(key, result)
+        return result
+
+    def getsystems(self,
+                   timer: Timer,
+                   batch: Sequence[Tuple[str,
+                                         Optional[Sequence[float]],
+                                         Optional[int]]]
+                   ) -> List[Union[Tuple[EDDNSystem, None, None],
+                                   Tuple[None, str, dict]]]:
+        results: List[Optional[Union[Tuple[EDDNSystem, None, None],
+                                     Tuple[None, str, dict]]]] = []
+        keys = []
+        misses = []
+
+        for sysname, starpos, sysaddr in batch:
+            if starpos is not None:
+                key = (sysname, round_starpos(*starpos), sysaddr)
+            else:
+                key = (sysname, None, sysaddr)
+
+            result = self.systemcache.get(key)
+
+            if result is None:
+                misses.append(len(results))
+
+            keys.append(key)
+            results.append(result)
+
+        timer.time('syscachehit', len(batch) - len(misses))
+
+        if len(misses) != 0:
+            resolved = getsystems(
+                self.conn,
+                timer,
+                [batch[i] for i in misses],
+                self.namedsystems,
+                self.regions,
+                self.regionaddrs,
+                self.spatialindex
+            )
+
+            for i, result in zip(misses, resolved):
+                if result[0] is not None and self.spatialindex is not None:
+                    self.spatialindex.add(result[0])
+
+                self.systemcache.put(keys[i], result)
+                results[i] = result
+
+            timer.time('syscachemiss', len(misses))
+
+        return results
+
+    def pgnames_to_modsysaddrs(self,
+                               sysnames: Sequence[str]
+                               ) -> numpy.typing.NDArray[numpy.int64]:
+        return pgnames_to_modsysaddrs(self.regions, sysnames)
+
     def getstation(self,
                    timer: Timer,
                    name: str,
@@ -182,10 +378,22 @@ class EDDNSysDB(object):
             parentjson = json.dumps(parents)
 
             if (bodyid, parentjson) not in self.parentsets:
-                rowid = sqlqueries.insert_parent_set(
-                    self.conn,
-                    (bodyid, parentjson)
-                )
+                with self.conn.creating() as shared:
+                    row = None
+
+                    if shared:
+                        row = sqlqueries.get_parent_set(
+                            self.conn,
+                            (bodyid, parentjson)
+                        )
+
+                    if row is not None:
+                        rowid = row[0]
+                    else:
+                        rowid = sqlqueries.insert_parent_set(
+                            self.conn,
+                            (bodyid, parentjson)
+                        )
 
                 self.parentsets[(bodyid, parentjson)] = rowid
 
@@ -198,10 +406,22 @@ class EDDNSysDB(object):
 
     def insertsoftware(self, softwarename: str):
         if softwarename not in self.software:
-            self.software[softwarename] = sqlqueries.insert_software(
-                self.conn,
-                (softwarename,)
-            )
+            with self.conn.creating() as shared:
+                row = None
+
+                if shared:
+                    row = sqlqueries.get_software_by_name(
+                        self.conn,
+                        (softwarename,)
+                    )
+
+                if row is not None:
+                    self.software[softwarename] = row[0]
+                else:
+                    self.software[softwarename] = sqlqueries.insert_software(
+                        self.conn,
+                        (softwarename,)
+                    )
 
     def insertedsmfile(self, filename: str):
         return sqlqueries.insert_edsm_file(self.conn, (filename,))
@@ -252,10 +472,28 @@ class EDDNSysDB(object):
         if allegiance is None:
             return None
 
-        factionid = sqlqueries.insert_faction(
-            self.conn,
-            (name, government, allegiance)
-        )
+        with self.conn.creating() as shared:
+            if shared:
+                # Another worker may have added the faction
+                factions = [
+                    EDDNFaction(row[0], row[1], row[2], row[3])
+                    for row in sqlqueries.get_factions_by_name(
+                        self.conn,
+                        (name,)
+                    )
+                ]
+
+                self.factions[name] = factions
+
+                for faction in factions:
+                    if (faction.government == government
+                            and faction.allegiance in [allegiance]):
+                        return faction
+
+            factionid = sqlqueries.insert_faction(
+                self.conn,
+                (name, government, allegiance)
+            )
 
         faction = EDDNFaction(factionid, name, government, allegiance)
 
@@ -314,15 +552,20 @@ class EDDNSysDB(object):
         else:
             return (None, None, None)
 
-    def saveedsmsyscache(self):
-        with open(self.edsmsyscachefile + '.tmp', 'wb') as f:
-            self.edsmsysids.tofile(f)
-        os.rename(self.edsmsyscachefile + '.tmp', self.edsmsyscachefile)
+    def saveedsmsyscache(self,
+                         onflush: Optional[Callable[[str], None]] = None
+                         ):
+        self.edsmsyscache.flush(onflush)
+
+    def saveedsmbodycache(self,
+                          onflush: Optional[Callable[[str], None]] = None
+                          ):
+        self.edsmbodycache.flush(onflush)
 
-    def saveedsmbodycache(self):
-        with open(self.edsmbodycachefile + '.tmp', 'wb') as f:
-            self.edsmbodyids.tofile(f)
-        os.rename(self.edsmbodycachefile + '.tmp', self.edsmbodycachefile)
+    def saveeddbsyscache(self,
+                         onflush: Optional[Callable[[str], None]] = None
+                         ):
+        self.eddbsyscache.flush(onflush)
 
     def updateedsmsysid(self,
                         edsmid: int,
@@ -335,57 +578,43 @@ class EDDNSysDB(object):
         if type(ts) is datetime:
             ts = int((ts - constants.timestamp_base_date).total_seconds())
 
-        sqlqueries.upsert_edsm_system(
-            self.conn,
-            (
-                edsmid,
-                sysid,
-                ts,
-                1 if hascoords else 0,
-                1 if ishidden else 0,
-                1 if isdeleted else 0,
-                sysid,
-                ts,
-                1 if hascoords else 0,
-                1 if ishidden else 0,
-                1 if isdeleted else 0
-            )
-        )
+        self.upserters['Systems_EDSM'].add((
+            edsmid,
+            sysid,
+            ts,
+            1 if hascoords else 0,
+            1 if ishidden else 0,
+            1 if isdeleted else 0
+        ))
+
+        rec = self.edsmsyscache.update(edsmid)
 
-        if edsmid < len(self.edsmsysids):
-            rec = self.edsmsysids[edsmid]
+        if rec is not None:
             rec[0] = sysid
             rec[1] = edsmid
             rec[2] = ts
             rec[3] = 1 if hascoords else 0
             rec[4] = 1 if ishidden else 0
             rec[5] = 1 if isdeleted else 0
-            return rec
-        else:
-            return None
+
+        return rec
 
     def updateedsmbodyid(self, bodyid: int, edsmid: int, ts: datetime):
         tssec = int((ts - constants.timestamp_base_date).total_seconds())
 
-        sqlqueries.upsert_edsm_body(
-            self.conn,
-            (edsmid, bodyid, ts, bodyid, ts)
-        )
+        self.upserters['SystemBodies_EDSM'].add((edsmid, bodyid, tssec))
+
+        rec = self.edsmbodycache.update(edsmid)
 
-        if edsmid < len(self.edsmbodyids):
-            rec = self.edsmbodyids[edsmid]
+        if rec is not None:
             rec[0] = bodyid
             rec[1] = edsmid
             rec[2] = tssec
-            return rec
-        else:
-            return None
+
+        return rec
 
     def updateedsmstationid(self, edsmid: int, stationid: int, ts: datetime):
-        sqlqueries.upsert_edsm_station(
-            self.conn,
-            (edsmid, stationid, ts, stationid, ts)
-        )
+        self.upserters['Stations_EDSM'].add((stationid, edsmid, ts))
 
     def findeddbsysid(self, eddbid: int):
         if len(self.eddbsysids) > eddbid:
@@ -402,31 +631,46 @@ class EDDNSysDB(object):
             return (None, None)
 
     def updateeddbsysid(self, eddbid: int, sysid: int, ts: int):
-        sqlqueries.upsert_eddb_system(
-            self.conn,
-            (eddbid, sysid, ts, sysid, ts)
-        )
+        self.upserters['Systems_EDDB'].add((eddbid, sysid, ts))
+
+        rec = self.eddbsyscache.update(eddbid)
+
+        if rec is not None:
+            rec[0] = sysid
+            rec[1] = eddbid
+            rec[2] = ts
 
     def addfilelinestations(self,
                             linelist: List[Tuple[int, int, EDDNStation]]
                             ):
         values = [(fileid, lineno, station.id)
                   for fileid, lineno, station in linelist]
-        sqlqueries.insert_file_line_stations(self.conn, values)
+
+        if self.bulkloaders is not None:
+            self.bulkloaders['FileLineStations'].add(self.conn, values)
+        else:
+            sqlqueries.insert_file_line_stations(self.conn, values)
 
     def addfilelineinfo(self,
                         linelist: List[Tuple[
                             int, int, datetime, datetime, int, int,
                             int, int, float, int, int, int
                         ]]):
-        sqlqueries.insert_file_line_info(self.conn, linelist)
+        if self.bulkloaders is not None:
+            self.bulkloaders['FileLineInfo'].add(self.conn, linelist)
+        else:
+            sqlqueries.insert_file_line_info(self.conn, linelist)
 
     def addfilelinefactions(self,
                             linelist: List[Tuple[int, int, EDDNFaction, int]]
                             ):
         values = [(fileid, lineno, faction.id, entrynum)
                   for fileid, lineno, faction, entrynum in linelist]
-        sqlqueries.insert_file_line_factions(self.conn, values)
+
+        if self.bulkloaders is not None:
+            self.bulkloaders['FileLineFactions'].add(self.conn, values)
+        else:
+            sqlqueries.insert_file_line_factions(self.conn, values)
 
     def addfilelineroutesystems(self,
                                 linelist: List[
@@ -472,6 +716,38 @@ class EDDNSysDB(object):
 
         return lines
 
+    def getfilelineblocks(self, fileid: int) -> List[Tuple[int, int, int]]:
+        rows = sqlqueries.get_file_line_blocks_by_file(self.conn, (fileid,))
+        return [(row[0], row[1], row[2]) for row in rows]
+
+    def getfilecompressedblocks(self, fileid: int) -> Dict[int, int]:
+        rows = sqlqueries.get_file_compressed_blocks_by_file(
+            self.conn,
+            (fileid,)
+        )
+        return {row[0]: row[1] for row in rows}
+
+    def updatefileblocks(self,
+                         fileid: int,
+                         lineblocks: List[Tuple[int, int, int]],
+                         compressedblocks: Optional[Dict[int, int]]
+                         ):
+        sqlqueries.delete_file_line_blocks(self.conn, (fileid,))
+        sqlqueries.delete_file_compressed_blocks(self.conn, (fileid,))
+
+        sqlqueries.insert_file_line_blocks(
+            self.conn,
+            [(fileid, lineno, count, offset)
+             for lineno, count, offset in lineblocks]
+        )
+
+        if compressedblocks is not None and len(compressedblocks) != 0:
+            sqlqueries.insert_file_compressed_blocks(
+                self.conn,
+                [(fileid, bitoffset, offset)
+                 for bitoffset, offset in compressedblocks.items()]
+            )
+
     def getedsmbodyfilelines(self, fileid: int):
         maxline = sqlqueries.get_max_edsm_body_file_lineno(
             self.conn,
@@ -566,19 +842,22 @@ class EDDNSysDB(object):
                        stnlinecount: int,
                        navroutesystemcount: int
                        ):
-        sqlqueries.update_file_info(
-            self.conn,
-            (
-                linecount,
-                comprsize,
-                totalsize,
-                poplinecount,
-                stnlinecount,
-                navroutesystemcount,
-                fileid
-            )
+        params = (
+            linecount,
+            comprsize,
+            totalsize,
+            poplinecount,
+            stnlinecount,
+            navroutesystemcount,
+            fileid
         )
 
+        # Deferred until the file's staged line rows have been loaded
+        if self.bulkloaders is not None:
+            self.pendingfileinfo.append(params)
+        else:
+            sqlqueries.update_file_info(self.conn, params)
+
     def updateedsmfileinfo(self,
                            fileid: int,
                            linecount: int,
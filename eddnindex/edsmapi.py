@@ -0,0 +1,343 @@
+import os
+import os.path
+import time
+import json
+import random
+import hashlib
+import threading
+import http.client
+import urllib.request
+import urllib.error
+import urllib.parse
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple, \
+                   TypeVar
+from collections.abc import MutableMapping as Dict
+
+
+T = TypeVar('T')
+
+RequestErrors = (OSError, http.client.HTTPException, ValueError)
+
+
+class RateLimiter(object):
+    """
+    Token bucket shared by all requests to the API.
+
+    The bucket is refilled at the rate allowed by the X-Rate-Limit-Remaining
+    and X-Rate-Limit-Reset headers of the last response, but never slower
+    than one request per max_interval seconds, and holds at most burst
+    tokens.
+    """
+
+    rate: float
+    burst: float
+    max_interval: float
+    tokens: float
+
+    def __init__(self,
+                 rate: float = 1.0,
+                 burst: float = 4,
+                 max_interval: float = 30
+                 ):
+        self.rate = rate
+        self.burst = burst
+        self.max_interval = max_interval
+        self.tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(
+            self.burst,
+            self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+    def update(self, remaining: int, reset: float):
+        with self._lock:
+            self._refill(time.monotonic())
+
+            if reset > 0:
+                rate = max(remaining, 1) / reset
+            else:
+                rate = self.burst
+
+            self.rate = max(rate, 1 / self.max_interval)
+            self.tokens = min(self.tokens, remaining)
+
+
+class ResponseCache(object):
+    """
+    On-disk cache of API responses, stored in files named by the SHA-256
+    hash of the request URL.
+
+    Responses older than ttl seconds (0 for no expiry) are not used.  When
+    the total size of the cached responses exceeds max_size bytes, the
+    least recently stored responses are removed until it is below 90% of
+    max_size.
+    """
+
+    directory: str
+    ttl: float
+    max_size: int
+    hits: int
+    misses: int
+
+    def __init__(self, directory: str, ttl: float, max_size: int):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key[:2], key)
+
+    def _entries(self) -> Iterator[Tuple[str, os.stat_result]]:
+        if not os.path.isdir(self.directory):
+            return
+
+        for subdir in os.scandir(self.directory):
+            if subdir.is_dir():
+                for entry in os.scandir(subdir.path):
+                    if entry.is_file() and not entry.name.endswith('.tmp'):
+                        yield (entry.path, entry.stat())
+
+    def get(self, url: str) -> Optional[bytes]:
+        path = self._path(url)
+
+        try:
+            if (self.ttl <= 0
+                    or os.path.getmtime(path) + self.ttl > time.time()):
+                with open(path, 'rb') as f:
+                    data = f.read()
+
+                self.hits += 1
+                return data
+        except OSError:
+            pass
+
+        self.misses += 1
+        return None
+
+    def put(self, url: str, data: bytes):
+        path = self._path(url)
+        tmppath = f'{path}.{threading.get_ident()}.tmp'
+
+        try:
+            oldsize = os.path.getsize(path)
+        except OSError:
+            oldsize = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(tmppath, 'wb') as f:
+            f.write(data)
+
+        os.replace(tmppath, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(st.st_size for _, st in self._entries())
+            else:
+                self._size += len(data) - oldsize
+
+            if self._size > self.max_size:
+                self._prune()
+
+    def _prune(self):
+        entries = sorted(self._entries(), key=lambda e: e[1].st_mtime)
+        size = sum(st.st_size for _, st in entries)
+
+        for path, st in entries:
+            if size <= self.max_size * 0.9:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+            size -= st.st_size
+
+        self._size = size
+
+
+class EDSMClient(object):
+    """
+    Client for the EDSM API.
+
+    Requests are run on a pool of concurrency threads, so that callers can
+    keep several requests in flight while processing earlier responses.
+    All requests are rate limited by a shared RateLimiter driven by the
+    X-Rate-Limit-* response headers, and failed requests are retried with
+    exponential backoff before the last error is raised.  Responses to
+    requests made with cache set are served from and stored in the
+    response cache if one is given.  Requests whose responses decide
+    whether something has been deleted, such as get_system, are never
+    served from the cache.
+    """
+
+    base_url: str
+    concurrency: int
+    max_retries: int
+    backoff: float
+    max_backoff: float
+    timeout: float
+    limiter: RateLimiter
+    cache: Optional[ResponseCache]
+
+    def __init__(self,
+                 base_url: str = 'https://www.edsm.net',
+                 concurrency: int = 4,
+                 max_retries: int = 8,
+                 backoff: float = 1,
+                 max_backoff: float = 60,
+                 timeout: float = 60,
+                 cache: Optional[ResponseCache] = None
+                 ):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.limiter = RateLimiter(burst=concurrency)
+        self.cache = cache
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def _update_limits(self, headers: Any):
+        try:
+            remaining = int(headers['X-Rate-Limit-Remaining'])
+            reset = float(headers['X-Rate-Limit-Reset'])
+        except (KeyError, TypeError, ValueError):
+            return
+
+        self.limiter.update(remaining, reset)
+
+    def _delay(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def get(self,
+            path: str,
+            params: Dict[str, Any],
+            cache: bool = False
+            ) -> Any:
+        """
+        Requests an API endpoint, returning the decoded JSON response.
+        The response cache is only used if cache is set.
+        """
+
+        url = f'{self.base_url}/{path}?{urllib.parse.urlencode(params)}'
+        attempt = 0
+
+        if cache and self.cache is not None:
+            data = self.cache.get(url)
+
+            if data is not None:
+                try:
+                    return json.loads(data)
+                except ValueError:
+                    pass
+
+        while True:
+            self.limiter.acquire()
+
+            try:
+                with urllib.request.urlopen(url, timeout=self.timeout) as f:
+                    self._update_limits(f.info())
+                    data = f.read()
+                    msg = json.loads(data)
+            except urllib.error.HTTPError as e:
+                self._update_limits(e.headers)
+
+                if ((e.code != 429 and e.code < 500)
+                        or attempt >= self.max_retries):
+                    raise
+            except RequestErrors:
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                if cache and self.cache is not None:
+                    self.cache.put(url, data)
+
+                return msg
+
+            time.sleep(self._delay(attempt))
+            attempt += 1
+
+    def pipeline(self,
+                 func: Callable[[T], Any],
+                 items: Iterable[T]
+                 ) -> Iterator[Tuple[T, Future]]:
+        """
+        Runs func on each item on the request threads, yielding each item
+        and the future for its result in order.  At most twice concurrency
+        items are in flight ahead of the item being yielded.
+        """
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.concurrency,
+                thread_name_prefix='EDSMClient'
+            )
+
+        pending: deque[Tuple[T, Future]] = deque()
+
+        for item in items:
+            pending.append((item, self._executor.submit(func, item)))
+
+            if len(pending) >= self.concurrency * 2:
+                yield pending.popleft()
+
+        while len(pending) != 0:
+            yield pending.popleft()
+
+    def get_system(self, edsmid: int) -> Any:
+        return self.get('api-v1/system', {
+            'systemId': edsmid,
+            'coords': 1,
+            'showId': 1,
+            'submitted': 1,
+            'includeHidden': 1
+        })
+
+    def get_body(self, edsmid: int) -> Any:
+        return self.get('api-body-v1/get', {'id': edsmid}, cache=True)
+
+    def get_system_bodies(self, edsmsysid: int) -> Any:
+        return self.get(
+            'api-system-v1/bodies',
+            {'systemId': edsmsysid},
+            cache=True
+        )
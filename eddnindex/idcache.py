@@ -0,0 +1,249 @@
+import os
+import os.path
+import time
+import struct
+from typing import Any, Callable, Optional
+from collections.abc import MutableSet as Set
+
+import numpy
+import numpy.typing
+import numpy.core.records
+
+
+# Generation of the flushed state that a journal restores
+journal_header_size = 32
+journal_recid_struct = struct.Struct('<Q')
+
+
+class IdCache(object):
+    """
+    Records indexed by id, backed by a memory-mapped cache file.
+
+    The cache file is mapped in place rather than read into memory, and
+    flushing writes back only the pages that have been modified.  The file
+    is grown in chunks of records as ids beyond its end are updated.
+
+    Each flush records a new generation in a file alongside the cache
+    file, identifying the flushed state of the cache.  Before a record is
+    first updated after a flush, its flushed contents are appended to a
+    journal file tagged with that generation, so that the modifications
+    left behind by an interrupted run can be undone when the cache is next
+    opened, restoring the last flushed state.  Records written directly
+    rather than through update() are not journaled.
+    """
+
+    filename: str
+    dtype: numpy.dtype
+    chunk_size: int
+    records: numpy.core.records.recarray
+    generation: str
+
+    def __init__(self,
+                 filename: str,
+                 dtype: numpy.typing.DTypeLike,
+                 chunk_size: int = 1048576
+                 ):
+        self.filename = filename
+        self.dtype = numpy.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.records = numpy.empty(
+            0,
+            self.dtype
+        ).view(numpy.core.records.recarray)
+        self.generation = ''
+        self._mmap: Optional[numpy.memmap] = None
+        self._path = filename
+        self._journal: Optional[int] = None
+        self._journaled: Set[int] = set()
+
+    @property
+    def journalfile(self) -> str:
+        return self.filename + '.journal'
+
+    @property
+    def generationfile(self) -> str:
+        return self.filename + '.gen'
+
+    @property
+    def isopen(self) -> bool:
+        return self._mmap is not None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _map(self, count: int):
+        if self._mmap is not None:
+            self._mmap.flush()
+
+        with open(self._path, 'r+b') as f:
+            if os.fstat(f.fileno()).st_size < count * self.dtype.itemsize:
+                f.truncate(count * self.dtype.itemsize)
+
+        self._mmap = numpy.memmap(
+            self._path,
+            dtype=self.dtype,
+            mode='r+',
+            shape=(count,)
+        )
+
+        self.records = self._mmap.view(numpy.core.records.recarray)
+
+    def open(self, maxid: int) -> bool:
+        """
+        Maps an existing cache file, returning False if it does not
+        exist or does not cover maxid.  Modifications made since the
+        cache was last flushed are undone first.
+        """
+
+        if not os.path.exists(self.filename):
+            return False
+
+        self._path = self.filename
+        self.generation = ''
+
+        if os.path.exists(self.generationfile):
+            with open(self.generationfile, 'r', encoding='utf-8') as f:
+                self.generation = f.read().strip()
+
+        self._rollback()
+
+        size = os.path.getsize(self.filename)
+        count = size // self.dtype.itemsize
+
+        if size % self.dtype.itemsize != 0 or count <= maxid:
+            return False
+
+        if count < maxid + self.chunk_size // 2:
+            count = maxid + self.chunk_size
+
+        self._map(count)
+        return True
+
+    def _rollback(self):
+        if not os.path.exists(self.journalfile):
+            return
+
+        with open(self.journalfile, 'rb') as f:
+            journal = f.read()
+
+        header = self.generation.encode('ascii').ljust(journal_header_size)
+
+        if journal[:journal_header_size] == header:
+            entrysize = 8 + self.dtype.itemsize
+
+            with open(self.filename, 'r+b') as f:
+                for pos in range(journal_header_size,
+                                 len(journal) - entrysize + 1,
+                                 entrysize):
+                    recid, = journal_recid_struct.unpack_from(journal, pos)
+                    f.seek(recid * self.dtype.itemsize)
+                    f.write(journal[pos + 8:pos + entrysize])
+
+        os.remove(self.journalfile)
+
+    def create(self, count: int):
+        """
+        Creates an empty cache in a temporary file, which replaces the
+        cache file when it is first flushed.
+        """
+
+        self.close()
+        self._path = self.filename + '.tmp'
+
+        with open(self._path, 'wb'):
+            pass
+
+        self._map(count)
+
+    def _savejournal(self, recid: int):
+        if self._path != self.filename or recid in self._journaled:
+            return
+
+        if self._journal is None:
+            self._journal = os.open(
+                self.journalfile,
+                os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(
+                    os, 'O_BINARY', 0
+                )
+            )
+
+            os.write(
+                self._journal,
+                self.generation.encode('ascii').ljust(journal_header_size)
+            )
+
+        # Written unbuffered, so that the journal entry is never lost while
+        # the modified record is kept in the mapped pages
+        os.write(
+            self._journal,
+            journal_recid_struct.pack(recid) + self.records[recid].tobytes()
+        )
+
+        self._journaled.add(recid)
+
+    def _closejournal(self):
+        if self._journal is not None:
+            os.close(self._journal)
+            self._journal = None
+
+    def update(self, recid: int) -> Optional[Any]:
+        """
+        Returns the record for recid for updating, growing the cache if
+        necessary, or None if the cache is not open.
+        """
+
+        if self._mmap is None:
+            return None
+
+        if recid >= len(self.records):
+            self._map(recid + self.chunk_size)
+
+        self._savejournal(recid)
+        return self.records[recid]
+
+    def flush(self, onflush: Optional[Callable[[str], None]] = None):
+        """
+        Writes back the modified pages and records a new generation.
+        onflush is called with the new generation once the pages have
+        been written, before the generation is recorded.
+        """
+
+        if self._mmap is None:
+            return
+
+        self._mmap.flush()
+
+        generation = str(time.time_ns())
+
+        if onflush is not None:
+            onflush(generation)
+
+        if self._path != self.filename:
+            os.rename(self._path, self.filename)
+            self._path = self.filename
+
+        with open(self.generationfile + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(generation)
+
+        os.rename(self.generationfile + '.tmp', self.generationfile)
+        self.generation = generation
+
+        # The journal is tagged with the previous generation, so it is no
+        # longer used even if it cannot be removed here
+        self._closejournal()
+        self._journaled = set()
+
+        if os.path.exists(self.journalfile):
+            os.remove(self.journalfile)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.flush()
+
+        self._closejournal()
+        self._journaled = set()
+        self._mmap = None
+        self.records = numpy.empty(
+            0,
+            self.dtype
+        ).view(numpy.core.records.recarray)
@@ -0,0 +1,175 @@
+import json
+from typing import IO, Any, Iterator, Tuple, Union
+from collections.abc import MutableMapping as Dict, Sequence
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+
+DecodeErrors = (ValueError, TypeError, OverflowError, json.JSONDecodeError)
+
+_simdjson_parser: Any = None
+
+
+def loads(line: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            # orjson rejects some input that json accepts (e.g. NaN),
+            # so let json decide whether it is invalid
+            pass
+
+    return json.loads(line)
+
+
+def _materialize(value: Any) -> Any:
+    if isinstance(value, simdjson.Object):
+        return value.as_dict()
+    elif isinstance(value, simdjson.Array):
+        return value.as_list()
+    else:
+        return value
+
+
+def _select(obj: Any, fields: Sequence[str]) -> Dict[str, Any]:
+    if simdjson is not None and isinstance(obj, simdjson.Object):
+        return {k: _materialize(obj[k]) for k in fields if k in obj}
+    else:
+        return {k: obj[k] for k in fields if k in obj}
+
+
+def extract(line: Union[bytes, str],
+            header_fields: Sequence[str],
+            message_fields: Sequence[str]
+            ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Decodes only the requested fields from the header and message
+    of an EDDN message.  Fields not present in the message are absent
+    from the returned dicts.  When simdjson is available the fields that
+    are not requested are never converted to Python objects.
+    """
+
+    global _simdjson_parser
+
+    if simdjson is not None:
+        if _simdjson_parser is None:
+            _simdjson_parser = simdjson.Parser()
+
+        if isinstance(line, str):
+            line = line.encode('utf-8')
+
+        try:
+            msg = _simdjson_parser.parse(line)
+        except (ValueError, RuntimeError):
+            msg = loads(line)
+    else:
+        msg = loads(line)
+
+    return (
+        _select(msg['header'], header_fields),
+        _select(msg['message'], message_fields)
+    )
+
+
+class JSONArrayReader(object):
+    """
+    Reads the elements of a top-level JSON array from a text file one at a
+    time, holding only a chunk of the file and the current element in
+    memory rather than the whole array.
+    """
+
+    f: IO[str]
+    chunk_size: int
+
+    def __init__(self, f: IO[str], chunk_size: int = 1048576):
+        self.f = f
+        self.chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+
+        data = self.f.read(self.chunk_size)
+
+        if data == '':
+            self._eof = True
+            return False
+
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def _next_char(self) -> str:
+        while True:
+            buf = self._buf
+            pos = self._pos
+
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+
+            self._pos = pos
+
+            if pos < len(buf):
+                return buf[pos]
+            elif not self._fill():
+                raise ValueError('Unexpected end of JSON array')
+
+    def _decode(self) -> Any:
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+            else:
+                buf = self._buf
+                pos = end
+
+                while pos < len(buf) and buf[pos] in ' \t\r\n':
+                    pos += 1
+
+                # A value not followed by a delimiter (e.g. a number cut
+                # short at the end of the buffer) may continue in the next
+                # chunk
+                if (pos < len(buf) and buf[pos] in ',]') or not self._fill():
+                    self._pos = end
+                    return value
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._next_char() != '[':
+            raise ValueError('Expected JSON array')
+
+        self._pos += 1
+
+        if self._next_char() == ']':
+            return
+
+        while True:
+            self._next_char()
+            yield self._decode()
+
+            c = self._next_char()
+            self._pos += 1
+
+            if c == ']':
+                return
+            elif c != ',':
+                raise ValueError(
+                    f'Expected , or ] in JSON array, found {c!r}'
+                )
+
+
+def iter_array(f: IO[str], chunk_size: int = 1048576) -> Iterator[Any]:
+    return iter(JSONArrayReader(f, chunk_size))
@@ -1,138 +1,110 @@
 import os
 import os.path
 import sys
+import json
+import time
+import pickle
+import hashlib
+import http.client
 import urllib.request
 import urllib.error
-from typing import Tuple
-from collections.abc import MutableSequence as List, \
+from typing import Any, Optional, Tuple
+from collections.abc import Sequence, MutableSequence as List, \
                             MutableMapping as Dict
 
-import numpy
-import numpy.typing
-import numpy.core.records
-
 from eddnindex.bodies import get_body_designation
 
-from .types import BodyDesignation, EDDNSystem, EDDNBody, EDDNFaction, \
-                   EDDNRegion, DTypeEDSMSystem, \
-                   DTypeEDDBSystem, DTypeEDSMBody, KnownBody
+from .types import BodyDesignation, EDDNFaction, \
+                   EDDNRegion, KnownBody
 from .timer import Timer
 from . import sqlqueries
 from .database import DBConnection
+from .idcache import IdCache
+from .namedsystems import NamedSystems
+from .namedbodies import NamedBodies
 
 
 def loadedsmsystems(conn: DBConnection,
                     timer: Timer,
-                    edsmsyscachefile: str
-                    ) -> numpy.core.records.recarray:
-    maxedsmsysid = sqlqueries.get_max_edsm_system_id(conn, None)
-    edsmsysids: numpy.core.records.recarray = numpy.empty(
-        0,
-        DTypeEDSMSystem
-    ).view(numpy.core.records.recarray)
+                    edsmsyscache: IdCache
+                    ):
+    maxedsmsysid = sqlqueries.get_max_edsm_system_id(conn, None) or 0
 
     timer.time('sql')
 
+    sys.stderr.write('Loading EDSM System IDs\n')
+
+    if edsmsyscache.open(maxedsmsysid):
+        timer.time('loadedsmsys', len(edsmsyscache))
+        return
+
+    edsmsyscache.create(maxedsmsysid + edsmsyscache.chunk_size)
+    edsmsysarray = edsmsyscache.records
+
     if maxedsmsysid:
-        sys.stderr.write('Loading EDSM System IDs\n')
-        if os.path.exists(edsmsyscachefile):
-            with open(edsmsyscachefile, 'rb') as f:
-                edsmsysarray = numpy.fromfile(f, dtype=DTypeEDSMSystem)
-
-            if len(edsmsysarray) > maxedsmsysid:
-                if len(edsmsysarray) < maxedsmsysid + 524288:
-                    edsmsysarray = numpy.resize(
-                        edsmsysarray,
-                        maxedsmsysid + 1048576
-                    )
-                edsmsysids = edsmsysarray.view(
-                    numpy.core.records.recarray
-                )
+        c = sqlqueries.get_edsm_systems(conn, None)
 
-            timer.time('loadedsmsys', len(edsmsysarray))
+        timer.time('sql')
 
-        if len(edsmsysids) == 0:
-            c = sqlqueries.get_edsm_systems(conn, None)
+        i = 0
+        maxedsmid = 0
+        while True:
+            rows = c.fetchmany(10000)
+            timer.time('sqledsmsys', len(rows))
+            if len(rows) == 0:
+                break
+            for row in rows:
+                edsmid = row[1]
+                rec = edsmsysarray[edsmid]
+                rec[0] = row[0]
+                rec[1] = edsmid
+                rec[2] = row[2]
+                rec[3] = 1 if row[3] == b'\x01' else 0
+                rec[4] = 1 if row[4] == b'\x01' else 0
+                rec[5] = 1 if row[5] == b'\x01' else 0
+                rec[6] = 3
+                i += 1
 
-            edsmsysarray = numpy.zeros(
-                maxedsmsysid + 1048576,
-                dtype=DTypeEDSMSystem
-            )
+                if edsmid > maxedsmid:
+                    maxedsmid = edsmid
 
-            edsmsysids = edsmsysarray.view(
-                numpy.core.records.recarray
-            )
+            sys.stderr.write('.')
 
-            timer.time('sql')
-
-            i = 0
-            maxedsmid = 0
-            while True:
-                rows = c.fetchmany(10000)
-                timer.time('sqledsmsys', len(rows))
-                if len(rows) == 0:
-                    break
-                for row in rows:
-                    edsmid = row[1]
-                    rec = edsmsysarray[edsmid]
-                    rec[0] = row[0]
-                    rec[1] = edsmid
-                    rec[2] = row[2]
-                    rec[3] = 1 if row[3] == b'\x01' else 0
-                    rec[4] = 1 if row[4] == b'\x01' else 0
-                    rec[5] = 1 if row[5] == b'\x01' else 0
-                    rec[6] = 3
-                    i += 1
-
-                    if edsmid > maxedsmid:
-                        maxedsmid = edsmid
-
-                sys.stderr.write('.')
-
-                if (i % 640000) == 0:
-                    sys.stderr.write(
-                        f'  {i} / {maxedsmsysid} ({maxedsmid})\n'
-                    )
-
-                sys.stderr.flush()
-                timer.time('loadedsmsys', len(rows))
-
-            sys.stderr.write(
-                f'  {i} / {maxedsmsysid}\n'
-            )
+            if (i % 640000) == 0:
+                sys.stderr.write(
+                    f'  {i} / {maxedsmsysid} ({maxedsmid})\n'
+                )
 
-            with open(edsmsyscachefile + '.tmp', 'wb') as f:
-                edsmsysids.tofile(f)
+            sys.stderr.flush()
+            timer.time('loadedsmsys', len(rows))
 
-            os.rename(
-                edsmsyscachefile + '.tmp',
-                edsmsyscachefile
-            )
+        sys.stderr.write(
+            f'  {i} / {maxedsmsysid}\n'
+        )
 
-    return edsmsysids
+    edsmsyscache.flush()
 
 
 def loadeddbsystems(conn: DBConnection,
-                    timer: Timer
-                    ) -> numpy.core.records.recarray:
-    maxeddbsysid = sqlqueries.get_max_eddb_system_id(conn, None)
-    eddbsysids: numpy.core.records.recarray = numpy.empty(
-        0,
-        DTypeEDDBSystem
-    ).view(numpy.core.records.recarray)
+                    timer: Timer,
+                    eddbsyscache: IdCache
+                    ):
+    maxeddbsysid = sqlqueries.get_max_eddb_system_id(conn, None) or 0
 
     timer.time('sql')
 
+    sys.stderr.write('Loading EDDB System IDs\n')
+
+    if eddbsyscache.open(maxeddbsysid):
+        timer.time('loadeddbsys', len(eddbsyscache))
+        return
+
+    eddbsyscache.create(maxeddbsysid + eddbsyscache.chunk_size)
+    eddbsysarray = eddbsyscache.records
+
     if maxeddbsysid:
-        sys.stderr.write('Loading EDDB System IDs\n')
         c = sqlqueries.get_eddb_systems(conn, None)
 
-        eddbsysarray = numpy.zeros(
-            maxeddbsysid + 1048576,
-            dtype=DTypeEDDBSystem
-        )
-
-        eddbsysids = eddbsysarray.view(numpy.core.records.recarray)
         timer.time('sql')
 
         i = 0
@@ -167,90 +139,67 @@ def loadeddbsystems(conn: DBConnection,
             f'  {i} / {maxeddbsysid}\n'
         )
 
-    return eddbsysids
+    eddbsyscache.flush()
 
 
 def loadedsmbodies(conn: DBConnection,
                    timer: Timer,
-                   edsmbodycachefile: str
-                   ) -> numpy.core.records.recarray:
-    maxedsmbodyid = sqlqueries.get_max_edsm_body_id(conn, None)
-    edsmbodyids = numpy.empty(
-        0,
-        DTypeEDSMBody
-    ).view(numpy.core.records.recarray)
+                   edsmbodycache: IdCache
+                   ):
+    maxedsmbodyid = sqlqueries.get_max_edsm_body_id(conn, None) or 0
 
     timer.time('sql')
 
-    if maxedsmbodyid:
-        sys.stderr.write('Loading EDSM Body IDs\n')
-        if os.path.exists(edsmbodycachefile):
-            with open(edsmbodycachefile, 'rb') as f:
-                edsmbodyarray = numpy.fromfile(f, dtype=DTypeEDSMBody)
-
-            if len(edsmbodyarray) > maxedsmbodyid:
-                if len(edsmbodyarray) < maxedsmbodyid + 524288:
-                    edsmbodyarray = numpy.resize(
-                        edsmbodyarray,
-                        maxedsmbodyid + 1048576
-                    )
-
-                edsmbodyids = edsmbodyarray.view(
-                    numpy.core.records.recarray
-                )
-
-            timer.time('loadedsmbody', len(edsmbodyarray))
+    sys.stderr.write('Loading EDSM Body IDs\n')
 
-        if len(edsmbodyids) == 0:
-            c = sqlqueries.get_edsm_bodies(conn, None)
+    if edsmbodycache.open(maxedsmbodyid):
+        timer.time('loadedsmbody', len(edsmbodycache))
+        return
 
-            edsmbodyarray = numpy.zeros(
-                maxedsmbodyid + 1048576,
-                dtype=DTypeEDSMBody
-            )
+    edsmbodycache.create(maxedsmbodyid + edsmbodycache.chunk_size)
+    edsmbodyarray = edsmbodycache.records
 
-            edsmbodyids = edsmbodyarray.view(
-                numpy.core.records.recarray
-            )
+    if maxedsmbodyid:
+        c = sqlqueries.get_edsm_bodies(conn, None)
 
-            timer.time('sql')
+        timer.time('sql')
 
-            i = 0
-            maxedsmid = 0
+        i = 0
+        maxedsmid = 0
 
-            while True:
-                rows = c.fetchmany(10000)
-                timer.time('sqledsmbody', len(rows))
+        while True:
+            rows = c.fetchmany(10000)
+            timer.time('sqledsmbody', len(rows))
 
-                if len(rows) == 0:
-                    break
+            if len(rows) == 0:
+                break
 
-                for row in rows:
-                    edsmid = row[1]
-                    rec = edsmbodyarray[edsmid]
-                    rec[0] = row[0]
-                    rec[1] = edsmid
-                    rec[2] = row[2]
-                    i += 1
+            for row in rows:
+                edsmid = row[1]
+                rec = edsmbodyarray[edsmid]
+                rec[0] = row[0]
+                rec[1] = edsmid
+                rec[2] = row[2]
+                i += 1
 
-                    if edsmid > maxedsmid:
-                        maxedsmid = edsmid
+                if edsmid > maxedsmid:
+                    maxedsmid = edsmid
 
-                sys.stderr.write('.')
+            sys.stderr.write('.')
 
-                if (i % 640000) == 0:
-                    sys.stderr.write(
-                        f'  {i} / {maxedsmbodyid} ({maxedsmid})\n'
-                    )
+            if (i % 640000) == 0:
+                sys.stderr.write(
+                    f'  {i} / {maxedsmbodyid} ({maxedsmid})\n'
+                )
 
-                sys.stderr.flush()
-                timer.time('loadedsmbody', len(rows))
+            sys.stderr.flush()
+            timer.time('loadedsmbody', len(rows))
 
-            sys.stderr.write(
-                f'  {i} / {maxedsmbodyid}\n'
-            )
+        sys.stderr.write(
+            f'  {i} / {maxedsmbodyid}\n'
+        )
 
-    return edsmbodyids
+    edsmbodycache.flush()
 
 
 def loadparentsets(conn: DBConnection,
@@ -260,15 +209,19 @@ def loadparentsets(conn: DBConnection,
     rows = sqlqueries.get_parent_sets(conn, None)
     timer.time('sqlparents', len(rows))
     parentsets: Dict[Tuple[int, str], int] = {}
-
-    for row in rows:
-        parentsets[(int(row[1]), row[2])] = int(row[0])
-
+    addparentsets(parentsets, rows)
     timer.time('loadparents', len(rows))
 
     return parentsets
 
 
+def addparentsets(parentsets: Dict[Tuple[int, str], int],
+                  rows: Sequence[Sequence]
+                  ):
+    for row in rows:
+        parentsets[(int(row[1]), row[2])] = int(row[0])
+
+
 def loadsoftware(conn: DBConnection,
                  timer: Timer
                  ) -> Dict[str, int]:
@@ -276,15 +229,17 @@ def loadsoftware(conn: DBConnection,
     rows = sqlqueries.get_software(conn, None)
     timer.time('sqlsoftware', len(rows))
     software: Dict[str, int] = {}
-
-    for row in rows:
-        software[row[1]] = int(row[0])
-
+    addsoftware(software, rows)
     timer.time('loadsoftware', len(rows))
 
     return software
 
 
+def addsoftware(software: Dict[str, int], rows: Sequence[Sequence]):
+    for row in rows:
+        software[row[1]] = int(row[0])
+
+
 def loadbodydesigs(conn: DBConnection,
                    timer: Timer
                    ) -> Dict[str, Tuple[int, BodyDesignation]]:
@@ -292,7 +247,15 @@ def loadbodydesigs(conn: DBConnection,
     rows = sqlqueries.get_body_designations(conn, None)
     timer.time('sqlbodydesigs', len(rows))
     bodydesigs: Dict[str, Tuple[int, BodyDesignation]] = {}
+    addbodydesigs(bodydesigs, rows)
+    timer.time('loadbodydesigs', len(rows))
+
+    return bodydesigs
 
+
+def addbodydesigs(bodydesigs: Dict[str, Tuple[int, BodyDesignation]],
+                  rows: Sequence[Sequence]
+                  ):
     for row in rows:
         bodydesigs[row[1]] = (
             row[0],
@@ -308,81 +271,48 @@ def loadbodydesigs(conn: DBConnection,
             )
         )
 
-    timer.time('loadbodydesigs', len(rows))
-
-    return bodydesigs
-
 
 def loadnamedbodies(conn: DBConnection,
                     timer: Timer
-                    ) -> Dict[int, Dict[str, List[EDDNBody]]]:
+                    ) -> NamedBodies:
     sys.stderr.write('Loading Named Bodies\n')
     rows = sqlqueries.get_named_bodies(conn, None)
     timer.time('sqlbodyname', len(rows))
-    namedbodies: Dict[int, Dict[str, List[EDDNBody]]] = {}
-
-    for row in rows:
-        bi = EDDNBody(
-            row[0],
-            row[1],
-            row[2],
-            row[3],
-            row[4],
-            row[5],
-            row[6],
-            row[7],
-            row[8],
-            row[9],
-            row[10]
-        )
-
-        if bi.system_id not in namedbodies:
-            namedbodies[bi.system_id] = {}
-
-        snb = namedbodies[bi.system_id]
-
-        snbent = snb.get(bi.name)
-        if snbent is None:
-            snb[bi.name] = [bi]
-        else:
-            snbent.append(bi)
-
+    namedbodies = NamedBodies()
+    addnamedbodies(namedbodies, rows)
     timer.time('loadbodyname')
 
     return namedbodies
 
 
+def addnamedbodies(namedbodies: NamedBodies,
+                   rows: Sequence[Sequence]
+                   ):
+    namedbodies.extend(rows)
+    sys.stderr.write(
+        f'  {len(namedbodies)} named bodies in {namedbodies.nbytes} bytes\n'
+    )
+
+
 def loadnamedsystems(conn: DBConnection,
                      timer: Timer
-                     ) -> Dict[str, List[EDDNSystem]]:
+                     ) -> NamedSystems:
     sys.stderr.write('Loading Named Systems\n')
     rows = sqlqueries.get_named_systems(conn, None)
     timer.time('sqlname', len(rows))
-    namedsystems: Dict[str, List[EDDNSystem]] = {}
-
-    for row in rows:
-        si = EDDNSystem(
-            row[0],
-            row[1],
-            row[2],
-            row[3] / 32.0 - 49985,
-            row[4] / 32.0 - 40985,
-            row[5] / 32.0 - 24105,
-            row[3] != 0 and row[4] != 0 and row[5] != 0
-        )
-
-        nsent = namedsystems.get(si.name)
-
-        if nsent is None:
-            namedsystems[si.name] = [si]
-        else:
-            nsent.append(si)
-
+    namedsystems = NamedSystems()
+    addnamedsystems(namedsystems, rows)
     timer.time('loadname', len(rows))
 
     return namedsystems
 
 
+def addnamedsystems(namedsystems: NamedSystems,
+                    rows: Sequence[Sequence]
+                    ):
+    namedsystems.extend(rows)
+
+
 def loadregions(conn: DBConnection,
                 timer: Timer
                 ) -> Tuple[Dict[str, EDDNRegion], Dict[int, EDDNRegion]]:
@@ -391,6 +321,16 @@ def loadregions(conn: DBConnection,
     timer.time('sqlregion', len(rows))
     regions: Dict[str, EDDNRegion] = {}
     regionaddrs: Dict[int, EDDNRegion] = {}
+    addregions((regions, regionaddrs), rows)
+    timer.time('loadregion', len(rows))
+
+    return (regions, regionaddrs)
+
+
+def addregions(regions: Tuple[Dict[str, EDDNRegion], Dict[int, EDDNRegion]],
+               rows: Sequence[Sequence]
+               ):
+    regionnames, regionaddrs = regions
 
     for row in rows:
         ri = EDDNRegion(
@@ -406,15 +346,11 @@ def loadregions(conn: DBConnection,
             row[9] == b'\x01'
         )
 
-        regions[ri.name.lower()] = ri
+        regionnames[ri.name.lower()] = ri
 
         if ri.region_address is not None:
             regionaddrs[ri.region_address] = ri
 
-    timer.time('loadregion', len(rows))
-
-    return (regions, regionaddrs)
-
 
 def loadfactions(conn: DBConnection,
                  timer: Timer
@@ -423,7 +359,15 @@ def loadfactions(conn: DBConnection,
     rows = sqlqueries.get_factions(conn, None)
     timer.time('sqlfactions')
     factions: Dict[str, List[EDDNFaction]] = {}
+    addfactions(factions, rows)
+    timer.time('loadfactions')
+
+    return factions
 
+
+def addfactions(factions: Dict[str, List[EDDNFaction]],
+                rows: Sequence[Sequence]
+                ):
     for row in rows:
         fi = EDDNFaction(row[0], row[1], row[2], row[3])
 
@@ -434,61 +378,180 @@ def loadfactions(conn: DBConnection,
         else:
             faction_entry.append(fi)
 
-    timer.time('loadfactions')
 
-    return factions
+def fetchknownbodiessheet(known_bodies_sheet_uri: str,
+                          snapshot_file: str,
+                          max_age: float
+                          ) -> bytes:
+    """
+    Returns the known bodies sheet, refreshing the local snapshot of it
+    with a conditional request if the snapshot is older than max_age
+    seconds.  The snapshot is used as is if the sheet cannot be fetched.
+    """
+
+    metafile = snapshot_file + '.meta'
+    meta: Dict[str, Any] = {}
+    data: Optional[bytes] = None
+
+    try:
+        with open(snapshot_file, 'rb') as f:
+            data = f.read()
+
+        with open(metafile, 'rt', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if data is not None and time.time() - meta.get('fetched', 0) < max_age:
+        return data
+
+    request = urllib.request.Request(known_bodies_sheet_uri)
+
+    if data is not None:
+        if meta.get('etag'):
+            request.add_header('If-None-Match', meta['etag'])
+
+        if meta.get('last_modified'):
+            request.add_header('If-Modified-Since', meta['last_modified'])
+
+    try:
+        with urllib.request.urlopen(request, timeout=60) as f:
+            newdata = f.read()
+            info = f.info()
+    except urllib.error.HTTPError as e:
+        if data is None:
+            raise
+
+        if e.code != 304:
+            sys.stderr.write(f'Unable to refresh Known Bodies: {e}\n')
+            return data
+    except (OSError, http.client.HTTPException) as e:
+        if data is None:
+            raise
+
+        sys.stderr.write(f'Unable to refresh Known Bodies: {e}\n')
+        return data
+    else:
+        data = newdata
+        meta = {
+            'etag': info['ETag'],
+            'last_modified': info['Last-Modified']
+        }
+
+        os.makedirs(os.path.dirname(snapshot_file), exist_ok=True)
+
+        with open(snapshot_file + '.tmp', 'wb') as f:
+            f.write(data)
+
+        os.rename(snapshot_file + '.tmp', snapshot_file)
+
+    meta['fetched'] = time.time()
+
+    with open(metafile + '.tmp', 'wt', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+    os.rename(metafile + '.tmp', metafile)
+
+    return data
+
+
+def knownbodiesmatch(knownbodies: Dict[str, Dict[str, List[KnownBody]]],
+                     bodydesigs: Dict[str, Tuple[int, BodyDesignation]]
+                     ) -> bool:
+    for sysname, sysknownbodies in knownbodies.items():
+        for bodies in sysknownbodies.values():
+            for body in bodies:
+                desig = body['BodyDesignation'][len(sysname):]
+                bodydesig = bodydesigs.get(desig)
+
+                if (bodydesig is None
+                        or bodydesig[0] != body['BodyDesignationId']):
+                    return False
+
+    return True
 
 
 def loadknownbodies(conn: DBConnection,
                     timer: Timer,
                     bodydesigs: Dict[str, Tuple[int, BodyDesignation]],
-                    known_bodies_sheet_uri: str
+                    known_bodies_sheet_uri: str,
+                    snapshot_file: str,
+                    max_age: float
                     ) -> Dict[str, Dict[str, List[KnownBody]]]:
     sys.stderr.write('Loading Known Bodies\n')
     knownbodies: Dict[str, Dict[str, List[KnownBody]]] = {}
 
-    with urllib.request.urlopen(known_bodies_sheet_uri) as f:
-        line: bytes
-
-        for line in f:
-            fields = line.decode('utf-8').strip().split('\t')
-            if (len(fields) >= 7
-                    and fields[0] != 'SystemAddress'
-                    and fields[0] != ''
-                    and fields[3] != ''
-                    and fields[4] != ''
-                    and fields[6] != ''):
-                sysaddr = int(fields[0])
-                sysname = fields[2]
-                bodyid = int(fields[3])
-                bodyname = fields[4]
-                bodydesig = fields[6]
-                desig = bodydesig[len(sysname):]
-
-                desigid, _ = get_body_designation(conn, bodydesigs, desig)
-
-                if desigid is not None:
-                    if sysname not in knownbodies:
-                        knownbodies[sysname] = {}
-
-                    sysknownbodies = knownbodies[sysname]
-
-                    if bodyname not in sysknownbodies:
-                        sysknownbodies[bodyname] = []
-
-                    sysknownbodies[bodyname].append(
-                        {
-                            'SystemAddress': sysaddr,
-                            'SystemName': sysname,
-                            'BodyID': bodyid,
-                            'BodyName': bodyname,
-                            'BodyDesignation': bodydesig,
-                            'BodyDesignationId': desigid
-                        }
-                    )
-                else:
-                    import pdb
-                    pdb.set_trace()
+    data = fetchknownbodiessheet(
+        known_bodies_sheet_uri,
+        snapshot_file,
+        max_age
+    )
+
+    timer.time('fetchknownbodies')
+
+    # The resolved known bodies are saved alongside the snapshot, keyed
+    # by the hash of the snapshot they were resolved from, and are only
+    # used if every designation they were resolved to is still in use in
+    # the database with the same id
+    compiled_file = snapshot_file + '.pickle'
+    digest = hashlib.sha256(data).hexdigest()
+
+    try:
+        with open(compiled_file, 'rb') as f:
+            compiled_digest, compiled = pickle.load(f)
+
+        if (compiled_digest == digest
+                and knownbodiesmatch(compiled, bodydesigs)):
+            timer.time('loadknownbodies')
+            return compiled
+    except (OSError, EOFError, ValueError, TypeError, KeyError,
+            pickle.PickleError):
+        pass
+
+    for line in data.splitlines():
+        fields = line.decode('utf-8').strip().split('\t')
+        if (len(fields) >= 7
+                and fields[0] != 'SystemAddress'
+                and fields[0] != ''
+                and fields[3] != ''
+                and fields[4] != ''
+                and fields[6] != ''):
+            sysaddr = int(fields[0])
+            sysname = fields[2]
+            bodyid = int(fields[3])
+            bodyname = fields[4]
+            bodydesig = fields[6]
+            desig = bodydesig[len(sysname):]
+
+            desigid, _ = get_body_designation(conn, bodydesigs, desig)
+
+            if desigid is not None:
+                if sysname not in knownbodies:
+                    knownbodies[sysname] = {}
+
+                sysknownbodies = knownbodies[sysname]
+
+                if bodyname not in sysknownbodies:
+                    sysknownbodies[bodyname] = []
+
+                sysknownbodies[bodyname].append(
+                    {
+                        'SystemAddress': sysaddr,
+                        'SystemName': sysname,
+                        'BodyID': bodyid,
+                        'BodyName': bodyname,
+                        'BodyDesignation': bodydesig,
+                        'BodyDesignationId': desigid
+                    }
+                )
+            else:
+                import pdb
+                pdb.set_trace()
+
+    with open(compiled_file + '.tmp', 'wb') as f:
+        pickle.dump((digest, knownbodies), f, pickle.HIGHEST_PROTOCOL)
+
+    os.rename(compiled_file + '.tmp', compiled_file)
 
     timer.time('loadknownbodies')
     return knownbodies
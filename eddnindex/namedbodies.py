@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from collections.abc import Sequence, MutableSequence as List
+
+import numpy
+
+from .types import EDDNBody
+
+
+DTypeNamedBody = numpy.dtype([
+    ('body_id', 'i4'),
+    ('system_id', 'i4'),
+    ('name_id', 'i4'),
+    ('system_name_id', 'i4'),
+    ('designation_id', 'i4'),
+    ('bodyid', 'i2'),
+    ('category', 'i1'),
+    ('is_rejected', 'u1'),
+    ('arg_of_periapsis', 'f8'),
+    ('valid_from', 'i8'),
+    ('valid_until', 'i8')
+])
+
+epoch = datetime(1970, 1, 1)
+
+
+def to_seconds(values: Sequence[datetime]) -> numpy.ndarray:
+    return numpy.array(values, 'datetime64[s]').astype(numpy.int64)
+
+
+class NamedBodies(object):
+    """
+    Bodies with names that are not procedurally generated, looked up by
+    system id and name.
+
+    Body and system names are interned in a sorted table of UTF-8 encoded
+    names, concatenated in a byte array indexed by an array of offsets, in
+    which each name is found by binary search.  Entries are kept in an
+    array sorted by system id and name index, with a parallel array of keys
+    in which the entries for a system and name are found by binary search.
+    Validity bounds are stored as seconds since the Unix epoch, and
+    missing body IDs, categories and designations as -1.  Each body takes
+    56 bytes (48 for the entry and 8 for its key) plus its share of the
+    name table.
+
+    The arrays are pickled out-of-band, so they can be mapped directly
+    from the startup snapshot rather than copied into each process.
+    """
+
+    keys: numpy.ndarray
+    entries: numpy.ndarray
+    offsets: numpy.ndarray
+    names: numpy.ndarray
+
+    def __init__(self):
+        self.keys = numpy.empty(0, numpy.int64)
+        self.entries = numpy.empty(0, DTypeNamedBody)
+        self.offsets = numpy.zeros(1, numpy.int64)
+        self.names = numpy.empty(0, numpy.uint8)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def nbytes(self) -> int:
+        return (self.keys.nbytes + self.entries.nbytes
+                + self.offsets.nbytes + self.names.nbytes)
+
+    def _name(self, i: int) -> bytes:
+        return self.names[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def _find_name(self, name: bytes) -> Optional[int]:
+        lo = 0
+        hi = len(self.offsets) - 1
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+
+            if self._name(mid) < name:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo < len(self.offsets) - 1 and self._name(lo) == name:
+            return lo
+
+        return None
+
+    def _find(self, system_id: int, name: str) -> Tuple[int, int]:
+        name_id = self._find_name(name.encode('utf-8'))
+
+        if name_id is None:
+            return (0, 0)
+
+        key = (system_id << 32) | name_id
+
+        return (
+            int(numpy.searchsorted(self.keys, key, 'left')),
+            int(numpy.searchsorted(self.keys, key, 'right'))
+        )
+
+    def get(self, system_id: int, name: str) -> Optional[List[EDDNBody]]:
+        start, end = self._find(system_id, name)
+
+        if start == end:
+            return None
+
+        return [
+            EDDNBody(
+                body_id,
+                name,
+                self._name(system_name_id).decode('utf-8'),
+                system_id,
+                bodyid if bodyid >= 0 else None,
+                category if category >= 0 else None,
+                aop if aop == aop else None,
+                epoch + timedelta(seconds=valid_from),
+                epoch + timedelta(seconds=valid_until),
+                bool(is_rejected),
+                desigid if desigid >= 0 else None
+            ) for (body_id, system_id, _, system_name_id, desigid, bodyid,
+                   category, is_rejected, aop, valid_from, valid_until)
+            in self.entries[start:end].tolist()
+        ]
+
+    def extend(self, rows: Sequence[Sequence]):
+        """
+        Rebuilds the arrays with the rows of the named bodies query
+        merged in.  Bodies with the same system and name are kept in the
+        order in which they were added.
+        """
+
+        if len(rows) == 0:
+            return
+
+        oldnames = [self._name(i) for i in range(len(self.offsets) - 1)]
+        bodynames = [row[1].encode('utf-8') for row in rows]
+        sysnames = [row[2].encode('utf-8') for row in rows]
+        names = sorted(set(oldnames).union(bodynames, sysnames))
+        nameids = {n: i for i, n in enumerate(names)}
+
+        entries = numpy.empty(len(rows), DTypeNamedBody)
+        entries['body_id'] = [row[0] for row in rows]
+        entries['system_id'] = [row[3] for row in rows]
+        entries['name_id'] = [nameids[n] for n in bodynames]
+        entries['system_name_id'] = [nameids[n] for n in sysnames]
+        entries['bodyid'] = [-1 if row[4] is None else row[4] for row in rows]
+        entries['category'] = [
+            -1 if row[5] is None else row[5] for row in rows
+        ]
+        entries['arg_of_periapsis'] = [
+            numpy.nan if row[6] is None else row[6] for row in rows
+        ]
+        entries['valid_from'] = to_seconds([row[7] for row in rows])
+        entries['valid_until'] = to_seconds([row[8] for row in rows])
+        entries['is_rejected'] = [
+            1 if row[9] in (1, b'\x01') else 0 for row in rows
+        ]
+        entries['designation_id'] = [
+            -1 if row[10] is None else row[10] for row in rows
+        ]
+
+        oldentries = numpy.array(self.entries)
+
+        if len(oldentries) != 0:
+            remap = numpy.array([nameids[n] for n in oldnames], numpy.int32)
+            oldentries['name_id'] = remap[oldentries['name_id']]
+            oldentries['system_name_id'] = remap[oldentries['system_name_id']]
+
+        entries = numpy.concatenate([oldentries, entries])
+        keys = ((entries['system_id'].astype(numpy.int64) << 32)
+                | entries['name_id'].astype(numpy.int64))
+        order = numpy.argsort(keys, kind='stable')
+
+        self.keys = keys[order]
+        self.entries = entries[order]
+        self.offsets = numpy.zeros(len(names) + 1, numpy.int64)
+        numpy.cumsum([len(n) for n in names], out=self.offsets[1:])
+        self.names = numpy.frombuffer(b''.join(names), numpy.uint8).copy()
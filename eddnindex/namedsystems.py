@@ -0,0 +1,216 @@
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Tuple
+from collections.abc import Sequence, MutableSequence as List, \
+                            MutableMapping as Dict
+
+import numpy
+
+from .types import EDDNSystem
+
+
+DTypeNamedSystem = numpy.dtype([
+    ('system_id', 'i4'),
+    ('x', 'i4'),
+    ('y', 'i4'),
+    ('z', 'i4'),
+    ('id64', 'i8')
+])
+
+
+def _layout(count: int,
+            namesize: int
+            ) -> Tuple[List[Tuple[str, numpy.dtype, int, int]], int]:
+    layout = []
+    pos = 16
+
+    for attr, dtype, length in [
+        ('entries', DTypeNamedSystem, count),
+        ('offsets', numpy.dtype(numpy.int64), count + 1),
+        ('names', numpy.dtype(numpy.uint8), namesize)
+    ]:
+        layout.append((attr, dtype, length, pos))
+        pos += (dtype.itemsize * length + 7) & ~7
+
+    return (layout, pos)
+
+
+class NamedSystems(object):
+    """
+    Systems with names that are not procedurally generated, looked up by
+    name in the same way as a dict of lists of systems.
+
+    Entries are kept in an array sorted by UTF-8 encoded name, with the
+    names concatenated in a separate byte array indexed by an array of
+    offsets, and each name is found by binary search.  Each system takes
+    32 bytes plus its name, rather than the several hundred bytes taken by
+    a tuple per system in a dict.
+
+    The arrays can be moved into a shared memory block, so that they are
+    shared read-only by worker processes rather than copied to each one.
+    Systems added after the arrays were built are kept in a separate dict
+    by name, which is not shared.
+    """
+
+    entries: numpy.ndarray
+    offsets: numpy.ndarray
+    names: numpy.ndarray
+    added: Dict[str, List[EDDNSystem]]
+
+    def __init__(self):
+        self.entries = numpy.empty(0, DTypeNamedSystem)
+        self.offsets = numpy.zeros(1, numpy.int64)
+        self.names = numpy.empty(0, numpy.uint8)
+        self.added = {}
+        self._shm: Optional[SharedMemory] = None
+        self._owner = False
+
+    def __getstate__(self):
+        return {
+            'entries': numpy.array(self.entries),
+            'offsets': numpy.array(self.offsets),
+            'names': numpy.array(self.names),
+            'added': self.added
+        }
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.__dict__.update(state)
+
+    def __len__(self) -> int:
+        return len(self.entries) + sum(len(v) for v in self.added.values())
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def _name(self, i: int) -> bytes:
+        return self.names[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def _find(self, name: bytes) -> Tuple[int, int]:
+        lo = 0
+        hi = len(self.entries)
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+
+            if self._name(mid) < name:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        end = lo
+
+        while end < len(self.entries) and self._name(end) == name:
+            end += 1
+
+        return (lo, end)
+
+    def get(self, name: str) -> Optional[List[EDDNSystem]]:
+        start, end = self._find(name.encode('utf-8'))
+        systems = [
+            EDDNSystem(
+                sysid,
+                id64,
+                name,
+                x / 32.0 - 49985,
+                y / 32.0 - 40985,
+                z / 32.0 - 24105,
+                x != 0 and y != 0 and z != 0
+            ) for sysid, x, y, z, id64 in self.entries[start:end].tolist()
+        ]
+
+        systems += self.added.get(name, [])
+
+        return systems if len(systems) != 0 else None
+
+    def add(self, system: EDDNSystem):
+        """
+        Adds a system created after the arrays were built
+        """
+
+        added = self.added.get(system.name)
+
+        if added is None:
+            self.added[system.name] = [system]
+        else:
+            added.append(system)
+
+    def extend(self, rows: Sequence[Sequence]):
+        """
+        Rebuilds the arrays with the Id, SystemAddress, Name, X, Y and Z
+        of each row merged in.  Systems with the same name are kept in the
+        order in which they were added.
+        """
+
+        if len(rows) == 0:
+            return
+
+        count = len(self.entries)
+        names = [self._name(i) for i in range(count)]
+        names += [row[2].encode('utf-8') for row in rows]
+        order = sorted(range(len(names)), key=names.__getitem__)
+
+        entries = numpy.empty(len(rows), DTypeNamedSystem)
+        entries['system_id'] = [row[0] for row in rows]
+        entries['id64'] = [row[1] for row in rows]
+        entries['x'] = [row[3] for row in rows]
+        entries['y'] = [row[4] for row in rows]
+        entries['z'] = [row[5] for row in rows]
+
+        self.entries = numpy.concatenate([self.entries, entries])[order]
+        names = [names[i] for i in order]
+        self.offsets = numpy.zeros(len(names) + 1, numpy.int64)
+        numpy.cumsum([len(n) for n in names], out=self.offsets[1:])
+        self.names = numpy.frombuffer(b''.join(names), numpy.uint8).copy()
+
+    def share(self) -> str:
+        """
+        Moves the arrays into a shared memory block, returning its name
+        """
+
+        if self._shm is not None:
+            return self._shm.name
+
+        layout, size = _layout(len(self.entries), len(self.names))
+        shm = SharedMemory(create=True, size=size)
+        header = numpy.ndarray(2, numpy.int64, shm.buf)
+        header[:] = (len(self.entries), len(self.names))
+
+        for attr, dtype, length, offset in layout:
+            arr = numpy.ndarray(length, dtype, shm.buf, offset)
+            arr[:] = getattr(self, attr)
+            arr.flags.writeable = False
+            setattr(self, attr, arr)
+
+        self._shm = shm
+        self._owner = True
+        return shm.name
+
+    @classmethod
+    def attach(cls, name: str) -> 'NamedSystems':
+        """
+        Returns the named systems in the shared memory block created by
+        share() in another process
+        """
+
+        shm = SharedMemory(name=name)
+        count, namesize = numpy.ndarray(2, numpy.int64, shm.buf).tolist()
+        layout, _ = _layout(count, namesize)
+        namedsystems = cls()
+
+        for attr, dtype, length, offset in layout:
+            arr = numpy.ndarray(length, dtype, shm.buf, offset)
+            arr.flags.writeable = False
+            setattr(namedsystems, attr, arr)
+
+        namedsystems._shm = shm
+        return namedsystems
+
+    def unlink(self):
+        """
+        Removes the name of the shared memory block created by share().
+        The block is freed once every process has unmapped it.
+        """
+
+        if self._shm is not None and self._owner:
+            self._shm.unlink()
+            self._owner = False
@@ -1,6 +1,6 @@
+import os.path
 import sys
 import json
-import bz2
 import math
 import csv
 from typing import Any, Callable
@@ -9,28 +9,63 @@ from collections.abc import MutableMapping as Dict
 from ..types import Writable
 from ..eddnsysdb import EDDNSysDB
 from ..timer import Timer
+from ..reader import BZ2LineReader, open_bz2
+from ..checkpoint import Checkpoint
 
 
 def process(sysdb: EDDNSysDB,
             timer: Timer,
             rejectout: Writable,
             updatetitleprogress: Callable[[str], None],
-            eddb_systems_file: str
+            eddb_systems_file: str,
+            checkpoint_dir: str,
+            resume: bool
             ):
     sys.stderr.write('Processing EDDB systems\n')
-    with bz2.open(eddb_systems_file, 'rt', encoding='utf8') as f:
-        csvreader = csv.DictReader(f)
+    checkpoint = Checkpoint(os.path.join(checkpoint_dir, 'eddbsystems.json'))
+    start = None
+
+    if resume:
+        start = checkpoint.load(
+            eddb_systems_file,
+            sysdb.eddbsyscache.generation
+        )
+
+    with open_bz2(eddb_systems_file, False) as f:
+        fieldnames = next(csv.reader([f.readline().decode('utf8')]))
+
+    ranges = None
+    totalsize = 0
+
+    if start is not None:
+        sys.stderr.write(f'Resuming from line {start[0]}\n')
+        ranges = [(start[0], sys.maxsize, start[1])]
+        totalsize = start[1]
+
+    with BZ2LineReader(eddb_systems_file, ranges=ranges) as f:
         w = 0
         linecount = 0
-        for i, msg in enumerate(csvreader):
+        for lineno, line in f.numbered():
+            totalsize += len(line)
+
+            if lineno == 0:
+                continue
+
+            linecount = lineno
             timer.time('read')
             rejectmsg: Dict[str, Any]
+            row = next(csv.reader([line.decode('utf8')]), [])
+            msg = dict(zip(fieldnames, row))
             try:
                 eddbsysid = int(msg['id'])
                 sysname = msg['name']
                 starpos = [float(msg['x']), float(msg['y']), float(msg['z'])]
                 timestamp = int(msg['updated_at'])
-            except (OverflowError, ValueError, TypeError):
+            except (OverflowError,
+                    ValueError,
+                    TypeError,
+                    KeyError
+                    ):
                 sys.stderr.write('Error: {0}\n'.format(sys.exc_info()[0]))
                 rejectmsg = {
                     'rejectReason': 'Invalid',
@@ -72,21 +107,29 @@ def process(sysdb: EDDNSysDB,
                     timer.time('eddbupdate')
                     w += 1
 
-            linecount += 1
-
-            if ((i + 1) % 1000) == 0:
+            if (linecount % 1000) == 0:
                 sysdb.commit()
                 sys.stderr.write('.' if w == 0 else '*')
                 sys.stderr.flush()
                 w = 0
 
-                if ((i + 1) % 64000) == 0:
-                    sys.stderr.write('  {0}\n'.format(i + 1))
+                if (linecount % 64000) == 0:
+                    sys.stderr.write('  {0}\n'.format(linecount))
                     sys.stderr.flush()
-                    updatetitleprogress('EDDBSys:{0}'.format(i + 1))
+                    updatetitleprogress('EDDBSys:{0}'.format(linecount))
+                    sysdb.saveeddbsyscache(
+                        lambda generation: checkpoint.save(
+                            eddb_systems_file,
+                            generation,
+                            lineno + 1,
+                            totalsize
+                        )
+                    )
                 timer.time('commit')
 
     sys.stderr.write(f'  {linecount}\n')
     sys.stderr.flush()
     sysdb.commit()
+    sysdb.saveeddbsyscache()
+    checkpoint.clear()
     timer.time('commit')
@@ -2,7 +2,6 @@ import os
 import os.path
 import sys
 import json
-import bz2
 import math
 from datetime import datetime, timedelta
 from typing import Any, Callable, Optional, Tuple
@@ -14,6 +13,48 @@ from ..constants import ed_3_0_3_date, ed_3_0_4_date
 from ..eddnsysdb import EDDNSysDB
 from ..util import timestamp_to_datetime
 from ..timer import Timer
+from .. import jsondecode
+from ..reader import BZ2LineReader, LineBlockBuilder, select_line_ranges
+
+
+journal_header_fields = [
+    'gatewayTimestamp',
+    'softwareName'
+]
+
+# Fields read by process_line, process_event and bodies.getbody
+journal_message_fields = [
+    'event',
+    'timestamp',
+    'StarSystem',
+    'System',
+    'SystemName',
+    'StarPos',
+    'SystemAddress',
+    'StationName',
+    'MarketID',
+    'StationType',
+    'Body',
+    'Name',
+    'BodyID',
+    'BodyType',
+    'BodyName',
+    'Parents',
+    'Factions',
+    'SystemFaction',
+    'Faction',
+    'SystemGovernment',
+    'Government',
+    'SystemAllegiance',
+    'Allegiance',
+    'StationFaction',
+    'StationGovernment',
+    'DistanceFromArrivalLS',
+    'SemiMajorAxis',
+    'Periapsis',
+    'PlanetClass',
+    'StarType'
+]
 
 
 def process(sysdb: EDDNSysDB,
@@ -40,12 +81,16 @@ def process(sysdb: EDDNSysDB,
     faction_file_line_count = fileinfo.faction_file_line_count
     date_str = fileinfo.date.isoformat()[:10]
 
-    if (line_count is None
-            or populated_line_count is None
-            or (station_line_count is None
-                and event_type in ('Docked', 'Location', 'CarrierJump'))
-            or (reprocessall is True and event_type == 'Scan'
-                and date >= constants.ed_3_0_0_date.date())
+    fullpass = (
+        line_count is None
+        or populated_line_count is None
+        or (station_line_count is None
+            and event_type in ('Docked', 'Location', 'CarrierJump'))
+        or (reprocessall is True and event_type == 'Scan'
+            and date >= constants.ed_3_0_0_date.date())
+    )
+
+    if (fullpass
             or (reprocess is True
                 and (line_count != info_file_line_count
                      or (event_type in ('Docked', 'Location', 'CarrierJump')
@@ -62,11 +107,30 @@ def process(sysdb: EDDNSysDB,
             updatetitleprogress(f'{date_str}:{event_type}')
             statinfo = os.stat(fn)
             comprsize = statinfo.st_size
+            stnlines = sysdb.getstationfilelines(fileinfo.id)
+            infolines = sysdb.getinfofilelines(fileinfo.id)
+            factionlines = sysdb.getfactionfilelines(fileinfo.id)
+            ranges = None
+            blockoffsets = None
+
+            # Every Scan line is reprocessed under --reprocess-all, so
+            # only other files can skip the lines that are already indexed
+            if not fullpass and not (reprocessall is True
+                                     and event_type == 'Scan'):
+                # Only read the blocks of lines that are not yet indexed
+                ranges = select_line_ranges(
+                    sysdb.getfilelineblocks(fileinfo.id),
+                    line_count,
+                    lambda n: n not in infolines
+                )
 
-            with bz2.BZ2File(fn, 'r') as f:
-                stnlines = sysdb.getstationfilelines(fileinfo.id)
-                infolines = sysdb.getinfofilelines(fileinfo.id)
-                factionlines = sysdb.getfactionfilelines(fileinfo.id)
+            if ranges is not None:
+                blockoffsets = sysdb.getfilecompressedblocks(fileinfo.id)
+
+            with BZ2LineReader(fn,
+                               ranges=ranges,
+                               block_offsets=blockoffsets) as f:
+                lineblocks = LineBlockBuilder()
                 linecount = 0
                 poplinecount = 0
                 stnlinecount = 0
@@ -78,7 +142,7 @@ def process(sysdb: EDDNSysDB,
                     int, int, float, int, int, int
                 ]] = []
                 factionstoinsert: List[Tuple[int, int, EDDNFaction, int]] = []
-                for lineno, line in enumerate(f):
+                for lineno, line in f.numbered():
                     process_line(
                         sysdb,
                         timer,
@@ -99,6 +163,7 @@ def process(sysdb: EDDNSysDB,
                         allow_3_0_3_bodies
                     )
 
+                    lineblocks.add(lineno, totalsize)
                     linecount += 1
                     totalsize += len(line)
 
@@ -132,15 +197,22 @@ def process(sysdb: EDDNSysDB,
                 sys.stderr.write(f'  {linecount}\n')
                 sys.stderr.flush()
 
-                sysdb.updatefileinfo(
-                    fileinfo.id,
-                    linecount,
-                    totalsize,
-                    comprsize,
-                    poplinecount,
-                    stnlinecount,
-                    0
-                )
+                if ranges is None:
+                    sysdb.updatefileblocks(
+                        fileinfo.id,
+                        lineblocks.blocks,
+                        f.block_offsets
+                    )
+
+                    sysdb.updatefileinfo(
+                        fileinfo.id,
+                        linecount,
+                        totalsize,
+                        comprsize,
+                        poplinecount,
+                        stnlinecount,
+                        0
+                    )
 
 
 def commit(sysdb: EDDNSysDB,
@@ -191,9 +263,11 @@ def process_line(sysdb: EDDNSysDB,
         timer.time('read')
 
         try:
-            msg = json.loads(line)
-            body = msg['message']
-            hdr = msg['header']
+            hdr, body = jsondecode.extract(
+                line,
+                journal_header_fields,
+                journal_message_fields
+            )
             eventtype = body.get('event')
 
             if 'StarSystem' in body:
@@ -230,7 +304,7 @@ def process_line(sysdb: EDDNSysDB,
             gwtimestamp = hdr.get('gatewayTimestamp')
             software = hdr.get('softwareName')
             distfromstar = body.get('DistanceFromArrivalLS')
-        except (OverflowError, ValueError, TypeError, json.JSONDecodeError):
+        except jsondecode.DecodeErrors:
             sys.stderr.write('Error: {0}\n'.format(sys.exc_info()[1]))
             msg = {
                 'rejectReason': 'Invalid',
@@ -262,6 +336,7 @@ def process_line(sysdb: EDDNSysDB,
             if (sqltimestamp is None
                     or sqlgwtimestamp is None
                     or sqltimestamp > sqlgwtimestamp + timedelta(days=1)):
+                msg = jsondecode.loads(line)
                 msg['rejectReason'] = 'Timestamp error'
                 rejectout.write(json.dumps(msg) + '\n')
             else:
@@ -269,7 +344,7 @@ def process_line(sysdb: EDDNSysDB,
                     sysdb, timer, fileinfo, reprocessall, rejectout,
                     stnlines, infolines, factionlines,
                     stntoinsert, infotoinsert, factionstoinsert,
-                    lineno, msg, body, eventtype, sysname, starpos,
+                    lineno, body, eventtype, sysname, starpos,
                     sysaddr, stationname, marketid, stationtype,
                     bodyname, bodyid, bodytype, scanbodyname,
                     parents, factions, sysfaction, sysgovern,
@@ -279,6 +354,7 @@ def process_line(sysdb: EDDNSysDB,
                 )
 
                 if reject:
+                    msg = jsondecode.loads(line)
                     msg['rejectReason'] = rejectreason
                     msg['rejectData'] = rejectdata
                     rejectout.write(json.dumps(msg) + '\n')
@@ -298,7 +374,7 @@ def process_event(sysdb: EDDNSysDB,
                         int, int, float, int, int, int
                     ]],
                   factionstoinsert: List[Tuple[int, int, EDDNFaction, int]],
-                  lineno, msg, body, eventtype, sysname, starpos,
+                  lineno, body, eventtype, sysname, starpos,
                   sysaddr, stationname, marketid, stationtype,
                   bodyname, bodyid, bodytype, scanbodyname, parents,
                   factions, sysfaction, sysgovern, sysalleg,
@@ -2,7 +2,6 @@ import os
 import os.path
 import sys
 import json
-import bz2
 import math
 from datetime import datetime, timedelta
 from typing import Callable, Tuple
@@ -12,6 +11,8 @@ from ..types import EDDNFile, EDDNSystem, Writable
 from ..eddnsysdb import EDDNSysDB
 from ..util import timestamp_to_datetime
 from ..timer import Timer
+from .. import jsondecode
+from ..reader import BZ2LineReader, LineBlockBuilder, select_line_ranges
 
 
 def process(sysdb: EDDNSysDB,
@@ -49,9 +50,26 @@ def process(sysdb: EDDNSysDB,
             updatetitleprogress(f'{date_str}:{event_type}')
             statinfo = os.stat(fn)
             comprsize = statinfo.st_size
-            with bz2.BZ2File(fn, 'r') as f:
-                infolines = sysdb.getinfofilelines(fileinfo.id)
-                navroutelines = sysdb.getnavroutefilelines(fileinfo.id)
+            infolines = sysdb.getinfofilelines(fileinfo.id)
+            navroutelines = sysdb.getnavroutefilelines(fileinfo.id)
+            ranges = None
+            blockoffsets = None
+
+            if line_count is not None:
+                # Only read the blocks of lines that are not yet indexed
+                ranges = select_line_ranges(
+                    sysdb.getfilelineblocks(fileinfo.id),
+                    line_count,
+                    lambda n: not is_line_indexed(infolines, navroutelines, n)
+                )
+
+            if ranges is not None:
+                blockoffsets = sysdb.getfilecompressedblocks(fileinfo.id)
+
+            with BZ2LineReader(fn,
+                               ranges=ranges,
+                               block_offsets=blockoffsets) as f:
+                lineblocks = LineBlockBuilder()
                 linecount = 0
                 routesystemcount = 0
                 totalsize = 0
@@ -63,7 +81,7 @@ def process(sysdb: EDDNSysDB,
                 routesystemstoinsert: List[Tuple[
                     int, int, EDDNSystem, int
                 ]] = []
-                for lineno, line in enumerate(f):
+                for lineno, line in f.numbered():
                     process_line(
                         sysdb,
                         timer,
@@ -78,6 +96,7 @@ def process(sysdb: EDDNSysDB,
                         line
                     )
 
+                    lineblocks.add(lineno, totalsize)
                     linecount += 1
                     totalsize += len(line)
 
@@ -107,15 +126,23 @@ def process(sysdb: EDDNSysDB,
 
                 sys.stderr.write(f'  {linecount}\n')
                 sys.stderr.flush()
-                sysdb.updatefileinfo(
-                    fileinfo.id,
-                    linecount,
-                    totalsize,
-                    comprsize,
-                    0,
-                    0,
-                    routesystemcount
-                )
+
+                if ranges is None:
+                    sysdb.updatefileblocks(
+                        fileinfo.id,
+                        lineblocks.blocks,
+                        f.block_offsets
+                    )
+
+                    sysdb.updatefileinfo(
+                        fileinfo.id,
+                        linecount,
+                        totalsize,
+                        comprsize,
+                        0,
+                        0,
+                        routesystemcount
+                    )
 
 
 def commit(sysdb: EDDNSysDB,
@@ -136,6 +163,12 @@ def commit(sysdb: EDDNSysDB,
     sysdb.commit()
 
 
+def is_line_indexed(infolines, navroutelines, lineno: int) -> bool:
+    # Route entries are numbered from 1, and every indexed route has at
+    # least two entries
+    return lineno in infolines and (lineno, 1) in navroutelines
+
+
 def process_line(sysdb,
                  timer,
                  fileinfo,
@@ -148,17 +181,20 @@ def process_line(sysdb,
                  lineno,
                  line
                  ):
+    if is_line_indexed(infolines, navroutelines, lineno + 1):
+        return
+
     timer.time('read')
 
     try:
-        msg = json.loads(line)
+        msg = jsondecode.loads(line)
         body = msg['message']
         hdr = msg['header']
         timestamp = body.get('timestamp')
         route = list(body['Route'])
         gwtimestamp = hdr.get('gatewayTimestamp')
         software = hdr.get('softwareName')
-    except (OverflowError, ValueError, TypeError, json.JSONDecodeError):
+    except jsondecode.DecodeErrors:
         sys.stderr.write('Error: {0}\n'.format(sys.exc_info()[1]))
         msg = {
             'rejectReason': 'Invalid',
@@ -172,16 +208,7 @@ def process_line(sysdb,
         sqlgwtimestamp = timestamp_to_datetime(gwtimestamp)
         timer.time('parse')
         line_len = len(line)
-        line_routes = []
-
-        for n, system in enumerate(route):
-            try_add_system(
-                sysdb,
-                timer,
-                line_routes,
-                n,
-                system
-            )
+        line_routes = add_systems(sysdb, timer, route)
 
         if (sqltimestamp is not None
                 and sqlgwtimestamp is not None
@@ -283,28 +310,35 @@ def process_route(sysdb,
             )]
 
 
-def try_add_system(sysdb, timer, line_routes, n, system):
-    try:
-        sysname = system['StarSystem']
-        starpos = system['StarPos']
-        sysaddr = system['SystemAddress']
-    except ValueError:
-        line_routes.append((None, n + 1, "Missing property", system))
-    else:
-        starpos = [math.floor(v * 32 + 0.5) / 32.0 for v in starpos]
-        (system, sysRejectReason, sysRejectData) = sysdb.getsystem(
-                    timer,
-                    sysname,
-                    starpos[0],
-                    starpos[1],
-                    starpos[2],
-                    sysaddr
-                )
+def add_systems(sysdb, timer, route):
+    line_routes = []
+    batch = []
+    batchentries = []
 
-        timer.time('sysquery')
-        line_routes.append((
-                    system,
-                    n + 1,
-                    sysRejectReason,
-                    sysRejectData
-                ))
+    for n, system in enumerate(route):
+        try:
+            sysname = system['StarSystem']
+            starpos = system['StarPos']
+            sysaddr = system['SystemAddress']
+        except ValueError:
+            line_routes.append((None, n + 1, "Missing property", system))
+        else:
+            starpos = [math.floor(v * 32 + 0.5) / 32.0 for v in starpos]
+            batch.append((sysname, starpos, sysaddr))
+            batchentries.append((len(line_routes), n + 1))
+            line_routes.append(None)
+
+    # Resolve all systems in the route together
+    results = sysdb.getsystems(timer, batch)
+    timer.time('sysquery')
+
+    for (index, entrynum), result in zip(batchentries, results):
+        (system, sysRejectReason, sysRejectData) = result
+        line_routes[index] = (
+            system,
+            entrynum,
+            sysRejectReason,
+            sysRejectData
+        )
+
+    return line_routes
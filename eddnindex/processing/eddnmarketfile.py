@@ -2,7 +2,6 @@ import os
 import os.path
 import sys
 import json
-import bz2
 from datetime import datetime, timedelta
 from typing import Callable, Tuple
 from collections.abc import MutableSequence as List
@@ -11,6 +10,21 @@ from ..types import EDDNFile, EDDNStation, Writable
 from ..eddnsysdb import EDDNSysDB
 from ..util import timestamp_to_datetime
 from ..timer import Timer
+from .. import jsondecode
+from ..reader import BZ2LineReader, LineBlockBuilder, select_line_ranges
+
+
+market_header_fields = [
+    'gatewayTimestamp',
+    'softwareName'
+]
+
+market_message_fields = [
+    'timestamp',
+    'systemName',
+    'stationName',
+    'marketId'
+]
 
 
 def process(sysdb: EDDNSysDB,
@@ -39,9 +53,26 @@ def process(sysdb: EDDNSysDB,
             updatetitleprogress(f'{date_str}:{file_prefix}')
             statinfo = os.stat(fn)
             comprsize = statinfo.st_size
-            with bz2.BZ2File(fn, 'r') as f:
-                stnlines = sysdb.getstationfilelines(fileinfo.id)
-                infolines = sysdb.getinfofilelines(fileinfo.id)
+            stnlines = sysdb.getstationfilelines(fileinfo.id)
+            infolines = sysdb.getinfofilelines(fileinfo.id)
+            ranges = None
+            blockoffsets = None
+
+            if fileinfo.line_count is not None:
+                # Only read the blocks of lines that are not yet indexed
+                ranges = select_line_ranges(
+                    sysdb.getfilelineblocks(fileinfo.id),
+                    fileinfo.line_count,
+                    lambda n: n not in stnlines or n not in infolines
+                )
+
+            if ranges is not None:
+                blockoffsets = sysdb.getfilecompressedblocks(fileinfo.id)
+
+            with BZ2LineReader(fn,
+                               ranges=ranges,
+                               block_offsets=blockoffsets) as f:
+                lineblocks = LineBlockBuilder()
                 linecount = 0
                 totalsize = 0
                 stntoinsert: List[Tuple[int, int, EDDNStation]] = []
@@ -50,7 +81,7 @@ def process(sysdb: EDDNSysDB,
                     int, int, float, int, int, int
                 ]] = []
                 timer.time('load')
-                for lineno, line in enumerate(f):
+                for lineno, line in f.numbered():
                     process_line(
                         sysdb,
                         timer,
@@ -65,6 +96,7 @@ def process(sysdb: EDDNSysDB,
                         line
                     )
 
+                    lineblocks.add(lineno, totalsize)
                     linecount += 1
                     totalsize += len(line)
 
@@ -94,15 +126,22 @@ def process(sysdb: EDDNSysDB,
 
                 sys.stderr.write(f'  {linecount}\n')
 
-                sysdb.updatefileinfo(
-                    fileinfo.id,
-                    linecount,
-                    totalsize,
-                    comprsize,
-                    0,
-                    linecount,
-                    0
-                )
+                if ranges is None:
+                    sysdb.updatefileblocks(
+                        fileinfo.id,
+                        lineblocks.blocks,
+                        f.block_offsets
+                    )
+
+                    sysdb.updatefileinfo(
+                        fileinfo.id,
+                        linecount,
+                        totalsize,
+                        comprsize,
+                        0,
+                        linecount,
+                        0
+                    )
 
         sysdb.commit()
         timer.time('commit')
@@ -128,20 +167,18 @@ def process_line(sysdb: EDDNSysDB,
         timer.time('read')
 
         try:
-            msg = json.loads(line)
-            body = msg['message']
-            hdr = msg['header']
+            hdr, body = jsondecode.extract(
+                line,
+                market_header_fields,
+                market_message_fields
+            )
             sysname = body['systemName']
             stationname = body['stationName']
             marketid = body.get('marketId')
             timestamp = body.get('timestamp')
             gwtimestamp = hdr.get('gatewayTimestamp')
             software = hdr.get('softwareName')
-        except (OverflowError,
-                ValueError,
-                TypeError,
-                json.JSONDecodeError
-                ):
+        except jsondecode.DecodeErrors:
             print('Error: {0}'.format(sys.exc_info()[1]))
 
             msg = {
@@ -176,7 +213,6 @@ def process_line(sysdb: EDDNSysDB,
                     infotoinsert,
                     lineno,
                     line,
-                    msg,
                     body,
                     sysname,
                     stationname,
@@ -197,7 +233,6 @@ def process_station(sysdb,
                     infotoinsert,
                     lineno,
                     line,
-                    msg,
                     body,
                     sysname,
                     stationname,
@@ -243,6 +278,7 @@ def process_station(sysdb,
             )]
 
     else:
+        msg = jsondecode.loads(line)
         msg['rejectReason'] = rejectReason
         msg['rejectData'] = rejectData
         rejectout.write(json.dumps(msg) + '\n')
@@ -1,16 +1,25 @@
 import os
 import os.path
 import sys
+import re
 import json
-import bz2
-from typing import Any, Callable, Tuple
+from typing import Any, Callable, Optional, Tuple
 from collections.abc import MutableSequence as List
 
+import numpy
+
 from ..types import EDSMFile, Writable
 from .. import constants
 from ..eddnsysdb import EDDNSysDB
-from ..util import timestamp_to_datetime
+from ..util import timestamp_to_datetime, timestamps_to_seconds
 from ..timer import Timer
+from .. import jsondecode
+from ..reader import BZ2LineReader
+from ..checkpoint import Checkpoint
+
+
+edsm_body_id_re = re.compile(rb'^\s*\{\s*"id"\s*:\s*(\d+)\s*,')
+edsm_body_update_time_re = re.compile(rb'"updateTime"\s*:\s*"([^"]*)"')
 
 
 def process(sysdb: EDDNSysDB,
@@ -21,7 +30,9 @@ def process(sysdb: EDDNSysDB,
             rejectout: Writable,
             updatetitleprogress: Callable[[str], None],
             edsm_bodies_dir: str,
-            edsm_dump_dir: str
+            edsm_dump_dir: str,
+            checkpoint_dir: str,
+            resume: bool
             ):
     fn = None
 
@@ -54,44 +65,92 @@ def process(sysdb: EDDNSysDB,
                 f'{filename} ({body_line_count} / {line_count})\n'
             )
 
-            with bz2.BZ2File(fn, 'r') as f:
+            checkpoint = Checkpoint(
+                os.path.join(checkpoint_dir, f'edsmbodies-{filename}.json')
+            )
+
+            start = None
+            ranges = None
+
+            if resume:
+                start = checkpoint.load(fn, sysdb.edsmbodycache.generation)
+
+            if start is not None:
+                sys.stderr.write(f'Resuming from line {start[0]}\n')
+                ranges = [(start[0], sys.maxsize, start[1])]
+            else:
+                start = (0, 0)
+
+            with BZ2LineReader(fn, ranges=ranges) as f:
                 lines = sysdb.getedsmbodyfilelines(fileinfo.id)
-                linecount = 0
-                totalsize = 0
+                linecount, totalsize = start
                 bodiestoinsert: List[Tuple[int, int, int]] = []
                 timer.time('load')
                 updatecache = False
 
-                for lineno, line in enumerate(f):
-                    updatecache |= process_line(
+                for batchlineno, batch in f.batches():
+                    changed, edsmids, linked = find_changed(
                         sysdb,
-                        fileinfo,
-                        timer,
-                        rejectout,
                         lines,
-                        bodiestoinsert,
-                        lineno,
-                        line
+                        batchlineno,
+                        batch
                     )
 
-                    linecount += 1
-                    totalsize += len(line)
-
-                    if (linecount % 1000) == 0:
-                        commit(sysdb, timer, bodiestoinsert)
-
-                        bodiestoinsert = []
-                        sys.stderr.write('.')
-                        sys.stderr.flush()
-
-                        if (linecount % 64000) == 0:
-                            sys.stderr.write(f'  {linecount}\n')
+                    timer.time('prefilter', len(batch))
+
+                    for i, line in enumerate(batch):
+                        lineno = batchlineno + i
+
+                        if changed[i]:
+                            updatecache |= process_line(
+                                sysdb,
+                                fileinfo,
+                                timer,
+                                rejectout,
+                                lines,
+                                bodiestoinsert,
+                                lineno,
+                                line
+                            )
+                        elif linked[i] == 0:
+                            bodiestoinsert.append(
+                                (fileinfo.id, lineno + 1, int(edsmids[i]))
+                            )
+
+                        linecount += 1
+                        totalsize += len(line)
+
+                        if (linecount % 1000) == 0:
+                            commit(sysdb, timer, bodiestoinsert)
+
+                            bodiestoinsert = []
+                            sys.stderr.write('.')
                             sys.stderr.flush()
-                            updatetitleprogress(f'{filename}:{linecount}')
 
-                            if updatecache:
-                                sysdb.saveedsmbodycache()
-                                updatecache = False
+                            if (linecount % 64000) == 0:
+                                sys.stderr.write(f'  {linecount}\n')
+                                sys.stderr.flush()
+                                updatetitleprogress(
+                                    f'{filename}:{linecount}'
+                                )
+
+                                if updatecache:
+                                    sysdb.saveedsmbodycache(
+                                        lambda generation: checkpoint.save(
+                                            fn,
+                                            generation,
+                                            linecount,
+                                            totalsize
+                                        )
+                                    )
+                                    updatecache = False
+                                else:
+                                    checkpoint.save(
+                                        fn,
+                                        sysdb.edsmbodycache.generation,
+                                        linecount,
+                                        totalsize
+                                    )
 
             commit(sysdb, timer, bodiestoinsert)
 
@@ -107,6 +166,68 @@ def process(sysdb: EDDNSysDB,
                 totalsize,
                 comprsize
             )
+            checkpoint.clear()
+
+
+def cached_bodies(sysdb: EDDNSysDB,
+                  edsmids: numpy.ndarray
+                  ) -> numpy.ndarray:
+    cache = sysdb.edsmbodyids
+    valid = (edsmids > 0) & (edsmids < len(cache))
+    cached = numpy.zeros(len(edsmids), bool)
+    cached[valid] = cache['body_id'][edsmids[valid]] != 0
+    return cached
+
+
+def find_changed(sysdb: EDDNSysDB,
+                 lines,
+                 lineno: int,
+                 batch: List[bytes]
+                 ) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Reads the EDSM body id and update time from the raw bytes of a batch
+    of lines, and compares them with the body cache.  Returns a mask of
+    the lines that need to be fully parsed, the EDSM body ids (0 if not
+    found) and the EDSM body ids the lines are already linked to.
+
+    Lines that are linked to a cached body, or whose body is cached with
+    the same update time, are not parsed.
+    """
+
+    count = len(batch)
+    edsmids = numpy.zeros(count, numpy.int64)
+    timestamps: List[Optional[str]] = [None] * count
+
+    for i, line in enumerate(batch):
+        idmatch = edsm_body_id_re.match(line)
+        tsmatch = edsm_body_update_time_re.search(line)
+
+        if idmatch is not None and tsmatch is not None:
+            edsmids[i] = int(idmatch[1])
+            timestamps[i] = tsmatch[1].decode('utf-8', 'replace')
+
+    seconds = timestamps_to_seconds(timestamps)
+
+    linenos = numpy.arange(lineno + 1, lineno + 1 + count)
+    linked = numpy.zeros(count, numpy.int64)
+    inrange = linenos < len(lines)
+
+    if inrange.any():
+        linked[inrange] = lines[linenos[inrange]]
+
+    # Looks up the body ids and linked body ids in a single pass
+    cached = cached_bodies(sysdb, numpy.concatenate([edsmids, linked]))
+    unchanged = cached[:count] & (seconds >= 0)
+    unchanged[unchanged] = (
+        sysdb.edsmbodyids['timestamp_seconds'][edsmids[unchanged]]
+        == seconds[unchanged]
+    )
+
+    return (
+        ~(cached[count:] | unchanged),
+        edsmids,
+        linked
+    )
 
 
 def commit(sysdb: EDDNSysDB,
@@ -136,7 +257,7 @@ def process_line(sysdb: EDDNSysDB,
             or lines[lineno + 1] > len(sysdb.edsmbodyids)
             or sysdb.edsmbodyids[lines[lineno + 1]][0] == 0):
         try:
-            msg = json.loads(line)
+            msg = jsondecode.loads(line)
             edsmbodyid = msg['id']
             bodyid = msg['bodyId']
             bodyname = msg['name']
@@ -147,11 +268,7 @@ def process_line(sysdb: EDDNSysDB,
             semimajor = msg.get('semiMajorAxis')
             bodytype = msg['type']
             subtype = msg['subType']
-        except (OverflowError,
-                ValueError,
-                TypeError,
-                json.JSONDecodeError
-                ):
+        except jsondecode.DecodeErrors:
             sys.stderr.write(
                 f'Error: {sys.exc_info()[0]}\n'
             )
@@ -1,42 +1,26 @@
 import sys
-from typing import Callable, Optional
+from typing import Any, Callable, Optional
 from collections.abc import MutableSequence as List
-import urllib.request
-import urllib.error
 import json
-import time
 import math
 
+import numpy
+
 from ..types import Writable
 from ..eddnsysdb import EDDNSysDB
 from ..timer import Timer
 from ..util import timestamp_to_datetime
+from ..edsmapi import EDSMClient, RequestErrors
 
 
-def updatesystemfromedsmbyid(sysdb: EDDNSysDB,
-                             edsmid: int,
-                             timer: Timer,
-                             rejectout: Writable
-                             ) -> bool:
-    url = ('https://www.edsm.net/api-v1/system?'
-           f'systemId={edsmid}'
-           '&coords=1'
-           '&showId=1'
-           '&submitted=1'
-           '&includeHidden=1')
-
+def updatesystemfromedsm(sysdb: EDDNSysDB,
+                         msg: Any,
+                         timer: Timer,
+                         rejectout: Writable
+                         ) -> bool:
     starpos: Optional[List[float]]
 
     try:
-        while True:
-            try:
-                with urllib.request.urlopen(url) as f:
-                    msg = json.load(f)
-            except urllib.error.URLError:
-                time.sleep(30)
-            else:
-                break
-
         if type(msg) is dict:
             edsmsysid = msg['id']
             sysaddr = msg['id64']
@@ -110,66 +94,90 @@ def updatesystemfromedsmbyid(sysdb: EDDNSysDB,
         return True
 
 
+def find_candidates(sysdb: EDDNSysDB,
+                    chunk_size: int = 1048576
+                    ) -> numpy.ndarray:
+    """
+    Returns the EDSM ids of the cached systems that were not seen in the
+    last pass over the dumps and are not already marked as deleted.
+    """
+
+    recs = sysdb.edsmsysids
+    candidates: List[numpy.ndarray] = [numpy.empty(0, numpy.int64)]
+
+    for start in range(0, len(recs), chunk_size):
+        chunk = recs[start:start + chunk_size]
+        mask = ((chunk['edsm_id'] == numpy.arange(start, start + len(chunk)))
+                & (chunk['edsm_id'] != 0)
+                & (chunk['processed'] <= 0)
+                & (chunk['is_deleted'] == 0))
+        candidates.append(chunk['edsm_id'][mask].astype(numpy.int64))
+
+    return numpy.concatenate(candidates)
+
+
 def process(sysdb: EDDNSysDB,
             timer: Timer,
             rejectout: Writable,
-            updatetitleprogress: Callable[[str], None]
+            updatetitleprogress: Callable[[str], None],
+            edsmclient: EDSMClient,
+            batch_size: int = 100
             ):
     sys.stderr.write('Processing EDSM deleted systems\n')
     w = 0
-    w2 = 0
     i = 0
     from timeit import default_timer
     tstart = default_timer()
 
-    # for row in sysdb.edsmsysids:
-    #     row[5] = 0
-    #
-    # sysdb.saveedsmsyscache()
-
-    for i, row in enumerate(sysdb.edsmsysids):
-        if row[1] == i and row[6] <= 0 and row[5] == 0:
-            sys.stderr.write('{0:10d}'.format(row[1]) + '\b' * 10)
-            sys.stderr.flush()
-            rec = row
+    edsmids = find_candidates(sysdb)
+    timer.time('sysquery', len(edsmids))
+    sys.stderr.write(f'{len(edsmids)} systems to verify\n')
+
+    for edsmid, future in edsmclient.pipeline(
+            edsmclient.get_system,
+            (int(edsmid) for edsmid in edsmids)):
+        try:
+            msg = future.result()
+        except RequestErrors:
+            sys.stderr.write(f'Error: {sys.exc_info()[1]}\n')
+            timer.time('error')
+        else:
+            timer.time('edsmhttp', 0)
+            rec = sysdb.edsmsysids[edsmid]
 
-            if not updatesystemfromedsmbyid(sysdb, row[1], timer, rejectout):
+            if not updatesystemfromedsm(sysdb, msg, timer, rejectout):
                 rec = sysdb.updateedsmsysid(
-                    row[1],
-                    row[0],
-                    row[2],
+                    edsmid,
+                    rec[0],
+                    rec[2],
                     False,
                     False,
                     True
                 )
 
             rec.processed = 7
-
             w += 1
-            w2 += 1
 
-        if ((i + 1) % 1000) == 0:
+        i += 1
+
+        if (i % batch_size) == 0:
             sysdb.commit()
-            sys.stderr.write('.' if w == 0 else '*' + (' ' * 10) + ('\b' * 10))
+            sysdb.saveedsmsyscache()
+            sys.stderr.write('.' if w == 0 else '*')
             sys.stderr.flush()
+            w = 0
 
-            if ((i + 1) % 64000) == 0:
-                sys.stderr.write('  {0}\n'.format(i + 1))
+            if (i % (batch_size * 64)) == 0:
+                sys.stderr.write(f'  {i}\n')
                 sys.stderr.flush()
-                updatetitleprogress('EDSMSysDel:{0}'.format(i + 1))
-
-            if w2 >= 10:
-                sysdb.saveedsmsyscache()
-                w2 = 0
+                updatetitleprogress(f'EDSMSysDel:{i}')
 
             timer.time('commit')
 
-            w = 0
-
             if default_timer() - tstart > 18 * 60 * 60:
                 break
 
-    sys.stderr.write('  {0}\n'.format(i + 1))
+    sys.stderr.write(f'  {i}\n')
     sys.stderr.flush()
     sysdb.commit()
     sysdb.saveedsmsyscache()
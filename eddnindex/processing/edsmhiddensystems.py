@@ -1,11 +1,12 @@
 import sys
 import json
-import bz2
 from typing import Callable
 
 from ..types import Writable
 from ..eddnsysdb import EDDNSysDB
 from ..timer import Timer
+from .. import jsondecode
+from ..reader import BZ2LineReader
 
 
 def process(sysdb: EDDNSysDB,
@@ -15,18 +16,14 @@ def process(sysdb: EDDNSysDB,
             edsm_hidden_systems_file: str
             ):
     sys.stderr.write('Processing EDSM hidden systems\n')
-    with bz2.BZ2File(edsm_hidden_systems_file, 'r') as f:
+    with BZ2LineReader(edsm_hidden_systems_file) as f:
         w = 0
         for i, line in enumerate(f):
             timer.time('read')
             try:
-                msg = json.loads(line)
+                msg = jsondecode.loads(line)
                 edsmsysid = msg['id']
-            except (OverflowError,
-                    ValueError,
-                    TypeError,
-                    json.JSONDecodeError
-                    ):
+            except jsondecode.DecodeErrors:
                 sys.stderr.write('Error: {0}\n'.format(sys.exc_info()[0]))
                 rejectmsg = {
                     'rejectReason': 'Invalid',
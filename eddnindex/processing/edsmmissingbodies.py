@@ -4,9 +4,6 @@ import sys
 import json
 from datetime import datetime
 from typing import Callable, Any
-import urllib.request
-import urllib.error
-import time
 from collections.abc import MutableSequence as List, \
                             MutableMapping as Dict
 
@@ -15,57 +12,26 @@ from ..eddnsysdb import EDDNSysDB
 from ..util import timestamp_to_datetime
 from ..timer import Timer
 from ..types import EDSMBody
+from ..edsmapi import EDSMClient, RequestErrors
 
 
-def getbodiesfromedsmbyid(edsmid: int, timer: Timer) -> List[EDSMBody]:
-    url = f'https://www.edsm.net/api-body-v1/get?id={edsmid}'
-
-    while True:
-        try:
-            with urllib.request.urlopen(url) as f:
-                msg = json.load(f)
-                info = f.info()
-                ratereset = int(info["X-Rate-Limit-Reset"])
-                rateremain = int(info["X-Rate-Limit-Remaining"])
-                if ratereset > rateremain * 30:
-                    time.sleep(30)
-                elif ratereset > rateremain:
-                    time.sleep(ratereset / rateremain)
-        except urllib.error.URLError:
-            time.sleep(60)
-        else:
-            break
+def getbodiesfromedsmbyid(edsmclient: EDSMClient,
+                          edsmid: int
+                          ) -> List[EDSMBody]:
+    msg = edsmclient.get_body(edsmid)
 
     if type(msg) is dict and 'system' in msg:
         edsmsys = msg['system']
         edsmsysid = edsmsys['id']
     else:
-        timer.time('edsmhttp')
         return []
 
-    url = f'https://www.edsm.net/api-system-v1/bodies?systemId={edsmsysid}'
-
-    while True:
-        try:
-            with urllib.request.urlopen(url) as f:
-                msg = json.load(f)
-                info = f.info()
-                ratereset = int(info["X-Rate-Limit-Reset"])
-                rateremain = int(info["X-Rate-Limit-Remaining"])
-                if ratereset > rateremain * 30:
-                    time.sleep(30)
-                elif ratereset > rateremain:
-                    time.sleep(ratereset / rateremain)
-        except urllib.error.URLError:
-            time.sleep(30)
-        else:
-            break
+    msg = edsmclient.get_system_bodies(edsmsysid)
 
     if type(msg) is dict:
         sysid64 = msg['id64']
         sysname = msg['name']
     else:
-        timer.time('edsmhttp')
         return []
 
     for body in msg['bodies']:
@@ -73,19 +39,19 @@ def getbodiesfromedsmbyid(edsmid: int, timer: Timer) -> List[EDSMBody]:
         body['systemName'] = sysname
         body['systemId64'] = sysid64
 
-    timer.time('edsmhttp')
     return msg['bodies']
 
 
 def process(sysdb: EDDNSysDB,
             timer: Timer,
             updatetitleprogress: Callable[[str], None],
-            edsm_bodies_dir: str
+            edsm_bodies_dir: str,
+            edsmclient: EDSMClient
             ):
     sys.stderr.write('Processing EDSM missing bodies\n')
     w = 0
     wg = 0
-    w2 = 0
+    i = 0
 
     fn = 'fetchbodies-{0}.jsonl'.format(datetime.utcnow().isoformat())
     fileid = sysdb.insertedsmfile(fn)
@@ -94,55 +60,74 @@ def process(sysdb: EDDNSysDB,
 
     filename = os.path.join(edsm_bodies_dir, fn)
 
+    start = 148480000 - 256000
+    end = len(sysdb.edsmbodyids) - 2097152
+
+    # Filtered as they are requested rather than up front, as each
+    # response can fill in the other bodies in the same system
+    edsmids = (
+        edsmid for edsmid in range(start, end)
+        if sysdb.edsmbodyids[edsmid]['edsm_id'] == 0
+    )
+
     with open(filename, 'w', encoding='utf-8') as f:
         linecount = 0
         totalsize = 0
 
-        for i in range(148480000 - 256000, len(sysdb.edsmbodyids) - 2097152):
-            row = sysdb.edsmbodyids[i]
-
-            if row[1] == 0:
-                sys.stderr.write('{0:10d}'.format(i) + '\b' * 10)
-                sys.stderr.flush()
-
-                bodies = getbodiesfromedsmbyid(i, timer)
-
-                if len(bodies) == 0:
-                    sysdb.updateedsmbodyid(
-                        0,
-                        i,
-                        constants.timestamp_base_date
-                    )
-                else:
-                    bodiestoinsert = []
-                    for msg in bodies:
-                        line = json.dumps(msg)
-                        f.write(line + '\n')
-                        f.flush()
-                        linecount += 1
-                        totalsize += len(line) + 1
-                        bodiestoinsert += [(fileid, linecount + 1, msg['id'])]
-                        wg += 1
-
-                        process_body(
-                            sysdb,
-                            timer,
-                            msg
-                        )
-
-                    sysdb.addedsmfilelinebodies(bodiestoinsert)
-                    timer.time('bodyinsert', len(bodiestoinsert))
-                    sysdb.updateedsmfileinfo(
-                        fileid,
-                        linecount,
-                        totalsize,
-                        totalsize
+        for n, (i, future) in enumerate(edsmclient.pipeline(
+                lambda edsmid: getbodiesfromedsmbyid(edsmclient, edsmid),
+                edsmids), 1):
+            sys.stderr.write('{0:10d}'.format(i) + '\b' * 10)
+            sys.stderr.flush()
+
+            try:
+                bodies = future.result()
+            except RequestErrors:
+                sys.stderr.write(f'Error: {sys.exc_info()[1]}\n')
+                timer.time('error')
+                continue
+            except (KeyError, TypeError):
+                sys.stderr.write(f'Malformed response for body {i}\n')
+                timer.time('error')
+                continue
+
+            timer.time('edsmhttp')
+
+            if len(bodies) == 0:
+                sysdb.updateedsmbodyid(
+                    0,
+                    i,
+                    constants.timestamp_base_date
+                )
+            else:
+                bodiestoinsert = []
+                for msg in bodies:
+                    line = json.dumps(msg)
+                    f.write(line + '\n')
+                    f.flush()
+                    linecount += 1
+                    totalsize += len(line) + 1
+                    bodiestoinsert += [(fileid, linecount + 1, msg['id'])]
+                    wg += 1
+
+                    process_body(
+                        sysdb,
+                        timer,
+                        msg
                     )
 
-                w += 1
-                w2 += 1
+                sysdb.addedsmfilelinebodies(bodiestoinsert)
+                timer.time('bodyinsert', len(bodiestoinsert))
+                sysdb.updateedsmfileinfo(
+                    fileid,
+                    linecount,
+                    totalsize,
+                    totalsize
+                )
+
+            w += 1
 
-            if ((i + 1) % 1000) == 0:
+            if (n % 100) == 0:
                 sysdb.commit()
 
                 sys.stderr.write(
@@ -152,23 +137,17 @@ def process(sysdb: EDDNSysDB,
 
                 sys.stderr.flush()
 
-                if ((i + 1) % 64000) == 0:
+                if (n % 6400) == 0:
                     sys.stderr.write(f'  {i + 1}\n')
                     sys.stderr.flush()
                     updatetitleprogress(f'EDSMBodyM:{i + 1}')
 
-                if w2 >= 10:
-                    sysdb.saveedsmbodycache()
-                    w2 = 0
-
+                sysdb.saveedsmbodycache()
                 timer.time('commit')
 
                 w = 0
                 wg = 0
 
-                # if default_timer() - tstart > 18 * 60 * 60:
-                #     break
-
         sys.stderr.write('  {0}\n'.format(i + 1))
         sys.stderr.flush()
         sysdb.commit()
@@ -9,6 +9,7 @@ from .. import constants
 from ..eddnsysdb import EDDNSysDB
 from ..util import timestamp_to_datetime
 from ..timer import Timer
+from .. import jsondecode
 
 
 def process(sysdb: EDDNSysDB,
@@ -18,10 +19,9 @@ def process(sysdb: EDDNSysDB,
             edsm_stations_file: str
             ):
     sys.stderr.write('Processing EDSM stations\n')
-    with gzip.open(edsm_stations_file, 'r') as f:
-        stations = json.load(f)
+    with gzip.open(edsm_stations_file, 'rt', encoding='utf-8') as f:
         w = 0
-        for i, msg in enumerate(stations):
+        for i, msg in enumerate(jsondecode.iter_array(f)):
             process_station(
                 sysdb,
                 timer,
@@ -64,11 +64,7 @@ def process_station(sysdb: EDDNSysDB,
         edsmsysid = msg['systemId']
         sysname = msg['systemName']
         timestamp = msg['updateTime']['information'].replace(' ', 'T')
-    except (OverflowError,
-            ValueError,
-            TypeError,
-            json.JSONDecodeError
-            ):
+    except jsondecode.DecodeErrors:
         sys.stderr.write('Error: {0}\n'.format(sys.exc_info()[0]))
         rejectmsg = {
             'rejectReason': 'Invalid',
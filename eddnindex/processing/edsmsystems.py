@@ -1,56 +1,158 @@
+import os.path
 import sys
+import re
 import json
-import bz2
 import math
-from typing import Any, Callable
-from collections.abc import MutableMapping as Dict
+from typing import Any, Callable, Optional
+from collections.abc import MutableSequence as List, \
+                            MutableMapping as Dict
+
+import numpy
 
 from ..types import Writable
 from .. import constants
 from ..eddnsysdb import EDDNSysDB
-from ..util import timestamp_to_datetime
+from ..util import timestamp_to_datetime, timestamps_to_seconds
 from ..timer import Timer
+from .. import jsondecode
+from ..reader import BZ2LineReader
+from ..checkpoint import Checkpoint
+
+
+edsm_system_id_re = re.compile(rb'^\s*\{\s*"id"\s*:\s*(\d+)\s*,')
+edsm_system_date_re = re.compile(rb'"date"\s*:\s*"([^"]*)"')
 
 
 def process(sysdb: EDDNSysDB,
             timer: Timer,
             rejectout: Writable,
             updatetitleprogress: Callable[[str], None],
-            edsm_systems_file: str
+            edsm_systems_file: str,
+            checkpoint_dir: str,
+            resume: bool
             ):
     sys.stderr.write('Processing EDSM systems\n')
-    for i, rec in enumerate(sysdb.edsmsysids):
-        if rec[1] == i and rec[5] == 0:
-            rec.processed -= 1
+    checkpoint = Checkpoint(os.path.join(checkpoint_dir, 'edsmsystems.json'))
+    start = None
+
+    if resume:
+        start = checkpoint.load(
+            edsm_systems_file,
+            sysdb.edsmsyscache.generation
+        )
+
+    if start is None:
+        start = (0, 0)
+
+        reset_processed(sysdb)
+        timer.time('resetprocessed')
+
+        # Resuming must not reset the processed counts a second time
+        sysdb.saveedsmsyscache(
+            lambda generation: checkpoint.save(
+                edsm_systems_file,
+                generation,
+                0,
+                0
+            )
+        )
+    else:
+        sys.stderr.write(f'Resuming from line {start[0]}\n')
 
-    i = 0
+    lineno, totalsize = start
+    ranges = None
 
-    with bz2.BZ2File(edsm_systems_file, 'r') as f:
+    if lineno != 0:
+        ranges = [(lineno, sys.maxsize, totalsize)]
+
+    i = lineno - 1
+
+    with BZ2LineReader(edsm_systems_file, ranges=ranges) as f:
         w = 0
-        for i, line in enumerate(f):
+        for batchlineno, batch in f.batches():
             timer.time('read')
-            w += process_line(sysdb, timer, rejectout, line)
+            changed = find_changed(sysdb, batch)
+            timer.time('prefilter', len(batch))
+
+            for i, line in enumerate(batch, batchlineno):
+                if changed[i - batchlineno]:
+                    w += process_line(sysdb, timer, rejectout, line)
 
-            if ((i + 1) % 1000) == 0:
-                sysdb.commit()
-                sys.stderr.write('.' if w == 0 else '*')
-                sys.stderr.flush()
-                w = 0
+                totalsize += len(line)
 
-                if ((i + 1) % 64000) == 0:
-                    sys.stderr.write('  {0}\n'.format(i + 1))
+                if ((i + 1) % 1000) == 0:
+                    sysdb.commit()
+                    sys.stderr.write('.' if w == 0 else '*')
                     sys.stderr.flush()
-                    updatetitleprogress('EDSMSys:{0}'.format(i + 1))
-                    sysdb.saveedsmsyscache()
-                timer.time('commit')
+                    w = 0
+
+                    if ((i + 1) % 64000) == 0:
+                        sys.stderr.write('  {0}\n'.format(i + 1))
+                        sys.stderr.flush()
+                        updatetitleprogress('EDSMSys:{0}'.format(i + 1))
+                        sysdb.saveedsmsyscache(
+                            lambda generation: checkpoint.save(
+                                edsm_systems_file,
+                                generation,
+                                i + 1,
+                                totalsize
+                            )
+                        )
+                    timer.time('commit')
 
     sys.stderr.write('  {0}\n'.format(i + 1))
     sys.stderr.flush()
     sysdb.commit()
     sysdb.saveedsmsyscache()
+    checkpoint.clear()
     timer.time('commit')
 
 
+def reset_processed(sysdb: EDDNSysDB, chunk_size: int = 1048576):
+    recs = sysdb.edsmsysids
+
+    for start in range(0, len(recs), chunk_size):
+        chunk = recs[start:start + chunk_size]
+        mask = ((chunk['edsm_id'] == numpy.arange(start, start + len(chunk)))
+                & (chunk['is_deleted'] == 0))
+        chunk['processed'][mask] -= 1
+
+
+def find_changed(sysdb: EDDNSysDB, batch: List[bytes]) -> numpy.ndarray:
+    """
+    Reads the EDSM system id and date from the raw bytes of a batch of
+    lines, and compares them with the system cache.  Systems that are
+    cached with coordinates and the same date are marked as processed,
+    and a mask of the remaining lines that need to be fully parsed is
+    returned.
+    """
+
+    count = len(batch)
+    edsmids = numpy.zeros(count, numpy.int64)
+    timestamps: List[Optional[str]] = [None] * count
+
+    for i, line in enumerate(batch):
+        idmatch = edsm_system_id_re.match(line)
+        tsmatch = edsm_system_date_re.search(line)
+
+        if idmatch is not None and tsmatch is not None:
+            edsmids[i] = int(idmatch[1])
+            timestamps[i] = tsmatch[1].decode('utf-8', 'replace')
+
+    seconds = timestamps_to_seconds(timestamps)
+
+    recs = sysdb.edsmsysids
+    unchanged = (edsmids > 0) & (edsmids < len(recs)) & (seconds >= 0)
+    cached = recs[edsmids[unchanged]]
+    unchanged[unchanged] = ((cached['system_id'] != 0)
+                            & (cached['has_coords'] != 0)
+                            & (cached['timestamp_seconds']
+                               == seconds[unchanged]))
+
+    recs['processed'][edsmids[unchanged]] = 7
+    return ~unchanged
+
+
 def process_line(sysdb: EDDNSysDB,
                  timer: Timer,
                  rejectout: Writable,
@@ -60,18 +162,14 @@ def process_line(sysdb: EDDNSysDB,
     rejectmsg: Dict[str, Any]
 
     try:
-        msg = json.loads(line)
+        msg = jsondecode.loads(line)
         edsmsysid = msg['id']
         sysaddr = msg['id64']
         sysname = msg['name']
         coords = msg['coords']
         starpos = [coords['x'], coords['y'], coords['z']]
         timestamp = msg['date'].replace(' ', 'T')
-    except (OverflowError,
-            ValueError,
-            TypeError,
-            json.JSONDecodeError
-            ):
+    except jsondecode.DecodeErrors:
         sys.stderr.write('Error: {0}\n'.format(sys.exc_info()[0]))
         rejectmsg = {
                     'rejectReason': 'Invalid',
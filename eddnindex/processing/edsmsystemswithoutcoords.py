@@ -1,6 +1,5 @@
 import sys
 import json
-import bz2
 from typing import Any, Callable
 from collections.abc import MutableMapping as Dict
 
@@ -9,6 +8,8 @@ from .. import constants
 from ..eddnsysdb import EDDNSysDB
 from ..util import timestamp_to_datetime
 from ..timer import Timer
+from .. import jsondecode
+from ..reader import BZ2LineReader
 
 
 def process(sysdb: EDDNSysDB,
@@ -18,7 +19,7 @@ def process(sysdb: EDDNSysDB,
             edsm_systems_without_coords_file: str
             ):
     sys.stderr.write('Processing EDSM systems without coords\n')
-    with bz2.BZ2File(edsm_systems_without_coords_file, 'r') as f:
+    with BZ2LineReader(edsm_systems_without_coords_file) as f:
         w = 0
         for i, line in enumerate(f):
             timer.time('read')
@@ -53,12 +54,12 @@ def process_line(sysdb: EDDNSysDB,
     rejectmsg: Dict[str, Any]
 
     try:
-        msg = json.loads(line)
+        msg = jsondecode.loads(line)
         edsmsysid = msg['id']
         sysaddr = msg['id64']
         sysname = msg['name']
         timestamp = msg['date'].replace(' ', 'T')
-    except (OverflowError, ValueError, TypeError, json.JSONDecodeError):
+    except jsondecode.DecodeErrors:
         sys.stderr.write('Error: {0}\n'.format(sys.exc_info()[0]))
         rejectmsg = {
                     'rejectReason': 'Invalid',
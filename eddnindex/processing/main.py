@@ -1,13 +1,15 @@
 import sys
-from typing import Callable
+from typing import Callable, Tuple
+from collections.abc import MutableSequence as List
 
 from ..config import Config
-from ..types import Writable
+from ..types import EDDNFile, Writable
 from ..args import ProcessorArgs
 from ..eddnsysdb import EDDNSysDB
 from ..database import DBConnection
 from ..timer import Timer
 from ..rejectdata import EDDNRejectData
+from ..edsmapi import EDSMClient, ResponseCache
 
 from .edsmmissingbodies import process \
     as edsmmissingbodies
@@ -33,6 +35,7 @@ from .eddnjournalroute import process \
     as eddnjournalroute
 from .eddnmarketfile import process \
     as eddnmarketfile
+from .workerpool import process_files
 
 
 def main(args: ProcessorArgs,
@@ -41,7 +44,7 @@ def main(args: ProcessorArgs,
          updatetitleprogress: Callable[[str], None]
          ):
     conn = DBConnection()
-    conn.open(config.database)
+    conn.open(config.database, local_infile=args.bulk_load)
 
     sysdb = EDDNSysDB(
         conn,
@@ -50,29 +53,47 @@ def main(args: ProcessorArgs,
         args.eddb_systems,
         config.edsm_systems_cache_file,
         config.edsm_bodies_cache_file,
-        config.known_bodies_sheet_uri
+        config.eddb_systems_cache_file,
+        config.known_bodies_sheet_uri,
+        config.known_bodies_snapshot_file,
+        config.known_bodies_max_age,
+        config.system_cache_size,
+        config.system_cache_ttl,
+        config.system_cache_negative_ttl,
+        config.startup_snapshot_file
     )
 
+    if args.spatial_index:
+        sysdb.enablespatialindex(config.systems_spatial_index_file)
+
     timer.time('init')
 
     reject_file: Writable
 
     if not args.no_eddn:
-        process_eddn_data(args, config, timer, updatetitleprogress, sysdb)
+        if args.bulk_load:
+            sysdb.enablebulkload(config.bulk_load_dir)
+
+        try:
+            process_eddn_data(args, config, timer, updatetitleprogress, sysdb)
+        finally:
+            sysdb.closebulkload()
 
     if args.edsm_systems:
-        process_edsm_systems(config, timer, updatetitleprogress, sysdb)
+        process_edsm_systems(args, config, timer, updatetitleprogress, sysdb)
 
     if args.edsm_bodies:
         process_edsm_bodies(args, config, timer, updatetitleprogress, sysdb)
 
     if args.edsm_missing_bodies:
-        edsmmissingbodies(
-            sysdb,
-            timer,
-            updatetitleprogress,
-            config.edsm_bodies_dir
-        )
+        with create_edsm_client(config) as edsmclient:
+            edsmmissingbodies(
+                sysdb,
+                timer,
+                updatetitleprogress,
+                config.edsm_bodies_dir,
+                edsmclient
+            )
 
     if args.edsm_stations:
         with open(config.edsm_stations_reject_file,
@@ -95,9 +116,30 @@ def main(args: ProcessorArgs,
                 timer,
                 reject_file,
                 updatetitleprogress,
-                config.eddb_systems_file
+                config.eddb_systems_file,
+                config.checkpoint_dir,
+                args.resume
             )
 
+    conn.printstats()
+
+
+def create_edsm_client(config: Config) -> EDSMClient:
+    cache = None
+
+    if config.edsm_api_cache_size > 0:
+        cache = ResponseCache(
+            config.edsm_api_cache_dir,
+            config.edsm_api_cache_ttl,
+            config.edsm_api_cache_size
+        )
+
+    return EDSMClient(
+        config.edsm_api_base_url,
+        config.edsm_api_concurrency,
+        cache=cache
+    )
+
 
 def process_edsm_bodies(args: ProcessorArgs,
                         config: Config,
@@ -125,11 +167,14 @@ def process_edsm_bodies(args: ProcessorArgs,
                     reject_file,
                     updatetitleprogress,
                     config.edsm_bodies_dir,
-                    config.edsm_dump_dir
+                    config.edsm_dump_dir,
+                    config.checkpoint_dir,
+                    args.resume
                 )
 
 
-def process_edsm_systems(config: Config,
+def process_edsm_systems(args: ProcessorArgs,
+                         config: Config,
                          timer: Timer,
                          updatetitleprogress: Callable[[str], None],
                          sysdb: EDDNSysDB
@@ -142,7 +187,9 @@ def process_edsm_systems(config: Config,
             timer,
             reject_file,
             updatetitleprogress,
-            config.edsm_systems_file
+            config.edsm_systems_file,
+            config.checkpoint_dir,
+            args.resume
         )
 
         edsmsystemswithoutcoords(
@@ -169,12 +216,14 @@ def process_edsm_systems(config: Config,
             config.edsm_hidden_systems_file
         )
 
-        edsmdeletedsystems(
-            sysdb,
-            timer,
-            reject_file,
-            updatetitleprogress
-        )
+        with create_edsm_client(config) as edsmclient:
+            edsmdeletedsystems(
+                sysdb,
+                timer,
+                reject_file,
+                updatetitleprogress,
+                edsmclient
+            )
 
 
 def process_eddn_data(args: ProcessorArgs,
@@ -190,6 +239,34 @@ def process_eddn_data(args: ProcessorArgs,
     timer.time('init', 0)
     sys.stderr.write('Processing EDDN files\n')
     sys.stderr.flush()
+
+    if args.jobs > 1:
+        tasks: List[Tuple[str, str, EDDNFile]] = []
+
+        if not args.no_journal:
+            tasks += [
+                ('journal', filename, fileinfo)
+                for filename, fileinfo in files.items()
+                if fileinfo.event_type not in [None, 'NavRoute']
+            ]
+
+        if args.nav_route:
+            tasks += [
+                ('navroute', filename, fileinfo)
+                for filename, fileinfo in files.items()
+                if fileinfo.event_type in ['NavRoute']
+            ]
+
+        if args.market:
+            tasks += [
+                ('market', filename, fileinfo)
+                for filename, fileinfo in files.items()
+                if fileinfo.event_type is None
+            ]
+
+        process_files(sysdb, args, config, timer, updatetitleprogress, tasks)
+        return
+
     if not args.no_journal:
         for filename, fileinfo in files.items():
             if fileinfo.event_type not in [None, 'NavRoute']:
@@ -0,0 +1,152 @@
+import multiprocessing
+import sys
+from typing import Any, Callable, Dict, Optional, Tuple
+from collections.abc import MutableSequence as List
+
+from ..config import Config
+from ..args import ProcessorArgs
+from ..eddnsysdb import EDDNSysDB
+from ..database import DBConnection
+from ..timer import Timer
+from ..rejectdata import EDDNRejectData
+from ..types import EDDNFile
+
+from .eddnjournalfile import process \
+    as eddnjournalfile
+from .eddnjournalroute import process \
+    as eddnjournalroute
+from .eddnmarketfile import process \
+    as eddnmarketfile
+
+
+worker_sysdb: Optional[EDDNSysDB] = None
+worker_parent_conn: Optional[DBConnection] = None
+worker_args: Optional[ProcessorArgs] = None
+worker_config: Optional[Config] = None
+worker_reject_file: Optional[EDDNRejectData] = None
+worker_updatetitleprogress: Optional[Callable[[str], None]] = None
+
+
+def init_worker(sysdb: EDDNSysDB,
+                args: ProcessorArgs,
+                config: Config,
+                create_lock: Any,
+                updatetitleprogress: Callable[[str], None]
+                ):
+    global worker_sysdb
+    global worker_parent_conn
+    global worker_args
+    global worker_config
+    global worker_reject_file
+    global worker_updatetitleprogress
+
+    # The lookup tables loaded by the parent are inherited copy-on-write.
+    # The parent's connection must be kept referenced so that it is never
+    # closed from the worker, as that would close the parent's socket.
+    worker_parent_conn = sysdb.conn
+
+    conn = DBConnection()
+    conn.open(config.database, local_infile=args.bulk_load)
+    conn.create_lock = create_lock
+    sysdb.conn = conn
+
+    worker_sysdb = sysdb
+    worker_args = args
+    worker_config = config
+    worker_reject_file = EDDNRejectData(config.eddn_reject_dir)
+    worker_updatetitleprogress = updatetitleprogress
+
+
+def process_file(task: Tuple[str, str, EDDNFile]
+                 ) -> Tuple[Dict[str, float], Dict[str, int]]:
+    kind, filename, fileinfo = task
+    sysdb = worker_sysdb
+    args = worker_args
+    config = worker_config
+    timer = Timer()
+
+    if kind == 'journal':
+        eddnjournalfile(
+            sysdb,
+            timer,
+            filename,
+            fileinfo,
+            args.reprocess,
+            args.reprocess_all,
+            worker_reject_file,
+            worker_updatetitleprogress,
+            config.eddn_dir,
+            config.allow_3_0_3_bodies
+        )
+    elif kind == 'navroute':
+        eddnjournalroute(
+            sysdb,
+            timer,
+            filename,
+            fileinfo,
+            args.reprocess,
+            worker_reject_file,
+            worker_updatetitleprogress,
+            config.eddn_dir
+        )
+    elif kind == 'market':
+        eddnmarketfile(
+            sysdb,
+            timer,
+            filename,
+            fileinfo,
+            args.reprocess,
+            worker_reject_file,
+            worker_updatetitleprogress,
+            config.eddn_dir
+        )
+
+    sysdb.flushbulkload()
+    sysdb.commit()
+
+    return (timer.timers, timer.counts)
+
+
+def process_files(sysdb: EDDNSysDB,
+                  args: ProcessorArgs,
+                  config: Config,
+                  timer: Timer,
+                  updatetitleprogress: Callable[[str], None],
+                  tasks: List[Tuple[str, str, EDDNFile]]
+                  ):
+    if len(tasks) == 0:
+        return
+
+    # Workers are forked so that they share the lookup tables without
+    # reloading them.  Rows created by a worker are only visible to the
+    # other workers once committed, so creation is serialized using
+    # a lock shared between the workers.  The named systems are moved
+    # into shared memory so that their pages are never copied.
+    ctx = multiprocessing.get_context('fork')
+    create_lock = ctx.Lock()
+
+    sysdb.commit()
+    sysdb.namedsystems.share()
+    timer.time('init', 0)
+
+    try:
+        with ctx.Pool(
+            args.jobs,
+            initializer=init_worker,
+            initargs=(sysdb, args, config, create_lock, updatetitleprogress)
+        ) as pool:
+            for i, (timers, counts) in enumerate(
+                pool.imap_unordered(process_file, tasks)
+            ):
+                timer.merge(timers, counts)
+                updatetitleprogress(f'{i + 1}/{len(tasks)} files')
+
+            pool.close()
+            pool.join()
+    finally:
+        # The shared memory block would otherwise outlive the process
+        sysdb.namedsystems.unlink()
+
+    timer.time('workerpool', 0)
+    sys.stderr.write(f'Processed {len(tasks)} files\n')
+    sys.stderr.flush()
@@ -0,0 +1,233 @@
+import os
+import bz2
+import queue
+import threading
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple
+from collections.abc import MutableSequence as List, \
+                            MutableMapping as Dict
+
+try:
+    import indexed_bzip2
+except ImportError:
+    indexed_bzip2 = None
+
+
+def open_bz2(filename: str, parallel: bool = True) -> BinaryIO:
+    if parallel and indexed_bzip2 is not None:
+        # Decodes bz2 blocks on multiple threads
+        return indexed_bzip2.open(
+            filename,
+            parallelization=os.cpu_count() or 1
+        )
+    else:
+        return bz2.BZ2File(filename, 'r')
+
+
+class BZ2LineReader(object):
+    """
+    Reads lines from a bz2 file, decompressing ahead of the consumer
+    on a separate thread and handing over batches of lines through
+    a bounded queue.
+
+    If ranges of (zero-based first line number, line count, uncompressed
+    offset) are given, only those lines are read.  Seeking is only fast when
+    indexed_bzip2 is installed and the block offsets of the file are
+    known, otherwise the file is decompressed up to each offset.
+    """
+
+    filename: str
+    parallel: bool
+    batch_bytes: int
+    queue_size: int
+    ranges: Optional[List[Tuple[int, int, int]]]
+
+    # Compressed bit offset to uncompressed offset of each bz2 block
+    # Set after a full read if indexed_bzip2 is installed
+    block_offsets: Optional[Dict[int, int]]
+
+    def __init__(self,
+                 filename: str,
+                 parallel: bool = True,
+                 batch_bytes: int = 1048576,
+                 queue_size: int = 16,
+                 ranges: Optional[List[Tuple[int, int, int]]] = None,
+                 block_offsets: Optional[Dict[int, int]] = None
+                 ):
+        self.filename = filename
+        self.parallel = parallel
+        self.batch_bytes = batch_bytes
+        self.queue_size = queue_size
+        self.ranges = ranges
+        self.block_offsets = block_offsets
+        self._queue: queue.Queue = queue.Queue(queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        self._closed = False
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._read,
+                name=f'BZ2LineReader({self.filename})',
+                daemon=True
+            )
+            self._thread.start()
+
+    def close(self):
+        self._closed = True
+
+        if self._thread is not None:
+            self._thread.join()
+
+    def _put(self, item: Optional[Tuple[int, List[bytes]]]):
+        while not self._closed:
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _read(self):
+        try:
+            with open_bz2(self.filename, self.parallel) as f:
+                if self.ranges is None:
+                    self._read_all(f)
+                else:
+                    self._read_ranges(f)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._put(None)
+
+    def _read_all(self, f: BinaryIO):
+        lineno = 0
+
+        while not self._closed:
+            lines = f.readlines(self.batch_bytes)
+
+            if len(lines) == 0:
+                break
+
+            self._put((lineno, lines))
+            lineno += len(lines)
+
+        if not self._closed and hasattr(f, 'block_offsets'):
+            self.block_offsets = f.block_offsets()
+
+    def _read_ranges(self, f: BinaryIO):
+        if self.block_offsets and hasattr(f, 'set_block_offsets'):
+            f.set_block_offsets(self.block_offsets)
+
+        # Lines read past the end of the previous range, starting at
+        # uncompressed offset pos, which are used rather than seeking
+        # backwards if the next range starts within them
+        buffered: List[bytes] = []
+        pos = 0
+
+        for lineno, count, offset in self.ranges:
+            skip = 0
+
+            while pos < offset and skip < len(buffered):
+                pos += len(buffered[skip])
+                skip += 1
+
+            buffered = buffered[skip:]
+
+            if pos != offset:
+                f.seek(offset)
+                buffered = []
+                pos = offset
+
+            while count > 0 and not self._closed:
+                if len(buffered) == 0:
+                    buffered = f.readlines(self.batch_bytes)
+
+                    if len(buffered) == 0:
+                        break
+
+                lines = buffered[:count]
+                buffered = buffered[count:]
+                pos += sum(len(line) for line in lines)
+                self._put((lineno, lines))
+                lineno += len(lines)
+                count -= len(lines)
+
+    def batches(self) -> Iterator[Tuple[int, List[bytes]]]:
+        self.open()
+
+        while True:
+            batch = self._queue.get()
+
+            if batch is None:
+                if self._error is not None:
+                    raise self._error
+
+                return
+
+            yield batch
+
+    def numbered(self) -> Iterator[Tuple[int, bytes]]:
+        for lineno, lines in self.batches():
+            yield from enumerate(lines, lineno)
+
+    def __iter__(self) -> Iterator[bytes]:
+        for _, lines in self.batches():
+            yield from lines
+
+
+class LineBlockBuilder(object):
+    """
+    Builds the (first line number, line count, uncompressed offset)
+    blocks of a file as it is read sequentially, for use in seeking
+    past fully indexed lines when the file is reprocessed.
+    """
+
+    interval: int
+    blocks: List[Tuple[int, int, int]]
+
+    def __init__(self, interval: int = 1000):
+        self.interval = interval
+        self.blocks = []
+
+    def add(self, lineno: int, offset: int):
+        if lineno % self.interval == 0:
+            self.blocks.append((lineno + 1, 1, offset))
+        else:
+            first, count, start = self.blocks[-1]
+            self.blocks[-1] = (first, count + 1, start)
+
+
+def select_line_ranges(blocks: List[Tuple[int, int, int]],
+                       linecount: Optional[int],
+                       needed: Callable[[int], bool]
+                       ) -> Optional[List[Tuple[int, int, int]]]:
+    """
+    Returns the BZ2LineReader ranges covering the blocks with at least
+    one line for which needed(line number) is true, or None if the
+    blocks do not cover the whole file.
+    """
+
+    if (linecount is None
+            or len(blocks) == 0
+            or sum(count for _, count, _ in blocks) != linecount):
+        return None
+
+    ranges: List[Tuple[int, int, int]] = []
+
+    for lineno, count, offset in blocks:
+        if any(needed(n) for n in range(lineno, lineno + count)):
+            if (len(ranges) != 0
+                    and ranges[-1][0] + ranges[-1][1] == lineno - 1):
+                first, prevcount, start = ranges[-1]
+                ranges[-1] = (first, prevcount + count, start)
+            else:
+                ranges.append((lineno - 1, count, offset))
+
+    return ranges
@@ -0,0 +1,288 @@
+import os
+import os.path
+import sys
+import mmap
+import struct
+import pickle
+from typing import Any, Callable, NamedTuple, Optional, Tuple
+from collections.abc import Sequence, MutableSequence as List, \
+                            MutableMapping as Dict
+
+from .timer import Timer
+from . import sqlqueries
+from . import loading
+from .database import DBConnection
+from .namedsystems import NamedSystems
+from .namedbodies import NamedBodies
+
+
+# Incremented whenever the structure of a snapshot table changes
+SNAPSHOT_VERSION = 4
+
+# Version, pickle size and buffer count, followed by the offset and size
+# of each out-of-band buffer
+header_struct = struct.Struct('<QQQ')
+buffer_struct = struct.Struct('<QQ')
+
+# Row count, maximum Id and checksum of the rows in a snapshot table
+TableSummary = Tuple[int, int, int]
+
+
+def textlength(value: Optional[str]) -> int:
+    return len(value) if value is not None else 0
+
+
+class SnapshotTable(NamedTuple):
+    name: str
+    description: str
+    timer_name: str
+    fetch_all: Callable[[DBConnection, Optional[Sequence]],
+                        Sequence[Sequence]]
+    fetch_since: Callable[[DBConnection, Optional[Sequence]],
+                          Sequence[Sequence]]
+    fetch_summary: Callable[[DBConnection, Optional[Sequence]],
+                            Optional[Sequence]]
+    checksum: Callable[[Sequence], int]
+    create: Callable[[], Any]
+    add: Callable[[Any, Sequence[Sequence]], None]
+
+
+# Checksums must match the checksum column of the summary queries
+snapshot_tables = [
+    SnapshotTable(
+        'regions',
+        'Regions',
+        'region',
+        sqlqueries.get_regions,
+        sqlqueries.get_regions_since,
+        sqlqueries.get_regions_summary,
+        lambda row: (textlength(row[1])
+                     + sum(int(v or 0) for v in row[5:8])
+                     + (int(row[8]) if row[8] is not None else -1)),
+        lambda: ({}, {}),
+        loading.addregions
+    ),
+    SnapshotTable(
+        'namedsystems',
+        'Named Systems',
+        'name',
+        sqlqueries.get_named_systems,
+        sqlqueries.get_named_systems_since,
+        sqlqueries.get_named_systems_summary,
+        lambda row: int(row[3]) + int(row[4]) + int(row[5]),
+        NamedSystems,
+        loading.addnamedsystems
+    ),
+    SnapshotTable(
+        'namedbodies',
+        'Named Bodies',
+        'bodyname',
+        sqlqueries.get_named_bodies,
+        sqlqueries.get_named_bodies_since,
+        sqlqueries.get_named_bodies_summary,
+        lambda row: int(row[4]) if row[4] is not None else -1,
+        NamedBodies,
+        loading.addnamedbodies
+    ),
+    SnapshotTable(
+        'parentsets',
+        'Parent Sets',
+        'parents',
+        sqlqueries.get_parent_sets,
+        sqlqueries.get_parent_sets_since,
+        sqlqueries.get_parent_sets_summary,
+        lambda row: int(row[1]) + textlength(row[2]),
+        dict,
+        loading.addparentsets
+    ),
+    SnapshotTable(
+        'software',
+        'Software',
+        'software',
+        sqlqueries.get_software,
+        sqlqueries.get_software_since,
+        sqlqueries.get_software_summary,
+        lambda row: textlength(row[1]),
+        dict,
+        loading.addsoftware
+    ),
+    SnapshotTable(
+        'bodydesigs',
+        'Body Designations',
+        'bodydesigs',
+        sqlqueries.get_body_designations,
+        sqlqueries.get_body_designations_since,
+        sqlqueries.get_body_designations_summary,
+        lambda row: sum(int(v) for v in row[2:8]),
+        dict,
+        loading.addbodydesigs
+    ),
+    SnapshotTable(
+        'factions',
+        'Factions',
+        'factions',
+        sqlqueries.get_factions,
+        sqlqueries.get_factions_since,
+        sqlqueries.get_factions_summary,
+        lambda row: (textlength(row[1]) + textlength(row[2])
+                     + textlength(row[3])),
+        dict,
+        loading.addfactions
+    ),
+]
+
+
+def summarize(table: SnapshotTable,
+              rows: Sequence[Sequence],
+              summary: TableSummary = (0, 0, 0)
+              ) -> TableSummary:
+    count, maxid, checksum = summary
+
+    for row in rows:
+        count += 1
+        maxid = max(maxid, int(row[0]))
+        checksum += table.checksum(row)
+
+    return (count, maxid, checksum)
+
+
+def readsnapshot(filename: str) -> Dict[str, Tuple[TableSummary, Any]]:
+    """
+    Maps a snapshot file, returning its tables.  Arrays in the tables are
+    read-only views of the mapped file rather than copies.
+    """
+
+    try:
+        with open(filename, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(data)
+        version, picklesize, count = header_struct.unpack_from(view)
+
+        if version != SNAPSHOT_VERSION:
+            return {}
+
+        pos = header_struct.size
+        buffers = []
+
+        for i in range(count):
+            offset, size = buffer_struct.unpack_from(view, pos)
+            buffers.append(view[offset:offset + size])
+            pos += buffer_struct.size
+
+        return pickle.loads(view[pos:pos + picklesize], buffers=buffers)
+    except (OSError, EOFError, ValueError, TypeError, struct.error,
+            pickle.PickleError):
+        return {}
+
+
+def writesnapshot(filename: str,
+                  tables: Dict[str, Tuple[TableSummary, Any]]
+                  ):
+    """
+    Writes the tables to a snapshot file, with the contents of arrays
+    written out-of-band after the pickled tables, aligned so that they can
+    be mapped in place.
+    """
+
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+    buffers: List[pickle.PickleBuffer] = []
+    data = pickle.dumps(tables, 5, buffer_callback=buffers.append)
+    raws = [buf.raw() for buf in buffers]
+    pos = header_struct.size + buffer_struct.size * len(raws) + len(data)
+    offsets = []
+
+    for raw in raws:
+        pos = (pos + 63) & ~63
+        offsets.append(pos)
+        pos += raw.nbytes
+
+    with open(filename + '.tmp', 'wb') as f:
+        f.write(header_struct.pack(SNAPSHOT_VERSION, len(data), len(raws)))
+
+        for offset, raw in zip(offsets, raws):
+            f.write(buffer_struct.pack(offset, raw.nbytes))
+
+        f.write(data)
+
+        for offset, raw in zip(offsets, raws):
+            f.write(bytes(offset - f.tell()))
+            f.write(raw)
+
+    os.rename(filename + '.tmp', filename)
+
+
+def loadtable(conn: DBConnection,
+              timer: Timer,
+              table: SnapshotTable,
+              snapshot: Optional[Tuple[TableSummary, Any]]
+              ) -> Tuple[TableSummary, Any, bool]:
+    """
+    Returns the summary and data of a table, and whether they differ from
+    the snapshot.  The snapshot is only used if the summary of its rows
+    still matches the database, in which case only the rows added since
+    it was saved are fetched.
+    """
+
+    sys.stderr.write(f'Loading {table.description}\n')
+
+    if snapshot is not None:
+        summary, data = snapshot
+        row = table.fetch_summary(conn, (summary[1],))
+        timer.time(f'sql{table.timer_name}')
+
+        if row is not None:
+            dbsummary = (int(row[0]), int(row[1] or 0), int(row[2] or 0))
+
+            if dbsummary == summary:
+                rows = table.fetch_since(conn, (summary[1],))
+                timer.time(f'sql{table.timer_name}', len(rows))
+
+                if len(rows) == 0:
+                    return (summary, data, False)
+
+                table.add(data, rows)
+                timer.time(f'load{table.timer_name}', len(rows))
+                return (summarize(table, rows, summary), data, True)
+
+        sys.stderr.write(f'Snapshot of {table.description} is out of date\n')
+
+    rows = table.fetch_all(conn, None)
+    timer.time(f'sql{table.timer_name}', len(rows))
+    data = table.create()
+    table.add(data, rows)
+    timer.time(f'load{table.timer_name}', len(rows))
+    return (summarize(table, rows), data, True)
+
+
+def loadtables(conn: DBConnection,
+               timer: Timer,
+               filename: Optional[str]
+               ) -> Dict[str, Any]:
+    """
+    Loads the lookup tables used by EDDNSysDB, using and updating the
+    snapshot in filename if one is given.
+    """
+
+    snapshot = readsnapshot(filename) if filename is not None else {}
+    timer.time('loadsnapshot')
+    tables: Dict[str, Tuple[TableSummary, Any]] = {}
+    changed = False
+
+    for table in snapshot_tables:
+        summary, data, tablechanged = loadtable(
+            conn,
+            timer,
+            table,
+            snapshot.get(table.name)
+        )
+
+        tables[table.name] = (summary, data)
+        changed |= tablechanged
+
+    if filename is not None and changed:
+        writesnapshot(filename, tables)
+        timer.time('savesnapshot')
+
+    return {name: data for name, (_, data) in tables.items()}
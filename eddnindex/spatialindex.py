@@ -0,0 +1,331 @@
+import os
+import os.path
+import sys
+from typing import Optional, Tuple
+from collections.abc import MutableSequence as List, \
+                            MutableMapping as Dict
+
+import numpy
+import numpy.typing
+
+from .types import EDDNSystem
+from .timer import Timer
+from . import sqlqueries
+from .database import DBConnection
+
+
+DTypeSpatialIndex = numpy.dtype([
+    ('system_id', 'i4'),
+    ('x', 'i4'),
+    ('y', 'i4'),
+    ('z', 'i4')
+])
+
+
+def cell_keys(vx: numpy.typing.ArrayLike,
+              vy: numpy.typing.ArrayLike,
+              vz: numpy.typing.ArrayLike,
+              cell_bits: int
+              ):
+    return ((numpy.right_shift(vx, cell_bits).astype(numpy.int64) << 42)
+            | (numpy.right_shift(vy, cell_bits).astype(numpy.int64) << 21)
+            | numpy.right_shift(vz, cell_bits).astype(numpy.int64))
+
+
+def packed_coords(system: EDDNSystem) -> Tuple[int, int, int]:
+    return (
+        int((system.x + 49985) * 32),
+        int((system.y + 40985) * 32),
+        int((system.z + 24105) * 32)
+    )
+
+
+class SpatialIndex(object):
+    """
+    Grid hash over the packed integer coordinates (1/32 Ly units) of all
+    systems with coordinates, used to find the systems around a position
+    without range queries on the database.
+
+    Entries are kept in an array sorted by grid cell, with a parallel array
+    of cell keys in which each cell is found by binary search.  Each system
+    takes 24 bytes (16 for the entry and 8 for its key), so the index for
+    ~100M systems takes ~2.4GB, plus the same again while the arrays are
+    sorted during a build.  The cached index files are memory-mapped, so
+    only the pages of cells that are looked up are read from disk.
+
+    Systems added or given coordinates after the index was built or
+    loaded are kept in a separate dict by cell until it is next loaded,
+    and are appended to a journal file alongside the cached index.  When
+    the index is next loaded, the journaled systems that were given
+    coordinates are merged in along with the systems added since it was
+    saved, which are found by id.
+    """
+
+    cell_bits: int
+    keys: numpy.ndarray
+    entries: numpy.ndarray
+    maxid: int
+    added: Dict[int, List[EDDNSystem]]
+
+    def __init__(self, cell_bits: int = 5):
+        self.cell_bits = cell_bits
+        self.keys = numpy.empty(0, numpy.int64)
+        self.entries = numpy.empty(0, DTypeSpatialIndex)
+        self.maxid = 0
+        self.added = {}
+        self._journal: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.entries) + sum(len(v) for v in self.added.values())
+
+    def _fetch(self,
+               conn: DBConnection,
+               timer: Timer,
+               minid: int
+               ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        c = sqlqueries.get_system_coords(conn, (minid,))
+        chunks: List[numpy.ndarray] = []
+        i = 0
+
+        timer.time('sql')
+
+        while True:
+            rows = c.fetchmany(100000)
+            timer.time('sqlsyscoords', len(rows))
+
+            if len(rows) == 0:
+                break
+
+            chunk = numpy.zeros(len(rows), DTypeSpatialIndex)
+            rowarray = numpy.array(rows, dtype=numpy.int64)
+            chunk['system_id'] = rowarray[:, 0]
+            chunk['x'] = rowarray[:, 1]
+            chunk['y'] = rowarray[:, 2]
+            chunk['z'] = rowarray[:, 3]
+            chunks.append(chunk)
+            i += len(rows)
+
+            sys.stderr.write('.')
+
+            if (i % 6400000) == 0:
+                sys.stderr.write(f'  {i}\n')
+
+            sys.stderr.flush()
+            timer.time('loadsyscoords', len(rows))
+
+        sys.stderr.write(f'  {i}\n')
+
+        if len(chunks) == 0:
+            entries = numpy.empty(0, DTypeSpatialIndex)
+        else:
+            entries = numpy.concatenate(chunks)
+
+        keys = cell_keys(
+            entries['x'],
+            entries['y'],
+            entries['z'],
+            self.cell_bits
+        )
+
+        return (keys, entries)
+
+    def _merge(self, keys: numpy.ndarray, entries: numpy.ndarray):
+        if len(self.entries) != 0:
+            keys = numpy.concatenate((self.keys, keys))
+            entries = numpy.concatenate((self.entries, entries))
+
+        order = numpy.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.entries = entries[order]
+
+        if len(self.entries) != 0:
+            self.maxid = int(self.entries['system_id'].max())
+
+    def build(self, conn: DBConnection, timer: Timer):
+        sys.stderr.write('Building system spatial index\n')
+        self.keys = numpy.empty(0, numpy.int64)
+        self.entries = numpy.empty(0, DTypeSpatialIndex)
+        self.added = {}
+        self._merge(*self._fetch(conn, timer, 0))
+        timer.time('buildspatialindex', len(self.entries))
+
+    def save(self, filename: str):
+        meta = numpy.array([self.maxid, self.cell_bits], numpy.int64)
+
+        # The metadata is written last, as it marks the index as complete
+        for suffix, array in (('-keys.npy', self.keys),
+                              ('-entries.npy', self.entries),
+                              ('-meta.npy', meta)):
+            with open(filename + suffix + '.tmp', 'wb') as f:
+                numpy.save(f, array)
+
+            os.rename(filename + suffix + '.tmp', filename + suffix)
+
+    def _load(self, filename: str) -> bool:
+        try:
+            meta = numpy.load(filename + '-meta.npy')
+            keys = numpy.load(filename + '-keys.npy', mmap_mode='r')
+            entries = numpy.load(filename + '-entries.npy', mmap_mode='r')
+        except (OSError, ValueError):
+            return False
+
+        if (meta.shape != (2,)
+                or meta[1] != self.cell_bits
+                or keys.dtype != numpy.int64
+                or entries.dtype != DTypeSpatialIndex
+                or len(keys) != len(entries)):
+            return False
+
+        self.maxid = int(meta[0])
+        self.keys = keys
+        self.entries = entries
+        return True
+
+    def _readjournal(self, filename: str) -> numpy.ndarray:
+        """
+        Returns the journaled systems that were given coordinates at or
+        below the maximum id of the index and are not already in it.
+        """
+
+        try:
+            data = numpy.fromfile(filename + '-journal.bin', numpy.uint8)
+        except OSError:
+            return numpy.empty(0, DTypeSpatialIndex)
+
+        # An entry cut short by an interrupted write is ignored
+        size = len(data) - len(data) % DTypeSpatialIndex.itemsize
+        journal = data[:size].view(DTypeSpatialIndex)
+        journal = journal[journal['system_id'] <= self.maxid]
+        found: List[int] = []
+
+        for i, (sysid, vx, vy, vz) in enumerate(journal.tolist()):
+            if sysid not in self.find(vx, vy, vz, 0):
+                found.append(i)
+
+        entries = journal[found]
+
+        # The same system may have been journaled more than once
+        _, first = numpy.unique(entries['system_id'], return_index=True)
+        return entries[numpy.sort(first)]
+
+    def _openjournal(self, filename: str):
+        if self._journal is not None:
+            os.close(self._journal)
+
+        self._journal = os.open(
+            filename + '-journal.bin',
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND
+            | getattr(os, 'O_BINARY', 0)
+        )
+
+    def load(self,
+             conn: DBConnection,
+             timer: Timer,
+             filename: str
+             ):
+        """
+        Loads the index from its cache files, adding any systems added
+        since it was saved, or builds it if there are no usable cache files
+        or the systems it covers have changed.
+        """
+
+        self.added = {}
+
+        if not self._load(filename):
+            self.build(conn, timer)
+            self.save(filename)
+            self._openjournal(filename)
+            return
+
+        sys.stderr.write('Loading system spatial index\n')
+        timer.time('loadspatialindex', len(self.entries))
+
+        journaled = self._readjournal(filename)
+        keys, newentries = self._fetch(conn, timer, self.maxid)
+
+        if len(journaled) != 0:
+            keys = numpy.concatenate((
+                cell_keys(
+                    journaled['x'],
+                    journaled['y'],
+                    journaled['z'],
+                    self.cell_bits
+                ),
+                keys
+            ))
+            newentries = numpy.concatenate((journaled, newentries))
+
+        if len(newentries) != 0:
+            self._merge(keys, newentries)
+            self.save(filename)
+            self._load(filename)
+            timer.time('loadspatialindex', len(newentries))
+
+        # The journaled systems are now in the saved index
+        self._openjournal(filename)
+
+    def find(self,
+             vx: int,
+             vy: int,
+             vz: int,
+             radius: int = 2
+             ) -> List[int]:
+        """
+        Returns the ids of the systems within radius (1/32 Ly units) of the
+        given packed coordinates on each axis.
+        """
+
+        keys = self.keys
+        cb = self.cell_bits
+        sysids: List[int] = []
+
+        for cx in range((vx - radius) >> cb, ((vx + radius) >> cb) + 1):
+            for cy in range((vy - radius) >> cb, ((vy + radius) >> cb) + 1):
+                for cz in range((vz - radius) >> cb,
+                                ((vz + radius) >> cb) + 1):
+                    key = (cx << 42) | (cy << 21) | cz
+                    start = numpy.searchsorted(keys, key, 'left')
+                    end = numpy.searchsorted(keys, key, 'right')
+
+                    if start != end:
+                        cell = self.entries[start:end]
+                        match = ((numpy.abs(cell['x'] - vx) <= radius)
+                                 & (numpy.abs(cell['y'] - vy) <= radius)
+                                 & (numpy.abs(cell['z'] - vz) <= radius))
+                        sysids.extend(
+                            int(i) for i in cell['system_id'][match]
+                        )
+
+                    for system in self.added.get(key, ()):
+                        sx, sy, sz = packed_coords(system)
+
+                        if (abs(sx - vx) <= radius
+                                and abs(sy - vy) <= radius
+                                and abs(sz - vz) <= radius
+                                and system.id not in sysids):
+                            sysids.append(system.id)
+
+        return sysids
+
+    def add(self, system: EDDNSystem):
+        """
+        Adds a system that has been added or given coordinates since the
+        index was built, if it is not already in the index.
+        """
+
+        if not system.has_coords:
+            return
+
+        vx, vy, vz = packed_coords(system)
+
+        if system.id not in self.find(vx, vy, vz, 0):
+            key = int(cell_keys(vx, vy, vz, self.cell_bits))
+            self.added.setdefault(key, []).append(system)
+
+            if self._journal is not None:
+                entry = numpy.array(
+                    [(system.id, vx, vy, vz)],
+                    DTypeSpatialIndex
+                )
+
+                os.write(self._journal, entry.tobytes())
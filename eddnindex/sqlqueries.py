@@ -1,5 +1,5 @@
 from typing import Generic, TypeVar, Union, Callable, Optional
-from collections.abc import Sequence
+from collections.abc import Sequence, MutableMapping as Dict
 from datetime import datetime
 from .database import DBConnection, DBCursor, SQLQuery
 
@@ -40,7 +40,7 @@ class SQLQueryUpsert(object):
                  conn: DBConnection,
                  params: Sequence
                  ):
-        cursor = conn.cursor()
+        cursor = conn.query_cursor(self.update_query)
         conn.execute(cursor, self.update_query, params)
         if cursor.rowcount == 0:
             conn.execute(cursor, self.insert_query, params)
@@ -89,11 +89,54 @@ class SQLQueryExecParamRequired(Generic[T, U]):
         return self.executor(conn, self.query, params)
 
 
+class SQLQueryIn(object):
+    query: str
+    batch_size: int
+
+    def __init__(self,
+                 query: str,
+                 batch_size: int = 500
+                 ):
+        self.query = query
+        self.batch_size = batch_size
+        self._queries: Dict[int, SQLQuery] = {}
+
+    def get_query(self, count: int) -> SQLQuery:
+        query = self._queries.get(count)
+
+        if query is None:
+            query = SQLQuery(self.query.format(', '.join(['%s'] * count)))
+            self._queries[count] = query
+
+        return query
+
+    def __call__(self,
+                 conn: DBConnection,
+                 values: Sequence
+                 ) -> Sequence[Sequence]:
+        rows = []
+
+        for i in range(0, len(values), self.batch_size):
+            batch = list(values[i:i + self.batch_size])
+
+            # Padded to a power of two by repeating the last value, so that
+            # only a few distinct statements are prepared
+            count = min(self.batch_size, 1 << (len(batch) - 1).bit_length())
+            batch += batch[-1:] * (count - len(batch))
+
+            query = self.get_query(count)
+            cursor = conn.query_cursor(query)
+            conn.execute(cursor, query, tuple(batch))
+            rows += cursor.fetchall()
+
+        return rows
+
+
 def execute(conn: DBConnection,
             query: SQLQuery,
             params: Sequence
             ) -> None:
-    cursor = conn.cursor()
+    cursor = conn.query_cursor(query)
     conn.execute(cursor, query, params)
 
 
@@ -101,7 +144,7 @@ def executemany(conn: DBConnection,
                 query: SQLQuery,
                 params: Sequence[Sequence]
                 ) -> None:
-    cursor = conn.cursor()
+    cursor = conn.query_cursor(query)
     conn.executemany(cursor, query, params)
 
 
@@ -109,7 +152,7 @@ def execute_identity(conn: DBConnection,
                      query: SQLQuery,
                      params: Sequence
                      ) -> int:
-    cursor = conn.cursor()
+    cursor = conn.query_cursor(query)
     return conn.execute_identity(cursor, query, params)
 
 
@@ -118,7 +161,7 @@ def execute_upsert(conn: DBConnection,
                    insert_query: SQLQuery,
                    params: Sequence = None
                    ) -> None:
-    cursor = conn.cursor()
+    cursor = conn.query_cursor(update_query)
     conn.execute(cursor, update_query, params)
     if cursor.rowcount == 0:
         conn.execute(cursor, insert_query, params)
@@ -128,7 +171,7 @@ def fetch_scalar(conn: DBConnection,
                  query: SQLQuery,
                  params: Sequence = None
                  ) -> Union[int, float, bool, str, bytes, datetime, None]:
-    cursor = conn.cursor()
+    cursor = conn.query_cursor(query)
     conn.execute(cursor, query, params)
     row = cursor.fetchone()
     return row[0]
@@ -138,7 +181,7 @@ def fetch_scalar_int(conn: DBConnection,
                      query: SQLQuery,
                      params: Sequence = None
                      ) -> Union[int, None]:
-    cursor = conn.cursor()
+    cursor = conn.query_cursor(query)
     conn.execute(cursor, query, params)
     row = cursor.fetchone()
     return row[0]
@@ -148,7 +191,7 @@ def fetch_one(conn: DBConnection,
               query: SQLQuery,
               params: Sequence = None
               ) -> Optional[Sequence]:
-    cursor = conn.cursor()
+    cursor = conn.query_cursor(query)
     conn.execute(cursor, query, params)
     return cursor.fetchone()
 
@@ -157,7 +200,7 @@ def fetch_all(conn: DBConnection,
               query: SQLQuery,
               params: Sequence = None
               ) -> Sequence[Sequence]:
-    cursor = conn.cursor()
+    cursor = conn.query_cursor(query)
     conn.execute(cursor, query, params)
     return cursor.fetchall()
 
@@ -241,6 +284,13 @@ def fetch_all_partial(query: SQLQuery) \
     )
 
 
+def fetch_all_in_partial(query: str) \
+        -> Callable[[DBConnection, Sequence], Sequence[Sequence]]:
+    return SQLQueryIn(
+        query
+    )
+
+
 def fetch_streaming_partial(query: SQLQuery) \
         -> Callable[[DBConnection, Optional[Sequence]], DBCursor]:
     return SQLQueryExec(
@@ -352,6 +402,171 @@ query_system_by_eddb_id = SQLQuery('''
     WHERE EddbId = %s
 ''')
 
+query_parent_set = SQLQuery('''
+    SELECT
+        Id
+    FROM ParentSets
+    WHERE BodyID = %s
+      AND ParentJson = %s
+''')
+
+query_software_by_name = SQLQuery('''
+    SELECT
+        Id
+    FROM Software
+    WHERE Name = %s
+''')
+
+query_parent_sets_summary = SQLQuery('''
+    SELECT
+        COUNT(*),
+        MAX(Id),
+        SUM(BodyID + LENGTH(ParentJson))
+    FROM ParentSets
+    WHERE Id <= %s
+''', mssql='''
+    SELECT
+        COUNT(*),
+        MAX(Id),
+        SUM(CAST(BodyID AS BIGINT) + LEN(ParentJson))
+    FROM ParentSets
+    WHERE Id <= %s
+''')
+
+query_software_summary = SQLQuery('''
+    SELECT
+        COUNT(*),
+        MAX(Id),
+        SUM(LENGTH(COALESCE(Name, '')))
+    FROM Software
+    WHERE Id <= %s
+''', mysql='''
+    SELECT
+        COUNT(*),
+        MAX(Id),
+        SUM(CHAR_LENGTH(COALESCE(Name, '')))
+    FROM Software
+    WHERE Id <= %s
+''', mssql='''
+    SELECT
+        COUNT(*),
+        MAX(Id),
+        SUM(CAST(LEN(COALESCE(Name, '')) AS BIGINT))
+    FROM Software
+    WHERE Id <= %s
+''')
+
+query_body_designations_summary = SQLQuery('''
+    SELECT
+        COUNT(*),
+        MAX(Id),
+        SUM(BodyCategory + Stars + Planet + Moon1 + Moon2 + Moon3)
+    FROM SystemBodyDesignations
+    WHERE IsUsed = 1 AND Id <= %s
+''', mssql='''
+    SELECT
+        COUNT(*),
+        MAX(Id),
+        SUM(CAST(BodyCategory AS BIGINT) + Stars + Planet
+            + Moon1 + Moon2 + Moon3)
+    FROM SystemBodyDesignations
+    WHERE IsUsed = 1 AND Id <= %s
+''')
+
+query_regions_summary = SQLQuery('''
+    SELECT
+        COUNT(*),
+        MAX(Id),
+        SUM(LENGTH(Name)
+            + COALESCE(SizeX, 0) + COALESCE(SizeY, 0) + COALESCE(SizeZ, 0)
+            + COALESCE(RegionAddress, -1))
+    FROM Regions
+    WHERE Id <= %s
+''', mysql='''
+    SELECT
+        COUNT(*),
+        MAX(Id),
+        SUM(CHAR_LENGTH(Name)
+            + COALESCE(SizeX, 0) + COALESCE(SizeY, 0) + COALESCE(SizeZ, 0)
+            + COALESCE(RegionAddress, -1))
+    FROM Regions
+    WHERE Id <= %s
+''', mssql='''
+    SELECT
+        COUNT(*),
+        MAX(Id),
+        SUM(CAST(LEN(Name) AS BIGINT)
+            + COALESCE(SizeX, 0) + COALESCE(SizeY, 0) + COALESCE(SizeZ, 0)
+            + COALESCE(RegionAddress, -1))
+    FROM Regions
+    WHERE Id <= %s
+''')
+
+query_factions_summary = SQLQuery('''
+    SELECT
+        COUNT(*),
+        MAX(Id),
+        SUM(LENGTH(Name)
+            + LENGTH(COALESCE(Government, ''))
+            + LENGTH(COALESCE(Allegiance, '')))
+    FROM Factions
+    WHERE Id <= %s
+''', mysql='''
+    SELECT
+        COUNT(*),
+        MAX(Id),
+        SUM(CHAR_LENGTH(Name)
+            + CHAR_LENGTH(COALESCE(Government, ''))
+            + CHAR_LENGTH(COALESCE(Allegiance, '')))
+    FROM Factions
+    WHERE Id <= %s
+''', mssql='''
+    SELECT
+        COUNT(*),
+        MAX(Id),
+        SUM(CAST(LEN(Name) AS BIGINT)
+            + LEN(COALESCE(Government, ''))
+            + LEN(COALESCE(Allegiance, '')))
+    FROM Factions
+    WHERE Id <= %s
+''')
+
+query_named_bodies_summary = SQLQuery('''
+    SELECT
+        COUNT(*),
+        MAX(nb.Id),
+        SUM(COALESCE(nb.BodyID, -1))
+    FROM SystemBodyNames nb
+    JOIN SystemBodies_Named sbn ON sbn.Id = nb.Id
+    WHERE nb.Id <= %s
+''', mssql='''
+    SELECT
+        COUNT(*),
+        MAX(nb.Id),
+        SUM(CAST(COALESCE(nb.BodyID, -1) AS BIGINT))
+    FROM SystemBodyNames nb
+    JOIN SystemBodies_Named sbn ON sbn.Id = nb.Id
+    WHERE nb.Id <= %s
+''')
+
+query_named_systems_summary = SQLQuery('''
+    SELECT
+        COUNT(*),
+        MAX(ns.Id),
+        SUM(ns.X + ns.Y + ns.Z)
+    FROM SystemNames ns
+    JOIN Systems_Named sn ON sn.Id = ns.Id
+    WHERE ns.Id <= %s
+''', mssql='''
+    SELECT
+        COUNT(*),
+        MAX(ns.Id),
+        SUM(CAST(ns.X AS BIGINT) + ns.Y + ns.Z)
+    FROM SystemNames ns
+    JOIN Systems_Named sn ON sn.Id = ns.Id
+    WHERE ns.Id <= %s
+''')
+
 # endregion
 
 # region Singleton Select Functions
@@ -376,6 +591,42 @@ get_system_by_eddb_id = fetch_one_partial(
     query_system_by_eddb_id
 )
 
+get_parent_set = fetch_one_partial(
+    query_parent_set
+)
+
+get_software_by_name = fetch_one_partial(
+    query_software_by_name
+)
+
+get_parent_sets_summary = fetch_one_partial(
+    query_parent_sets_summary
+)
+
+get_software_summary = fetch_one_partial(
+    query_software_summary
+)
+
+get_body_designations_summary = fetch_one_partial(
+    query_body_designations_summary
+)
+
+get_regions_summary = fetch_one_partial(
+    query_regions_summary
+)
+
+get_factions_summary = fetch_one_partial(
+    query_factions_summary
+)
+
+get_named_bodies_summary = fetch_one_partial(
+    query_named_bodies_summary
+)
+
+get_named_systems_summary = fetch_one_partial(
+    query_named_systems_summary
+)
+
 # endregion
 
 # region Streaming Select Statements
@@ -479,6 +730,17 @@ query_edsm_files = SQLQuery('''
     ORDER BY Date
 ''')
 
+query_system_coords = SQLQuery('''
+    SELECT
+        Id,
+        X,
+        Y,
+        Z
+    FROM Systems
+    WHERE Id > %s
+    AND (X <> 0 OR Y <> 0 OR Z <> 0)
+''')
+
 # endregion
 
 # region Streaming Select Functions
@@ -495,6 +757,10 @@ get_edsm_bodies = fetch_streaming_partial(
     query_edsm_bodies
 )
 
+get_system_coords = fetch_streaming_partial(
+    query_system_coords
+)
+
 get_edsm_body_file_lines_by_file = fetch_streaming_partial(
     query_edsm_body_file_lines_by_file
 )
@@ -585,6 +851,16 @@ query_factions = SQLQuery('''
     FROM Factions
 ''')
 
+query_factions_by_name = SQLQuery('''
+    SELECT
+        Id,
+        Name,
+        Government,
+        Allegiance
+    FROM Factions
+    WHERE Name = %s
+''')
+
 query_file_line_stations_by_file = SQLQuery('''
     SELECT
         LineNo,
@@ -620,6 +896,24 @@ query_file_line_routes_by_file = SQLQuery('''
     WHERE FileId = %s
 ''')
 
+query_file_line_blocks_by_file = SQLQuery('''
+    SELECT
+        LineNo,
+        LineCount,
+        Offset
+    FROM FileLineBlocks
+    WHERE FileId = %s
+    ORDER BY LineNo
+''')
+
+query_file_compressed_blocks_by_file = SQLQuery('''
+    SELECT
+        CompressedBitOffset,
+        Offset
+    FROM FileCompressedBlocks
+    WHERE FileId = %s
+''')
+
 query_named_bodies = SQLQuery('''
     SELECT
         nb.Id,
@@ -763,6 +1057,95 @@ query_bodies_by_custom_name = SQLQuery('''
     WHERE sb.CustomName = %s
 ''')
 
+query_parent_sets_since = SQLQuery('''
+    SELECT
+        Id,
+        BodyID,
+        ParentJson
+    FROM ParentSets
+    WHERE Id > %s
+''')
+
+query_software_since = SQLQuery('''
+    SELECT
+        Id,
+        Name
+    FROM Software
+    WHERE Id > %s
+''')
+
+query_body_designations_since = SQLQuery('''
+    SELECT
+        Id,
+        BodyDesignation,
+        BodyCategory,
+        Stars,
+        Planet,
+        Moon1,
+        Moon2,
+        Moon3,
+        IsUsed
+    FROM SystemBodyDesignations
+    WHERE IsUsed = 1 AND Id > %s
+''')
+
+query_regions_since = SQLQuery('''
+    SELECT
+        Id,
+        Name,
+        X0,
+        Y0,
+        Z0,
+        SizeX,
+        SizeY,
+        SizeZ,
+        RegionAddress,
+        IsHARegion
+    FROM Regions
+    WHERE Id > %s
+''')
+
+query_factions_since = SQLQuery('''
+    SELECT
+        Id,
+        Name,
+        Government,
+        Allegiance
+    FROM Factions
+    WHERE Id > %s
+''')
+
+query_named_bodies_since = SQLQuery('''
+    SELECT
+        nb.Id,
+        nb.BodyName,
+        nb.SystemName,
+        nb.SystemId,
+        nb.BodyID,
+        nb.BodyCategory,
+        nb.ArgOfPeriapsis,
+        nb.ValidFrom,
+        nb.ValidUntil,
+        nb.IsRejected,
+        nb.BodyDesignationId
+    FROM SystemBodyNames nb
+    JOIN SystemBodies_Named sbn ON sbn.Id = nb.Id
+    WHERE nb.Id > %s
+''')
+
+query_named_systems_since = SQLQuery('''
+    SELECT
+        ns.Id,
+        ns.SystemAddress,
+        ns.Name,
+        ns.X,
+        ns.Y,
+        ns.Z
+    FROM SystemNames ns
+    JOIN Systems_Named sn ON sn.Id = ns.Id
+    WHERE ns.Id > %s
+''')
+
 # endregion
 
 # region FetchAll Select Functions
@@ -795,6 +1178,10 @@ get_factions = fetch_all_partial(
     query_factions
 )
 
+get_factions_by_name = fetch_all_partial(
+    query_factions_by_name
+)
+
 get_systems_by_modsysaddr = fetch_all_partial(
     query_systems_by_modsysaddr
 )
@@ -835,10 +1222,105 @@ get_file_line_routes_by_file = fetch_all_partial(
     query_file_line_routes_by_file
 )
 
+get_file_line_blocks_by_file = fetch_all_partial(
+    query_file_line_blocks_by_file
+)
+
+get_file_compressed_blocks_by_file = fetch_all_partial(
+    query_file_compressed_blocks_by_file
+)
+
 get_bodies_by_custom_name = fetch_all_partial(
     query_bodies_by_custom_name
 )
 
+get_parent_sets_since = fetch_all_partial(
+    query_parent_sets_since
+)
+
+get_software_since = fetch_all_partial(
+    query_software_since
+)
+
+get_body_designations_since = fetch_all_partial(
+    query_body_designations_since
+)
+
+get_regions_since = fetch_all_partial(
+    query_regions_since
+)
+
+get_factions_since = fetch_all_partial(
+    query_factions_since
+)
+
+get_named_bodies_since = fetch_all_partial(
+    query_named_bodies_since
+)
+
+get_named_systems_since = fetch_all_partial(
+    query_named_systems_since
+)
+
+# endregion
+
+# region FetchAll In-List Select Statements
+
+query_systems_by_modsysaddrs = '''
+    SELECT
+        ns.Id,
+        ns.SystemAddress,
+        ns.Name,
+        ns.X,
+        ns.Y,
+        ns.Z,
+        ns.ModSystemAddress
+    FROM SystemNames ns
+    WHERE ModSystemAddress IN ({0})
+'''
+
+query_systems_by_names = '''
+    SELECT
+        ns.Id,
+        ns.SystemAddress,
+        ns.Name,
+        ns.X,
+        ns.Y,
+        ns.Z,
+        sn.Name
+    FROM SystemNames ns
+    JOIN Systems_Named sn ON sn.Id = ns.Id
+    WHERE sn.Name IN ({0})
+'''
+
+query_systems_by_ids = '''
+    SELECT
+        ns.Id,
+        ns.SystemAddress,
+        ns.Name,
+        ns.X,
+        ns.Y,
+        ns.Z
+    FROM SystemNames ns
+    WHERE Id IN ({0})
+'''
+
+# endregion
+
+# region FetchAll In-List Select Functions
+
+get_systems_by_modsysaddrs = fetch_all_in_partial(
+    query_systems_by_modsysaddrs
+)
+
+get_systems_by_names = fetch_all_in_partial(
+    query_systems_by_names
+)
+
+get_systems_by_ids = fetch_all_in_partial(
+    query_systems_by_ids
+)
+
 # endregion
 
 # region Update Statements
@@ -1142,6 +1624,36 @@ query_insert_file_line_route_systems = SQLQuery('''
     )
 ''')
 
+query_insert_file_line_blocks = SQLQuery('''
+    INSERT INTO FileLineBlocks (
+        FileId,
+        LineNo,
+        LineCount,
+        Offset
+    )
+    VALUES
+    (
+        %s,
+        %s,
+        %s,
+        %s
+    )
+''')
+
+query_insert_file_compressed_blocks = SQLQuery('''
+    INSERT INTO FileCompressedBlocks (
+        FileId,
+        CompressedBitOffset,
+        Offset
+    )
+    VALUES
+    (
+        %s,
+        %s,
+        %s
+    )
+''')
+
 query_insert_edsm_file_line_systems = SQLQuery('''
     INSERT INTO EDSMFileLineBodies (
         FileId,
@@ -1176,6 +1688,14 @@ insert_file_line_route_systems = executemany_partial(
     query_insert_file_line_route_systems
 )
 
+insert_file_line_blocks = executemany_partial(
+    query_insert_file_line_blocks
+)
+
+insert_file_compressed_blocks = executemany_partial(
+    query_insert_file_compressed_blocks
+)
+
 insert_edsm_file_line_systems = executemany_partial(
     query_insert_edsm_file_line_systems
 )
@@ -1302,135 +1822,28 @@ set_body_invalid = execute_partial(
 
 # endregion
 
-# region Upsert Statements
+# region Delete Statements
 
-query_update_edsm_system = SQLQuery(
-    '''UPDATE Systems_EDSM SET
-        Id = %s,
-        TimestampSeconds = %s,
-        HasCoords = %s,
-        IsHidden = %s,
-        IsDeleted = %s
-    WHERE EdsmId = %s'''
-)
-
-query_insert_edsm_system = SQLQuery(
-    '''INSERT INTO Systems_EDSM (
-        Id,
-        TimestampSeconds,
-        HasCoords
-        IsHidden,
-        IsDeleted,
-        EdsmId
-    )
-    VALUES
-    (
-        %s,
-        %s,
-        %s,
-        %s,
-        %s,
-        %s
-    )'''
-)
+query_delete_file_line_blocks = SQLQuery('''
+    DELETE FROM FileLineBlocks
+    WHERE FileId = %s
+''')
 
-query_update_edsm_body = SQLQuery(
-    '''
-        UPDATE SystemBodies_EDSM SET
-            Id = %s,
-            TimestampSeconds = %s
-        WHERE EdsmId = %s
-    '''
-)
-
-query_insert_edsm_body = SQLQuery(
-    '''
-        INSERT INTO SystemBodies_EDSM (
-            Id,
-            TimestampSeconds,
-            EdsmId
-        )
-        VALUES
-        (
-            %s,
-            %s,
-            %s
-        )
-    '''
-)
-
-query_update_edsm_station = SQLQuery(
-    '''
-        UPDATE Stations_EDSM SET
-            Id = %s,
-            Timestamp = %s
-        WHERE EdsmStationId = %s
-    '''
-)
-
-query_insert_edsm_station = SQLQuery(
-    '''
-        INSERT INTO Stations_EDSM (
-            Id,
-            Timestamp,
-            EdsmStationId
-        )
-        VALUES
-        (
-            %s,
-            %s,
-            %s
-        )
-    '''
-)
-
-query_update_eddb_system = SQLQuery(
-    '''
-        UPDATE Systems_EDDB SET
-            Id = %s,
-            TimestampSeconds = %s
-        WHERE EddbId = %s
-    '''
-)
-
-query_insert_eddb_system = SQLQuery(
-    '''
-        INSERT INTO Systems_EDDB (
-            Id,
-            TimestampSeconds,
-            EddbId
-        )
-        VALUES
-        (
-            %s,
-            %s,
-            %s
-        )
-    '''
-)
+query_delete_file_compressed_blocks = SQLQuery('''
+    DELETE FROM FileCompressedBlocks
+    WHERE FileId = %s
+''')
 
 # endregion
 
-# region Upsert Functions
-
-upsert_edsm_system = execute_upsert_partial(
-    query_update_edsm_system,
-    query_insert_edsm_system
-)
-
-upsert_edsm_body = execute_upsert_partial(
-    query_update_edsm_body,
-    query_insert_edsm_body
-)
+# region Delete Functions
 
-upsert_edsm_station = execute_upsert_partial(
-    query_update_edsm_station,
-    query_insert_edsm_station
+delete_file_line_blocks = execute_partial(
+    query_delete_file_line_blocks
 )
 
-upsert_eddb_system = execute_upsert_partial(
-    query_update_eddb_system,
-    query_insert_eddb_system
+delete_file_compressed_blocks = execute_partial(
+    query_delete_file_compressed_blocks
 )
 
 # endregion
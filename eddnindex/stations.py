@@ -123,10 +123,27 @@ def getstation(conn: DBConnection,
             }]
         )
 
-    station = add_station(
-        conn, name, sysname, marketid, stationtype, bodyname,
-        bodyid, test, sysid, timestamp
-    )
+    with conn.creating() as shared:
+        if shared:
+            # Another worker may have added the station since it
+            # was looked up above
+            candidates = get_stations(
+                conn, name, sysname, marketid, timestamp, stationtype,
+                bodyname, bodyid, test, sysid
+            )
+
+            if len(candidates) == 1:
+                station, replace = candidates[0]
+
+                if len(replace) != 0:
+                    station = updatestation(conn, station, **replace)
+
+                return (station, None, None)
+
+        station = add_station(
+            conn, name, sysname, marketid, stationtype, bodyname,
+            bodyid, test, sysid, timestamp
+        )
 
     return (station, None, None)
 
@@ -0,0 +1,132 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+from collections.abc import MutableSet as Set, \
+                            MutableMapping as Dict
+
+from .types import EDDNSystem
+
+
+SystemCacheKey = Tuple[str,
+                       Optional[Tuple[float, float, float]],
+                       Optional[int]]
+
+SystemCacheResult = Union[Tuple[EDDNSystem, None, None],
+                          Tuple[None, str, dict]]
+
+
+class SystemCache(object):
+    """
+    Bounded LRU cache of getsystem results keyed on
+    (name, rounded starpos, system address).
+
+    Resolved systems and rejections expire after separate TTLs (0 for
+    no expiry).  Storing a resolved system invalidates any other entries
+    for the same system whose cached tuple differs (e.g. coordinates that
+    have since been set), and any rejections of the same name, as the
+    system may have just been added.
+    """
+
+    maxsize: int
+    ttl: float
+    negative_ttl: float
+    hits: int
+    misses: int
+
+    def __init__(self,
+                 maxsize: int = 262144,
+                 ttl: float = 0,
+                 negative_ttl: float = 600
+                 ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[
+            SystemCacheKey,
+            Tuple[float, SystemCacheResult]
+        ] = OrderedDict()
+        self._bysysid: Dict[int, Set[SystemCacheKey]] = {}
+        self._byname: Dict[str, Set[SystemCacheKey]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: SystemCacheKey) -> Optional[SystemCacheResult]:
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            expires, result = entry
+
+            if expires == 0 or expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+            self._remove(key)
+
+        self.misses += 1
+        return None
+
+    def put(self, key: SystemCacheKey, result: SystemCacheResult):
+        system = result[0]
+        ttl = self.ttl if system is not None else self.negative_ttl
+
+        if system is not None:
+            self.invalidate(system)
+            self._invalidate_rejections(key[0])
+
+        if key in self._entries:
+            self._remove(key)
+
+        if self.maxsize <= 0:
+            return
+
+        while len(self._entries) >= self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+        self._entries[key] = (time.monotonic() + ttl if ttl > 0 else 0, result)
+        self._byname.setdefault(key[0].lower(), set()).add(key)
+
+        if system is not None:
+            self._bysysid.setdefault(system.id, set()).add(key)
+
+    def invalidate(self, system: EDDNSystem):
+        for key in list(self._bysysid.get(system.id, ())):
+            if self._entries[key][1][0] != system:
+                self._remove(key)
+
+        self._invalidate_rejections(system.name)
+
+    def _invalidate_rejections(self, name: str):
+        for key in list(self._byname.get(name.lower(), ())):
+            if self._entries[key][1][0] is None:
+                self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._bysysid.clear()
+        self._byname.clear()
+
+    def _remove(self, key: SystemCacheKey):
+        _, result = self._entries.pop(key)
+        name = key[0].lower()
+        system = result[0]
+
+        namekeys = self._byname.get(name)
+
+        if namekeys is not None:
+            namekeys.discard(key)
+
+            if len(namekeys) == 0:
+                del self._byname[name]
+
+        if system is not None:
+            syskeys = self._bysysid.get(system.id)
+
+            if syskeys is not None:
+                syskeys.discard(key)
+
+                if len(syskeys) == 0:
+                    del self._bysysid[system.id]
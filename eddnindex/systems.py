@@ -1,16 +1,22 @@
 import math
-from typing import Iterable, MutableSet, NamedTuple, Optional, \
-                   Tuple, TypedDict, Union, Sequence
+import string
+import functools
+from typing import Any, Callable, Iterable, MutableSet, NamedTuple, \
+                   Optional, Tuple, TypedDict, Union, Sequence
 from collections.abc import MutableSequence as List, \
                             MutableMapping as Dict
 
+import numpy
+import numpy.typing
+
 from . import edtslookup
 from .types import EDDNSystem, EDDNRegion
 from .timer import Timer
-from . import constants
 from .util import id64_to_modsysaddr, modsysaddr_to_id64, from_db_string
 from . import sqlqueries
 from .database import DBConnection
+from .namedsystems import NamedSystems
+from .spatialindex import SpatialIndex
 
 
 class RejectDataSystem(TypedDict):
@@ -40,6 +46,39 @@ class PGSysInfo(NamedTuple):
     n2: int
 
 
+class SystemLookup(object):
+    sysname: str
+    starpos: Optional[Tuple[float, float, float]]
+    sysaddr: Optional[int]
+    modsysaddr: Optional[int]
+    pgmodsysaddr: Optional[int]
+    pginfo: Optional[PGSysInfo]
+    region_info: Optional[EDDNRegion]
+    errmsg: Optional[str]
+    system: Optional[EDDNSystem]
+    systems: MutableSet[EDDNSystem]
+
+    def __init__(self,
+                 sysname: str,
+                 starpos: Optional[Tuple[float, float, float]],
+                 sysaddr: Optional[int]
+                 ):
+        self.sysname = sysname
+        self.starpos = starpos
+        self.sysaddr = sysaddr
+        self.modsysaddr = None
+        self.pgmodsysaddr = None
+        self.pginfo = None
+        self.region_info = None
+        self.errmsg = None
+        self.system = None
+        self.systems = set()
+
+    @property
+    def pending(self) -> bool:
+        return self.system is None and self.errmsg is None
+
+
 def findsystem(conn: DBConnection,
                cursor: Union[Sequence[EDDNSystem],
                              Sequence[Sequence]],
@@ -107,7 +146,7 @@ def findsystem(conn: DBConnection,
 
 
 def findsystemsbyname(conn: DBConnection,
-                      namedsystems: Dict[str, List[EDDNSystem]],
+                      namedsystems: NamedSystems,
                       regions: Dict[str, EDDNRegion],
                       sysname: str
                       ) -> List[EDDNSystem]:
@@ -182,56 +221,131 @@ def getrejectdata(regions: Dict[str, EDDNRegion],
     return rejectdata
 
 
+pgsysname_region_chars = frozenset(
+    string.ascii_letters + string.digits + ".()' -"
+)
+
+
+@functools.lru_cache(maxsize=65536)
+def is_pgsysname_region(regionname: str) -> bool:
+    return all(c in pgsysname_region_chars for c in regionname)
+
+
+def is_digits(value: str) -> bool:
+    return value.isascii() and value.isdigit()
+
+
+@functools.lru_cache(maxsize=65536)
+def decode_pgsysname_suffix(mid1_2: str,
+                            mid3n2: str
+                            ) -> Optional[Tuple[int, int, int, int, int, int]]:
+    """
+    Decodes the "AB-C" and "d12-34" parts of a procgen system name into
+    (c1, c2, c3, masscode, n1, n2), or None if they are not valid
+    """
+
+    if (len(mid1_2) != 4
+            or mid1_2[2] != '-'
+            or not ('A' <= mid1_2[0] <= 'Z'
+                    and 'A' <= mid1_2[1] <= 'Z'
+                    and 'A' <= mid1_2[3] <= 'Z')
+            or not 'a' <= mid3n2[:1] <= 'h'):
+        return None
+
+    n1str, _, n2str = mid3n2[1:].rpartition('-')
+
+    if not is_digits(n2str) or (n1str != '' and not is_digits(n1str)):
+        return None
+    elif n1str == '' and mid3n2[1:2] == '-':
+        return None
+
+    return (
+        ord(mid1_2[0]) - 65,
+        ord(mid1_2[1]) - 65,
+        ord(mid1_2[3]) - 65,
+        ord(mid3n2[0]) - 97,
+        int(n1str or '0'),
+        int(n2str)
+    )
+
+
+def split_pgsysname(sysname: str
+                    ) -> Optional[Tuple[str, int, int, int, int, int, int]]:
+    """
+    Splits a procgen system name from the right into its region name and
+    decoded suffix, or None if it is not a procgen system name
+    """
+
+    rest, _, mid3n2 = sysname.rpartition(' ')
+    regionname, _, mid1_2 = rest.rpartition(' ')
+
+    if regionname == '' or not is_pgsysname_region(regionname):
+        return None
+
+    suffix = decode_pgsysname_suffix(mid1_2, mid3n2)
+
+    if suffix is None:
+        return None
+
+    return (regionname,) + suffix
+
+
+@functools.lru_cache(maxsize=65536)
+def region_pgsysname_modsysaddr(region_info: EDDNRegion,
+                                masscode: int,
+                                mid: int,
+                                n2: int
+                                ) -> Optional[int]:
+    sx = 7 - masscode
+    sp = 320 << masscode
+    sb = 0x7F >> masscode
+
+    if region_info.is_sphere_sector:
+        x0 = math.floor(region_info.x0 / sp) + (mid & 0x7F)
+        y0 = math.floor(region_info.y0 / sp) + ((mid >> 7) & 0x7F)
+        z0 = math.floor(region_info.z0 / sp) + ((mid >> 14) & 0x7F)
+        x1 = x0 & sb
+        x2 = x0 >> sx
+        y1 = y0 & sb
+        y2 = y0 >> sx
+        z1 = z0 & sb
+        z2 = z0 >> sx
+        return ((z2 << 53)
+                | (y2 << 47)
+                | (x2 << 40)
+                | (masscode << 37)
+                | (z1 << 30)
+                | (y1 << 23)
+                | (x1 << 16)
+                | n2)
+    elif region_info.region_address is not None:
+        return ((region_info.region_address << 40)
+                | (masscode << 37)
+                | (mid << 16)
+                | n2)
+    else:
+        return None
+
+
 def pgname_to_modsysaddr(regions: Dict[str, EDDNRegion],
                          sysname: str
                          ) -> Union[Tuple[bool, int, PGSysInfo, None],
                                     Tuple[bool, None, None, str],
                                     Tuple[bool, None, None, None]]:
-    pgsysmatch = constants.procgen_sysname_re.match(sysname)
-
-    if pgsysmatch:
-        regionname: str = pgsysmatch[1]
-        mid1_2: str = pgsysmatch[2].upper()
-        masscodestr: str = pgsysmatch[3].lower()
-        n1 = int(pgsysmatch[4] or "0")
-        n2 = int(pgsysmatch[5])
-        c1 = ord(mid1_2[0]) - 65
-        c2 = ord(mid1_2[1]) - 65
-        c3 = ord(mid1_2[3]) - 65
+    pgsysname = split_pgsysname(sysname)
+
+    if pgsysname is not None:
+        regionname, c1, c2, c3, masscode, n1, n2 = pgsysname
         mid = (((n1 * 26 + c3) * 26 + c2) * 26 + c1)
-        masscode = ord(masscodestr) - 97
-        sx = 7 - masscode
-        sp = 320 << masscode
-        sb = 0x7F >> masscode
 
         region_info = regions.get(regionname.lower())
         if region_info is not None:
             pginfo = PGSysInfo(region_info, c1, c2, c3, masscode, n1, n2)
+            modsysaddr = region_pgsysname_modsysaddr(
+                region_info, masscode, mid, n2
+            )
 
-            if region_info.is_sphere_sector:
-                x0 = math.floor(region_info.x0 / sp) + (mid & 0x7F)
-                y0 = math.floor(region_info.y0 / sp) + ((mid >> 7) & 0x7F)
-                z0 = math.floor(region_info.z0 / sp) + ((mid >> 14) & 0x7F)
-                x1 = x0 & sb
-                x2 = x0 >> sx
-                y1 = y0 & sb
-                y2 = y0 >> sx
-                z1 = z0 & sb
-                z2 = z0 >> sx
-                modsysaddr = ((z2 << 53)
-                              | (y2 << 47)
-                              | (x2 << 40)
-                              | (masscode << 37)
-                              | (z1 << 30)
-                              | (y1 << 23)
-                              | (x1 << 16)
-                              | n2)
-                return (True, modsysaddr, pginfo, None)
-            elif region_info.region_address is not None:
-                modsysaddr = ((region_info.region_address << 40)
-                              | (masscode << 37)
-                              | (mid << 16)
-                              | n2)
+            if modsysaddr is not None:
                 return (True, modsysaddr, pginfo, None)
             else:
                 errmsg = f'Region {regionname} is corrupt'
@@ -243,6 +357,25 @@ def pgname_to_modsysaddr(regions: Dict[str, EDDNRegion],
     return (False, None, None, None)
 
 
+def pgnames_to_modsysaddrs(regions: Dict[str, EDDNRegion],
+                           sysnames: Sequence[str]
+                           ) -> numpy.typing.NDArray[numpy.int64]:
+    """
+    Returns the modsysaddr of each name, or -1 if it is not a procgen
+    system name or its region is not found or corrupt
+    """
+
+    modsysaddrs = numpy.full(len(sysnames), -1, numpy.int64)
+
+    for i, sysname in enumerate(sysnames):
+        _, modsysaddr, _, _ = pgname_to_modsysaddr(regions, sysname)
+
+        if modsysaddr is not None:
+            modsysaddrs[i] = modsysaddr
+
+    return modsysaddrs
+
+
 def id64_to_pgname(regionaddrs: Dict[int, EDDNRegion],
                    id64: int
                    ) -> Union[Tuple[str, None],
@@ -271,7 +404,7 @@ def find_named_system(conn: DBConnection,
                       sysname: str,
                       starpos: Optional[Tuple[float, float, float]],
                       sysaddr: Optional[int],
-                      namedsystems: Dict[str, List[EDDNSystem]],
+                      namedsystems: NamedSystems,
                       systems: MutableSet[EDDNSystem]
                       ):
     namedsystemlist = namedsystems.get(sysname)
@@ -285,7 +418,7 @@ def find_named_system(conn: DBConnection,
 
 
 def add_system(conn: DBConnection,
-               namedsystems: Dict[str, List[EDDNSystem]],
+               namedsystems: NamedSystems,
                sysname: str,
                starpos: Optional[Tuple[float, float, float]],
                modsysaddr: Optional[int],
@@ -367,12 +500,7 @@ def add_system(conn: DBConnection,
                 (sysid, 1)
             )
 
-            namedsystemlist = namedsystems.get(sysname)
-
-            if namedsystemlist is None:
-                namedsystems[sysname] = [system]
-            else:
-                namedsystemlist.append(system)
+            namedsystems.add(system)
 
         return system
     else:
@@ -382,51 +510,70 @@ def add_system(conn: DBConnection,
 def find_candidates(conn: DBConnection,
                     timer: Timer,
                     starpos: Optional[Tuple[float, float, float]],
-                    systems: MutableSet[EDDNSystem]
+                    systems: MutableSet[EDDNSystem],
+                    spatialindex: Optional[SpatialIndex] = None
                     ):
     if starpos is not None:
         vx = int((starpos[0] + 49985) * 32)
         vy = int((starpos[1] + 40985) * 32)
         vz = int((starpos[2] + 24105) * 32)
-        raddr = (((vz // 40960) << 13)
-                 | ((vy // 40960) << 7)
-                 | (vx // 40960))
 
-        for mc in range(0, 8):
-            rx = (vx % 40960) >> mc
-            ry = (vy % 40960) >> mc
-            rz = (vz % 40960) >> mc
+        if spatialindex is not None:
+            sysids = spatialindex.find(vx, vy, vz)
 
-            baddr = ((raddr << 40)
-                     | (mc << 37)
-                     | (rz << 30)
-                     | (ry << 23)
-                     | (rx << 16))
-
-            rows = sqlqueries.find_systems_in_boxel(
-                conn,
-                (baddr, baddr + 65536)
-            )
-
-            for row in rows:
-                if (vx - 2 <= row[3] <= vx + 2
-                        and vy - 2 <= row[4] <= vy + 2
-                        and vz - 2 <= row[5] <= vz + 2):
-                    systems.add(
-                        EDDNSystem(
-                            row[0],
-                            row[1],
-                            from_db_string(row[2]),
-                            row[3] / 32.0 - 49985,
-                            row[4] / 32.0 - 40985,
-                            row[5] / 32.0 - 24105,
-                            row[3] != 0 and row[4] != 0 and row[5] != 0
-                        )
+            rows = sqlqueries.get_systems_by_ids(conn, sysids)
+        else:
+            rows = find_systems_in_boxels(conn, vx, vy, vz)
+
+        for row in rows:
+            if (vx - 2 <= row[3] <= vx + 2
+                    and vy - 2 <= row[4] <= vy + 2
+                    and vz - 2 <= row[5] <= vz + 2):
+                systems.add(
+                    EDDNSystem(
+                        row[0],
+                        row[1],
+                        from_db_string(row[2]),
+                        row[3] / 32.0 - 49985,
+                        row[4] / 32.0 - 40985,
+                        row[5] / 32.0 - 24105,
+                        row[3] != 0 and row[4] != 0 and row[5] != 0
                     )
+                )
 
     timer.time('sysselectmaddr')
 
 
+def find_systems_in_boxels(conn: DBConnection,
+                           vx: int,
+                           vy: int,
+                           vz: int
+                           ) -> List[Sequence]:
+    raddr = (((vz // 40960) << 13)
+             | ((vy // 40960) << 7)
+             | (vx // 40960))
+
+    rows: List[Sequence] = []
+
+    for mc in range(0, 8):
+        rx = (vx % 40960) >> mc
+        ry = (vy % 40960) >> mc
+        rz = (vz % 40960) >> mc
+
+        baddr = ((raddr << 40)
+                 | (mc << 37)
+                 | (rz << 30)
+                 | (ry << 23)
+                 | (rx << 16))
+
+        rows += sqlqueries.find_systems_in_boxel(
+            conn,
+            (baddr, baddr + 65536)
+        )
+
+    return rows
+
+
 def find_system_by_name(conn: DBConnection,
                         timer: Timer,
                         sysname: str,
@@ -480,14 +627,38 @@ def find_system_by_modsysaddr(conn: DBConnection,
     return system
 
 
+def find_added_system(conn: DBConnection,
+                      timer: Timer,
+                      sysname: str,
+                      starpos: Optional[Tuple[float, float, float]],
+                      sysaddr: Optional[int],
+                      systems: MutableSet[EDDNSystem],
+                      modsysaddr: Optional[int]
+                      ) -> Optional[EDDNSystem]:
+    system = None
+
+    if modsysaddr is not None:
+        system = find_system_by_modsysaddr(
+            conn, timer, sysname, sysaddr, starpos, systems, modsysaddr
+        )
+
+    if system is None:
+        system = find_system_by_name(
+            conn, timer, sysname, None, starpos, systems
+        )
+
+    return system
+
+
 def find_system(conn: DBConnection,
                 timer: Timer,
                 sysname: str,
                 starpos: Optional[Tuple[float, float, float]],
                 sysaddr: Optional[int],
-                namedsystems: Dict[str, List[EDDNSystem]],
+                namedsystems: NamedSystems,
                 regions: Dict[str, EDDNRegion],
-                regionaddrs: Dict[int, EDDNRegion]
+                regionaddrs: Dict[int, EDDNRegion],
+                spatialindex: Optional[SpatialIndex] = None
                 ) -> Tuple[Optional[EDDNSystem],
                            Optional[str],
                            MutableSet[EDDNSystem]]:
@@ -554,13 +725,23 @@ def find_system(conn: DBConnection,
         if region_info is None and modsysaddr is not None:
             region_info = regionaddrs.get(modsysaddr >> 40)
 
-        system = add_system(
-            conn, namedsystems, sysname, starpos,
-            modsysaddr, pginfo, region_info
-        )
+        with conn.creating() as shared:
+            if shared:
+                # Another worker may have added the system since it
+                # was looked up above
+                system = find_added_system(
+                    conn, timer, sysname, starpos, sysaddr,
+                    systems, modsysaddr
+                )
+
+            if system is None:
+                system = add_system(
+                    conn, namedsystems, sysname, starpos,
+                    modsysaddr, pginfo, region_info
+                )
 
     if system is None and errmsg is None:
-        find_candidates(conn, timer, starpos, systems)
+        find_candidates(conn, timer, starpos, systems, spatialindex)
 
         errmsg = 'Unable to resolve system'
 
@@ -574,25 +755,17 @@ def getsystem(conn: DBConnection,
               y: Optional[float],
               z: Optional[float],
               sysaddr: Optional[int],
-              namedsystems: Dict[str, List[EDDNSystem]],
+              namedsystems: NamedSystems,
               regions: Dict[str, EDDNRegion],
-              regionaddrs: Dict[int, EDDNRegion]
+              regionaddrs: Dict[int, EDDNRegion],
+              spatialindex: Optional[SpatialIndex] = None
               ) -> Union[Tuple[EDDNSystem, None, None],
                          Tuple[None, str, dict]]:
-    starpos: Optional[Tuple[float, float, float]]
-
-    if x is not None and y is not None and z is not None:
-        starpos = (
-            math.floor(x * 32 + 0.5) / 32.0,
-            math.floor(y * 32 + 0.5) / 32.0,
-            math.floor(z * 32 + 0.5) / 32.0
-        )
-    else:
-        starpos = None
+    starpos = round_starpos(x, y, z)
 
     system, errmsg, systems = find_system(
         conn, timer, sysname, starpos, sysaddr,
-        namedsystems, regions, regionaddrs
+        namedsystems, regions, regionaddrs, spatialindex
     )
 
     if system is not None:
@@ -610,3 +783,264 @@ def getsystem(conn: DBConnection,
                 systems
             )
         )
+
+
+def round_starpos(x: Optional[float],
+                  y: Optional[float],
+                  z: Optional[float]
+                  ) -> Optional[Tuple[float, float, float]]:
+    if x is not None and y is not None and z is not None:
+        return (
+            math.floor(x * 32 + 0.5) / 32.0,
+            math.floor(y * 32 + 0.5) / 32.0,
+            math.floor(z * 32 + 0.5) / 32.0
+        )
+    else:
+        return None
+
+
+def group_rows(rows: Sequence[Sequence],
+               keyfunc: Callable[[Any], Any]
+               ) -> Dict[Any, List[Sequence]]:
+    groups: Dict[Any, List[Sequence]] = {}
+
+    for row in rows:
+        groups.setdefault(keyfunc(row[6]), []).append(row)
+
+    return groups
+
+
+def prepare_lookups(conn: DBConnection,
+                    lookups: Sequence[SystemLookup],
+                    namedsystems: NamedSystems,
+                    regions: Dict[str, EDDNRegion]
+                    ):
+    for lookup in lookups:
+        lookup.system = find_named_system(
+            conn, lookup.sysname, lookup.starpos, lookup.sysaddr,
+            namedsystems, lookup.systems
+        )
+
+        if lookup.system is None:
+            ispgname, modsysaddr, pginfo, errmsg = pgname_to_modsysaddr(
+                regions, lookup.sysname
+            )
+
+            lookup.modsysaddr = modsysaddr
+            lookup.errmsg = errmsg
+
+            if ispgname and modsysaddr is not None and pginfo is not None:
+                lookup.pginfo = pginfo
+                lookup.region_info = pginfo.region_info
+                lookup.pgmodsysaddr = modsysaddr
+
+            if lookup.errmsg is None and lookup.sysaddr is not None:
+                lookup.modsysaddr = id64_to_modsysaddr(lookup.sysaddr)
+
+
+def find_systems_by_modsysaddr(conn: DBConnection,
+                               timer: Timer,
+                               lookups: Sequence[SystemLookup]
+                               ):
+    modsysaddrs = {
+        modsysaddr
+        for lookup in lookups if lookup.system is None
+        for modsysaddr in (lookup.pgmodsysaddr, lookup.modsysaddr)
+        if modsysaddr is not None
+    }
+
+    byaddr = group_rows(
+        sqlqueries.get_systems_by_modsysaddrs(conn, sorted(modsysaddrs)),
+        int
+    )
+
+    timer.time('sysselectmaddr', len(modsysaddrs))
+
+    for lookup in lookups:
+        if lookup.system is None and lookup.pgmodsysaddr is not None:
+            lookup.system = findsystem(
+                conn, byaddr.get(lookup.pgmodsysaddr, []), lookup.sysname,
+                lookup.starpos, lookup.sysaddr, lookup.systems
+            )
+
+        if lookup.pending and lookup.sysaddr is not None:
+            lookup.system = findsystem(
+                conn, byaddr.get(lookup.modsysaddr, []), lookup.sysname,
+                lookup.starpos, lookup.sysaddr, lookup.systems
+            )
+
+
+def find_edts_system(conn: DBConnection,
+                     timer: Timer,
+                     lookup: SystemLookup
+                     ):
+    timer.time('sysquery', 0)
+    edtsid64 = edtslookup.find_edts_system_id64(
+        lookup.sysname,
+        lookup.sysaddr,
+        lookup.starpos
+    )
+
+    if edtsid64 is not None:
+        timer.time('sysqueryedts', 0)
+        lookup.system = find_system_by_modsysaddr(
+            conn, timer, lookup.sysname, lookup.sysaddr,
+            lookup.starpos, lookup.systems,
+            id64_to_modsysaddr(edtsid64)
+        )
+
+        if lookup.system is not None:
+            timer.time('sysqueryedts')
+
+
+def find_systems_by_name(conn: DBConnection,
+                         timer: Timer,
+                         lookups: Sequence[SystemLookup]
+                         ):
+    names = {lookup.sysname for lookup in lookups if lookup.pending}
+
+    byname = group_rows(
+        sqlqueries.get_systems_by_names(conn, sorted(names)),
+        lambda name: from_db_string(name).lower()
+    )
+
+    timer.time('sysselectname', len(names))
+
+    for lookup in lookups:
+        if lookup.pending:
+            lookup.system = findsystem(
+                conn, byname.get(lookup.sysname.lower(), []), lookup.sysname,
+                lookup.starpos, lookup.sysaddr, lookup.systems
+            )
+
+        if lookup.pending:
+            find_edts_system(conn, timer, lookup)
+
+        if lookup.pending:
+            lookup.system = findsystem(
+                conn, byname.get(lookup.sysname.lower(), []), lookup.sysname,
+                lookup.starpos, None, lookup.systems
+            )
+
+
+def add_systems(conn: DBConnection,
+                timer: Timer,
+                lookups: Sequence[SystemLookup],
+                namedsystems: NamedSystems,
+                regionaddrs: Dict[int, EDDNRegion]
+                ):
+    missing = [lookup for lookup in lookups if lookup.pending]
+
+    if len(missing) == 0:
+        return
+
+    with conn.creating() as shared:
+        for lookup in missing:
+            if lookup.region_info is None and lookup.modsysaddr is not None:
+                lookup.region_info = regionaddrs.get(lookup.modsysaddr >> 40)
+
+            if shared:
+                # Another worker may have added the system since it
+                # was looked up above
+                lookup.system = find_added_system(
+                    conn, timer, lookup.sysname, lookup.starpos,
+                    lookup.sysaddr, lookup.systems, lookup.modsysaddr
+                )
+
+            if lookup.system is None:
+                lookup.system = add_system(
+                    conn, namedsystems, lookup.sysname, lookup.starpos,
+                    lookup.modsysaddr, lookup.pginfo, lookup.region_info
+                )
+
+    timer.time('sysinsert', len(missing))
+
+
+def find_systems(conn: DBConnection,
+                 timer: Timer,
+                 lookups: Sequence[SystemLookup],
+                 namedsystems: NamedSystems,
+                 regions: Dict[str, EDDNRegion],
+                 regionaddrs: Dict[int, EDDNRegion],
+                 spatialindex: Optional[SpatialIndex] = None
+                 ):
+    """
+    Resolves a batch of systems using the same strategies in the same order
+    as find_system, but fetching the candidates of each strategy for the
+    whole batch in a single query.
+    """
+
+    prepare_lookups(conn, lookups, namedsystems, regions)
+    timer.time('sysquery', 0)
+
+    find_systems_by_modsysaddr(conn, timer, lookups)
+    find_systems_by_name(conn, timer, lookups)
+    add_systems(conn, timer, lookups, namedsystems, regionaddrs)
+
+    for lookup in lookups:
+        if lookup.pending:
+            find_candidates(
+                conn, timer, lookup.starpos, lookup.systems, spatialindex
+            )
+            lookup.errmsg = 'Unable to resolve system'
+
+
+def getsystems(conn: DBConnection,
+               timer: Timer,
+               batch: Sequence[Tuple[str,
+                                     Optional[Sequence[float]],
+                                     Optional[int]]],
+               namedsystems: NamedSystems,
+               regions: Dict[str, EDDNRegion],
+               regionaddrs: Dict[int, EDDNRegion],
+               spatialindex: Optional[SpatialIndex] = None
+               ) -> List[Union[Tuple[EDDNSystem, None, None],
+                               Tuple[None, str, dict]]]:
+    lookups: Dict[Tuple[str, Optional[Tuple[float, float, float]],
+                        Optional[int]],
+                  SystemLookup] = {}
+    keys = []
+
+    for sysname, starpos, sysaddr in batch:
+        if starpos is not None:
+            key = (sysname, round_starpos(*starpos), sysaddr)
+        else:
+            key = (sysname, None, sysaddr)
+
+        # Systems repeated within the batch are only resolved once
+        if key not in lookups:
+            lookups[key] = SystemLookup(*key)
+
+        keys.append(key)
+
+    find_systems(
+        conn, timer, list(lookups.values()),
+        namedsystems, regions, regionaddrs, spatialindex
+    )
+
+    results: List[Union[Tuple[EDDNSystem, None, None],
+                        Tuple[None, str, dict]]] = []
+
+    for key, (sysname, starpos, sysaddr) in zip(keys, batch):
+        lookup = lookups[key]
+
+        if lookup.system is not None:
+            results.append((lookup.system, None, None))
+        else:
+            x, y, z = starpos if starpos is not None else (None, None, None)
+            errmsg = (
+                f'{lookup.errmsg} {sysname} [{sysaddr}] ({x},{y},{z})\n'
+            )
+            results.append((
+                None,
+                errmsg,
+                getrejectdata(
+                    regions,
+                    regionaddrs,
+                    sysname,
+                    sysaddr,
+                    lookup.systems
+                )
+            ))
+
+    return results
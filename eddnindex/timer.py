@@ -33,3 +33,12 @@ class Timer(object):
                     name, time, count, time * 1000 / (count or 1)
                 )
             )
+
+    def merge(self, timers: Dict[str, float], counts: Dict[str, int]):
+        for name, time in timers.items():
+            if name not in self.timers:
+                self.timers[name] = 0
+                self.counts[name] = 0
+
+            self.timers[name] += time
+            self.counts[name] += counts.get(name, 0)
@@ -1,5 +1,17 @@
 from typing import Union
 from datetime import datetime
+from collections.abc import Sequence
+
+import numpy
+import numpy.typing
+
+from . import constants
+
+
+timestamp_base_datetime64 = numpy.datetime64(
+    constants.timestamp_base_date,
+    's'
+)
 
 
 def timestamp_to_datetime(timestamp: Union[str, None]):
@@ -8,10 +20,53 @@ def timestamp_to_datetime(timestamp: Union[str, None]):
     else:
         if timestamp[-1] == 'Z':
             timestamp = timestamp[:-1]
+
         if len(timestamp) == 26 and timestamp[19] == '.':
-            return datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S.%f')
+            fmt = '%Y-%m-%dT%H:%M:%S.%f'
         else:
-            return datetime.strptime(timestamp[:19], '%Y-%m-%dT%H:%M:%S')
+            timestamp = timestamp[:19]
+            fmt = '%Y-%m-%dT%H:%M:%S'
+
+        # Fast path for the fixed-width layouts
+        if (len(timestamp) >= 19
+                and timestamp[4] == '-'
+                and timestamp[7] == '-'
+                and timestamp[10] == 'T'
+                and timestamp[13] == ':'
+                and timestamp[16] == ':'):
+            try:
+                return datetime.fromisoformat(timestamp)
+            except ValueError:
+                pass
+
+        return datetime.strptime(timestamp, fmt)
+
+
+def timestamps_to_datetime64(timestamps: Sequence[Union[str, None]]
+                             ) -> numpy.typing.NDArray[numpy.datetime64]:
+    # Accepts both 'T' and ' ' date/time separators
+    # Invalid or missing timestamps are converted to NaT
+    try:
+        values = numpy.array(timestamps, dtype='datetime64[us]')
+    except ValueError:
+        values = numpy.empty(len(timestamps), dtype='datetime64[us]')
+
+        for i, timestamp in enumerate(timestamps):
+            try:
+                values[i] = numpy.datetime64(timestamp, 'us')
+            except ValueError:
+                values[i] = numpy.datetime64('NaT')
+
+    return values.astype('datetime64[s]')
+
+
+def timestamps_to_seconds(timestamps: Sequence[Union[str, None]]
+                          ) -> numpy.typing.NDArray[numpy.int64]:
+    # Seconds since constants.timestamp_base_date, or -1 if invalid
+    values = timestamps_to_datetime64(timestamps)
+    seconds = (values - timestamp_base_datetime64).astype(numpy.int64)
+    seconds[numpy.isnat(values)] = -1
+    return seconds
 
 
 def id64_to_modsysaddr(sysaddr: int) -> int: